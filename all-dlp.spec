@@ -13,6 +13,18 @@ a = Analysis(
     ],
     datas=[
         ('api/database.py', '.'),
+        ('api/scheduler.py', '.'),
+        ('api/events.py', '.'),
+        ('api/reconciler.py', '.'),
+        ('api/metadata_cache.py', '.'),
+        ('api/library_index.py', '.'),
+        ('api/pipeline.py', '.'),
+        ('api/ratelimit.py', '.'),
+        ('api/bandwidth.py', '.'),
+        ('api/tool_registry.py', '.'),
+        ('api/logs.py', '.'),
+        ('api/ytdlp_engine.py', '.'),
+        ('api/ytdlp_worker.py', '.'),
         ('api/requirements.txt', '.'),
     ],
     hiddenimports=[
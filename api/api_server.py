@@ -1,34 +1,67 @@
 import os
 import sys
 import time
+
+# Startup timing, reported by /api/health
+IMPORT_STARTED = time.monotonic()
 import json
 import uuid
 import subprocess
 import asyncio
 import threading
+from abc import abstractmethod
 from pathlib import Path
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-import uvicorn
+from typing import Literal
 import shutil
 import logging
 import platform
 import urllib.parse
+import importlib.util
+import atexit
+from contextlib import asynccontextmanager
 
-# Add mutagen for MP3 metadata extraction
-try:
-    from mutagen import File
-    from mutagen.mp3 import MP3
-    from mutagen.id3 import ID3
-    MUTAGEN_AVAILABLE = True
-except ImportError:
-    MUTAGEN_AVAILABLE = False
+# mutagen (MP3 metadata) is imported where it's used; at startup only check that it's installed
+MUTAGEN_AVAILABLE = importlib.util.find_spec("mutagen") is not None
+if not MUTAGEN_AVAILABLE:
     logging.warning("mutagen not available - will use fallback metadata extraction")
 
 __version__ = "1.0.0"
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Accept requests right away; the database, recovery and workers start in the background
+    threading.Thread(target=initialize_backend, daemon=True, name="startup").start()
+    yield
+    startup_complete.wait(STARTUP_WAIT_TIMEOUT)
+    # Clean shutdown: stop the download workers and close pooled DB connections
+    scheduler.stop()
+    postprocess_pool.stop()
+    youtube_engine.close()
+    if reconciler:
+        reconciler.stop()
+    if db:
+        db.close()
+
+app = FastAPI(lifespan=lifespan)
+
+# Set once initialize_backend has finished (successfully or not)
+startup_complete = threading.Event()
+startup_times = {'import_seconds': None, 'init_seconds': None}
+
+# Seconds a request waits for startup to finish before it is answered with 503
+STARTUP_WAIT_TIMEOUT = 30.0
+
+@app.middleware("http")
+async def wait_for_startup(request: Request, call_next):
+    """Hold requests until the backend is initialized; /api/health answers immediately"""
+    if not startup_complete.is_set() and request.url.path != "/api/health":
+        if not await asyncio.to_thread(startup_complete.wait, STARTUP_WAIT_TIMEOUT):
+            return JSONResponse(status_code=503, content={"detail": "Server is still starting"})
+    return await call_next(request)
 
 # Add CORS middleware
 app.add_middleware(
@@ -42,6 +75,11 @@ app.add_middleware(
 # Models
 class DownloadRequest(BaseModel):
     url: str
+    priority: int = 0  # Higher priority jobs are started first
+    force: bool = False  # Download again even if the same content is cached or in flight
+
+class ResolveRequest(BaseModel):
+    url: str
 
 class DownloadResponse(BaseModel):
     id: str
@@ -69,77 +107,102 @@ class AudioSettings(BaseModel):
     volume_boost: float = 2.0  # Default 2x volume boost (6dB)
     normalize_loudness: bool = True  # Enable loudness normalization
     target_lufs: float = -16.0  # Target loudness in LUFS
+    single_pass: bool = True  # Download native audio and normalize + encode in one FFmpeg pass
+    # "measured" (two-pass linear loudnorm), "dynamic" (single-pass loudnorm) or
+    # "tags" (write ReplayGain/R128 gain tags, leaving the audio untouched)
+    normalization_mode: Literal["measured", "dynamic", "tags"] = "measured"
+    album_gain: bool = False  # Playlists: one gain for all tracks, keeping their relative levels
+
+class DownloadSettings(BaseModel):
+    max_concurrent_downloads: int = 3  # Global worker count
+    max_youtube_downloads: int = 2  # Per-platform limits (0 = no extra limit)
+    max_spotify_downloads: int = 2
+    max_soundcloud_downloads: int = 2
+    progress_flush_interval: float = 1.0  # Seconds between batched progress writes (0 = write-through)
+    youtube_engine: Literal["subprocess", "library"] = "subprocess"  # yt-dlp executable, or yt_dlp as a library in warm worker processes
+    max_total_rate_kb: int = 0  # KB/s shared by all running downloads (0 = unlimited)
+    max_job_rate_kb: int = 0  # KB/s per download (0 = unlimited)
+    # Extractor output in the logs: "debug" (with progress lines), "info" or "warning" (problems only)
+    extractor_log_level: Literal["debug", "info", "warning"] = "info"
 
 # Create downloads directory
 DOWNLOADS_DIR = Path.home() / "Downloads" / "all-dlp"
 DOWNLOADS_DIR.mkdir(exist_ok=True)
 
-# Setup logging with more detailed startup information
-LOG_FILE = DOWNLOADS_DIR / "all-dlp.log"
-file_handler = logging.FileHandler(LOG_FILE, encoding='utf-8')
-stream_handler = logging.StreamHandler()
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from logs import download_context, log_tool_output, set_extractor_log_level, setup_logging
 
-# Create formatter
-formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
-file_handler.setFormatter(formatter)
-stream_handler.setFormatter(formatter)
+# Setup logging: threads only enqueue records, a listener thread writes the
+# rotated log file, the console and the per-download logs
+LOG_DIR = Path.home() / ".all-dlp" / "logs"
+LOG_FILE = LOG_DIR / "all-dlp.log"
+log_listener, download_logs = setup_logging(LOG_DIR)
+atexit.register(log_listener.stop)
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    handlers=[file_handler, stream_handler]
-)
+def log_startup_environment():
+    """Log environment details and where FFmpeg was found"""
+    logging.info("=" * 60)
+    logging.info("ALL-DLP API Server Startup")
+    logging.info("=" * 60)
+    logging.info(f"Python version: {sys.version}")
+    logging.info(f"Platform: {platform.platform()}")
+    logging.info(f"Architecture: {platform.machine()}")
+    logging.info(f"Executable: {sys.executable}")
+    logging.info(f"Current working directory: {os.getcwd()}")
+    logging.info(f"Script location: {__file__}")
+    logging.info(f"Downloads directory: {DOWNLOADS_DIR}")
+    logging.info(f"Log file: {LOG_FILE}")
+    logging.info(f"PATH: {os.environ.get('PATH')}")
 
-# Enhanced startup logging
-logging.info("=" * 60)
-logging.info("ALL-DLP API Server Startup")
-logging.info("=" * 60)
-logging.info(f"Python version: {sys.version}")
-logging.info(f"Platform: {platform.platform()}")
-logging.info(f"Architecture: {platform.machine()}")
-logging.info(f"Executable: {sys.executable}")
-logging.info(f"Current working directory: {os.getcwd()}")
-logging.info(f"Script location: {__file__}")
-logging.info(f"Downloads directory: {DOWNLOADS_DIR}")
-logging.info(f"Log file: {LOG_FILE}")
-logging.info(f"PATH: {os.environ.get('PATH')}")
-
-# Check FFmpeg availability
-ffmpeg_path = Path(__file__).parent / "ffmpeg"
-logging.info(f"FFmpeg expected at: {ffmpeg_path}")
-if ffmpeg_path.exists():
-    logging.info(f"✅ FFmpeg found at: {ffmpeg_path}")
-else:
-    logging.warning(f"⚠️  FFmpeg not found at: {ffmpeg_path}")
-    # Check system FFmpeg
-    import shutil
-    system_ffmpeg = shutil.which('ffmpeg')
-    if system_ffmpeg:
-        logging.info(f"✅ System FFmpeg found at: {system_ffmpeg}")
+    # Check FFmpeg availability
+    ffmpeg_path = Path(__file__).parent / "ffmpeg"
+    logging.info(f"FFmpeg expected at: {ffmpeg_path}")
+    if ffmpeg_path.exists():
+        logging.info(f"✅ FFmpeg found at: {ffmpeg_path}")
     else:
-        logging.error("❌ No FFmpeg found in system PATH")
-def flush_logs():
-    for handler in logging.getLogger().handlers:
-        handler.flush()
-
-# Database import with enhanced logging
-logging.info("Initializing database...")
-try:
-    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-    from database import DownloadDatabase
-    db = DownloadDatabase()
-    logging.info("✅ Database initialized successfully")
-except ImportError as e:
-    logging.error(f"❌ Database module not found: {e}")
-    logging.warning("⚠️  Using fallback mode - downloads will not be saved")
-    db = None
-except Exception as e:
-    logging.error(f"❌ Database initialization failed: {e}")
+        logging.warning(f"⚠️  FFmpeg not found at: {ffmpeg_path}")
+        # Check system FFmpeg
+        system_ffmpeg = shutil.which('ffmpeg')
+        if system_ffmpeg:
+            logging.info(f"✅ System FFmpeg found at: {system_ffmpeg}")
+        else:
+            logging.error("❌ No FFmpeg found in system PATH")
+
+def open_database():
+    """Open (and create or migrate) the database, or return None for fallback mode"""
+    logging.info("Initializing database...")
+    try:
+        from database import DownloadDatabase
+        database = DownloadDatabase()
+        logging.info("✅ Database initialized successfully")
+        return database
+    except ImportError as e:
+        logging.error(f"❌ Database module not found: {e}")
+    except Exception as e:
+        logging.error(f"❌ Database initialization failed: {e}")
     logging.warning("⚠️  Using fallback mode - downloads will not be saved")
-    db = None
+    return None
 
-def get_tool_path(tool_name: str) -> str:
-    """Get the path to a tool, handling both development and production environments"""
+# Opened by initialize_backend; requests wait for it (see wait_for_startup)
+db = None
+
+from scheduler import DownloadScheduler, PLATFORMS
+from events import EventBus
+from reconciler import FileReconciler
+from metadata_cache import MetadataCache
+from library_index import LibraryIndex
+from ytdlp_engine import YtDlpEngine, EngineError
+from ratelimit import RateLimiter, backoff_delay, is_throttle_message
+from bandwidth import BandwidthAllocator
+from tool_registry import ToolRegistry
+from pipeline import (DownloadBackend, DownloadJob, PipelineError, PipelineStats, StagePool,
+                      FETCH_STAGES, PROCESS_STAGES, run_stages)
+
+# Status/progress updates pushed to /api/events subscribers
+event_bus = EventBus()
+
+def locate_tool(tool_name: str) -> str:
+    """Where to look for a tool, handling both development and production environments"""
     # Check if we're running from PyInstaller bundle
     if getattr(sys, 'frozen', False):
         # Production mode - running from PyInstaller bundle
@@ -149,10 +212,9 @@ def get_tool_path(tool_name: str) -> str:
         tool_path = os.path.join(bundle_dir, '_internal', tool_name, tool_name)
         
         if os.path.exists(tool_path):
-            print(f"Found {tool_name} at: {tool_path}")
             return tool_path
         else:
-            print(f"Warning: {tool_name} not found at {tool_path}, falling back to system PATH")
+            logging.warning(f"{tool_name} not found at {tool_path}, falling back to system PATH")
             return tool_name
     else:
         # Development mode - use virtual environment
@@ -172,12 +234,54 @@ def get_env_with_ffmpeg():
     env["PATH"] = ffmpeg_dir + os.pathsep + env.get("PATH", "")
     return env
 
+# Version arguments and capability probes per tool (see ToolRegistry)
+TOOL_PROBES = {
+    'yt-dlp': {'version': ["--version"]},
+    'spotdl': {
+        'version': ["--version"],
+        'capabilities': [(["--help"], {'ffmpeg-args': r'--ffmpeg-args', 'yt-dlp-args': r'--yt-dlp-args'})],
+    },
+    'scdl': {'version': ["--version"]},
+    'ffmpeg': {
+        'version': ["-hide_banner", "-version"],
+        'capabilities': [
+            (["-hide_banner", "-filters"], {'loudnorm': r'\bloudnorm\b'}),
+            (["-hide_banner", "-encoders"], {'libmp3lame': r'\blibmp3lame\b'}),
+        ],
+    },
+}
+
+# Tools are located and probed once (in parallel by initialize_backend), then served from the cache
+tool_registry = ToolRegistry(TOOL_PROBES, locate_tool, env=get_env_with_ffmpeg())
+
+def get_tool_path(tool_name: str) -> str:
+    """Get the path to a tool, or its bare name if it wasn't found"""
+    return tool_registry.path(tool_name)
+
+def update_download_status(download_id: str, status: str, progress: float = None,
+                           file_path: str = None, file_size: int = None, error: str = None):
+    """Store a status change and push it to connected event stream clients"""
+    if db:
+        db.updateStatus(download_id, status, progress, file_path, file_size, error)
+    fields = {'status': status}
+    for key, value in (('progress', progress), ('file_path', file_path),
+                       ('file_size', file_size), ('error', error)):
+        if value is not None:
+            fields[key] = value
+    parent_id = playlist_parents.get(download_id)
+    if parent_id:
+        # Playlist track: clients show it as part of its playlist
+        fields['parent_id'] = parent_id
+    event_bus.publish(download_id, **fields)
+    if parent_id and status == 'downloading':
+        update_playlist_progress(parent_id)
+
 def get_platform(url: str) -> str:
     """Detect platform from URL"""
     url_lower = url.lower()
     if 'youtube.com' in url_lower or 'youtu.be' in url_lower:
         return 'youtube'
-    elif 'spotify.com' in url_lower:
+    elif 'spotify.com' in url_lower or 'spotify.link' in url_lower:
         return 'spotify'
     elif 'soundcloud.com' in url_lower:
         return 'soundcloud'
@@ -187,37 +291,23 @@ def get_platform(url: str) -> str:
 def find_actual_downloaded_file() -> str:
     """Find the most recently downloaded audio file"""
     try:
-        # Look for audio files in downloads directory
-        audio_extensions = {'.mp3', '.m4a', '.wav', '.flac', '.ogg', '.webm'}
-        files = []
-        
         # UUID pattern: 8-4-4-4-12 characters separated by hyphens
         uuid_pattern = r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
         import re
         
-        print(f"Searching for files in: {DOWNLOADS_DIR}")
-        print(f"Files in directory: {list(DOWNLOADS_DIR.glob('*'))}")
-        
-        for file in DOWNLOADS_DIR.glob('*'):
-            if (file.is_file() and 
-                file.suffix.lower() in audio_extensions and
-                file.name != 'downloads.db' and  # Exclude database file
-                not file.name.startswith('.') and  # Exclude hidden files
-                file.stat().st_size > 100000 and  # Exclude small files (likely not audio)
-                not re.search(uuid_pattern, file.name)):  # Exclude files that already have UUIDs
-                files.append(file)
-                print(f"Found suitable file: {file.name}")
-        
-        if files:
-            # Return the most recently created file
-            most_recent = max(files, key=lambda f: f.stat().st_mtime)
-            print(f"Found downloaded file: {most_recent}")
-            return str(most_recent)
-        else:
-            print(f"No suitable files found in {DOWNLOADS_DIR}")
+        if library_index is None:
+            return None
+        # Only files that changed since the last scan are re-read
+        library_index.scan(DOWNLOADS_DIR, recursive=False)
+        # Exclude small files (likely not audio) and files that already have UUIDs
+        for entry in db.get_library_files(str(DOWNLOADS_DIR), min_size=100000):
+            if not re.search(uuid_pattern, os.path.basename(entry['path'])):
+                logging.info(f"Found downloaded file: {entry['path']}")
+                return entry['path']
+        logging.info(f"No suitable files found in {DOWNLOADS_DIR}")
             
     except Exception as e:
-        print(f"Error finding downloaded file: {e}")
+        logging.error(f"Error finding downloaded file: {e}")
     
     return None
 
@@ -259,19 +349,32 @@ def clean_extracted_title(title: str) -> str:
     return cleaned_title if cleaned_title else "Unknown Title"
 
 def extract_mp3_metadata(file_path: str) -> dict:
+    """Metadata of an MP3 file, from the library index unless the file changed"""
+    if library_index is not None:
+        try:
+            metadata = library_index.metadata(file_path)
+            if metadata is not None:
+                return metadata
+        except Exception as e:
+            logging.warning(f"Library index lookup failed for {file_path}: {e}")
+    return read_audio_metadata(file_path)
+
+def read_audio_metadata(file_path: str) -> dict:
     """Extract metadata from MP3 file using mutagen"""
     metadata = {
         'title': None,
         'artist': None,
         'album': None,
         'year': None,
-        'track': None
+        'track': None,
+        'duration': None
     }
     
     if not MUTAGEN_AVAILABLE:
         return metadata
     
     try:
+        from mutagen import File
         audio = File(file_path)
         if audio is None:
             return metadata
@@ -320,6 +423,10 @@ def extract_mp3_metadata(file_path: str) -> dict:
     
     return metadata
 
+# Stat and tag data of the library's audio files, rescanned incrementally
+# (created with the database by initialize_backend)
+library_index = None
+
 def load_audio_settings() -> AudioSettings:
     """Load audio settings from database or return defaults"""
     try:
@@ -335,62 +442,325 @@ def load_audio_settings() -> AudioSettings:
         logging.warning(f"Failed to load audio settings from database, using defaults: {e}")
         return AudioSettings()
 
+# loudnorm targets besides the integrated loudness
+LOUDNORM_TRUE_PEAK = -1.5
+LOUDNORM_LRA = 11.0
+
+def build_audio_filter(settings: AudioSettings, analysis: dict = None, gain_db: float = None) -> str:
+    """Build the FFmpeg audio filter chain for the given settings.
+    
+    With a loudness analysis of the input, loudnorm runs as the linear
+    second pass of a two-pass normalization instead of dynamically. A
+    fixed gain (album gain) replaces loudnorm with a plain volume change.
+    """
+    if settings.normalization_mode == "tags":
+        # Loudness and volume boost are applied by the player from gain tags
+        return ""
+    
+    filters = []
+    if settings.normalize_loudness and (gain_db is not None or tool_registry.has('ffmpeg', 'loudnorm')):
+        if gain_db is not None:
+            filters.append(f"volume={gain_db:.2f}dB")
+        elif analysis:
+            # The LRA target must cover the measured range, otherwise loudnorm
+            # falls back to dynamic mode
+            lra = min(max(LOUDNORM_LRA, analysis['input_lra']), 50.0)
+            filters.append(
+                f"loudnorm=I={settings.target_lufs}:TP={LOUDNORM_TRUE_PEAK}:LRA={lra}"
+                f":measured_I={analysis['input_i']}:measured_TP={analysis['input_tp']}"
+                f":measured_LRA={analysis['input_lra']}:measured_thresh={analysis['input_thresh']}"
+                f":linear=true"
+            )
+        else:
+            filters.append(f"loudnorm=I={settings.target_lufs}:TP={LOUDNORM_TRUE_PEAK}:LRA={LOUDNORM_LRA}")
+    if settings.volume_boost > 1.0:
+        filters.append(f"volume={settings.volume_boost}")
+    return ",".join(filters)
+
+# FFmpeg processes running at once, over the post-processing pool and the playlist passes
+FFMPEG_PROCESSES = os.cpu_count() or 2
+ffmpeg_slots = threading.BoundedSemaphore(FFMPEG_PROCESSES)
+
+def run_ffmpeg(cmd: list) -> subprocess.CompletedProcess:
+    """Run an FFmpeg command once one of the FFMPEG_PROCESSES slots is free"""
+    with ffmpeg_slots:
+        return subprocess.run(cmd, capture_output=True, text=True)
+
+def hash_file(file_path: str) -> str:
+    """SHA-256 of a file's content, used as the loudness analysis cache key"""
+    import hashlib
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def measure_loudness(file_path: str) -> dict:
+    """Run a loudnorm analysis pass and return the measured input values"""
+    import re
+    if not tool_registry.has('ffmpeg', 'loudnorm'):
+        return None
+    ffmpeg_path = get_tool_path('ffmpeg')
+    
+    cmd = [
+        ffmpeg_path, "-hide_banner", "-nostats",
+        "-i", str(file_path),
+        "-vn",
+        "-af", f"loudnorm=TP={LOUDNORM_TRUE_PEAK}:LRA={LOUDNORM_LRA}:print_format=json",
+        "-f", "null", "-"
+    ]
+    result = run_ffmpeg(cmd)
+    # loudnorm prints its measurements as the last JSON object on stderr
+    blocks = re.findall(r'\{[^{}]*\}', result.stderr)
+    if result.returncode != 0 or not blocks:
+        logging.warning(f"Loudness measurement failed for {file_path}: {result.stderr[-500:]}")
+        return None
+    
+    try:
+        values = json.loads(blocks[-1])
+        analysis = {key: float(values[key]) for key in ('input_i', 'input_tp', 'input_lra', 'input_thresh')}
+    except (ValueError, KeyError) as e:
+        logging.warning(f"Could not parse loudness measurement for {file_path}: {e}")
+        return None
+    if analysis['input_i'] == float('-inf'):
+        # Digital silence, nothing to normalize against
+        return None
+    return analysis
+
+loudness_analysis_stats = {'measured': 0, 'cached': 0}
+
+def analyze_loudness(file_path: str, settings: AudioSettings) -> dict:
+    """Get the loudness analysis of a file, measuring it only if it isn't cached"""
+    if settings.normalization_mode == "dynamic":
+        return None
+    if not settings.normalize_loudness:
+        # Tags still need the peak for a volume boost; the volume filter doesn't
+        if settings.normalization_mode != "tags" or settings.volume_boost <= 1.0:
+            return None
+    
+    file_hash = hash_file(file_path)
+    if db:
+        analysis = db.get_loudness_analysis(file_hash)
+        if analysis:
+            loudness_analysis_stats['cached'] += 1
+            logging.info(f"Using cached loudness analysis for {file_path}: {analysis}")
+            return analysis
+    
+    analysis = measure_loudness(file_path)
+    if analysis:
+        loudness_analysis_stats['measured'] += 1
+        logging.info(f"Measured loudness of {file_path}: {analysis}")
+        if db:
+            db.save_loudness_analysis(file_hash, **analysis)
+    return analysis
+
+def save_processed_loudness(file_path: str, analysis: dict, settings: AudioSettings, gain_db: float = None):
+    """Store the loudness of a file written by a linear second pass.
+    
+    Linear loudnorm and the volume filter only apply gain, so the output's
+    values follow from the input's without measuring again. This lets a
+    later re-gain of the file skip the analysis pass. gain_db is the fixed
+    gain of an album gain pass, if that wrote the file.
+    """
+    import math
+    if not analysis or not db:
+        return
+    if gain_db is not None:
+        gain = gain_db
+    else:
+        gain = settings.target_lufs - analysis['input_i']
+        if analysis['input_tp'] + gain > LOUDNORM_TRUE_PEAK:
+            # loudnorm switched to dynamic mode to respect the true peak limit
+            return
+    if settings.volume_boost > 1.0:
+        gain_out = gain + 20 * math.log10(settings.volume_boost)
+    else:
+        gain_out = gain
+    db.save_loudness_analysis(
+        hash_file(file_path),
+        round(analysis['input_i'] + gain_out, 2),
+        round(analysis['input_tp'] + gain_out, 2),
+        analysis['input_lra'],
+        round(analysis['input_thresh'] + gain_out, 2),
+        source='derived'
+    )
+
+# Reference loudness of R128_TRACK_GAIN tags (EBU R128)
+R128_REFERENCE_LUFS = -23.0
+
+def break_hardlink(file_path: str):
+    """Give a file its own inode before modifying it in place.
+    
+    Downloads served from the result cache share the file with the original
+    download through a hardlink, and tags must only change this one.
+    """
+    if os.stat(file_path).st_nlink > 1:
+        temp_file = str(file_path) + ".unlink.tmp"
+        shutil.copy2(file_path, temp_file)
+        os.replace(temp_file, file_path)
+
+def write_gain_tags(file_path: str, gain_db: float, peak: float, reference_lufs: float,
+                    album_gain_db: float = None, album_peak: float = None) -> bool:
+    """Write ReplayGain gain/peak tags (and R128 gains for Opus) with mutagen.
+    
+    Album tags are written when album_gain_db is given, otherwise stale
+    ones from an earlier album pass are removed.
+    """
+    if not MUTAGEN_AVAILABLE:
+        logging.warning("mutagen not available, cannot write gain tags")
+        return False
+    
+    from mutagen import File
+    from mutagen.mp3 import MP3
+    from mutagen.id3 import TXXX
+    audio = File(file_path)
+    if audio is None:
+        logging.warning(f"Unsupported file for gain tags: {file_path}")
+        return False
+    
+    tags = {'REPLAYGAIN_TRACK_GAIN': f"{gain_db:+.2f} dB", 'REPLAYGAIN_TRACK_PEAK': f"{peak:.6f}"}
+    r128_gains = {'R128_TRACK_GAIN': gain_db}
+    stale = []
+    if album_gain_db is not None:
+        tags['REPLAYGAIN_ALBUM_GAIN'] = f"{album_gain_db:+.2f} dB"
+        tags['REPLAYGAIN_ALBUM_PEAK'] = f"{album_peak:.6f}"
+        r128_gains['R128_ALBUM_GAIN'] = album_gain_db
+    else:
+        stale = ['REPLAYGAIN_ALBUM_GAIN', 'REPLAYGAIN_ALBUM_PEAK']
+    if isinstance(audio, MP3):
+        if audio.tags is None:
+            audio.add_tags()
+        for desc in [*tags, *stale]:
+            audio.tags.delall(f'TXXX:{desc}')
+            audio.tags.delall(f'TXXX:{desc.lower()}')
+        for desc, text in tags.items():
+            audio.tags.add(TXXX(encoding=3, desc=desc, text=[text]))
+    else:
+        if audio.tags is None:
+            audio.add_tags()
+        is_opus = 'audio/ogg' in audio.mime and type(audio).__name__ == 'OggOpus'
+        if is_opus and album_gain_db is None:
+            stale.append('R128_ALBUM_GAIN')
+        for desc in stale:
+            if desc in audio.tags:
+                del audio.tags[desc]
+        for desc, text in tags.items():
+            audio.tags[desc] = text
+        if is_opus:
+            # Q7.8 fixed point gain relative to the EBU R128 reference
+            for desc, gain in r128_gains.items():
+                r128_gain = gain + R128_REFERENCE_LUFS - reference_lufs
+                audio.tags[desc] = str(max(-32768, min(32767, round(r128_gain * 256))))
+    audio.save()
+    return True
+
+def apply_gain_tags(file_path: str, settings: AudioSettings, analysis: dict = None, album: dict = None) -> bool:
+    """Tag a file with the gain that normalization and volume boost would apply.
+    
+    With the loudness of its album (see compute_album_loudness), the album
+    gain and peak are tagged too.
+    """
+    import math
+    if analysis is None:
+        analysis = analyze_loudness(file_path, settings)
+    if not analysis:
+        logging.warning(f"No loudness analysis for {file_path}, cannot write gain tags")
+        return False
+    
+    boost_db = 20 * math.log10(settings.volume_boost) if settings.volume_boost > 1.0 else 0.0
+    gain_db = boost_db
+    if settings.normalize_loudness:
+        gain_db += settings.target_lufs - analysis['input_i']
+    peak = 10 ** (analysis['input_tp'] / 20)
+    album_gain_db = album_peak = None
+    if album:
+        album_gain_db = settings.target_lufs - album['input_i'] + boost_db
+        album_peak = 10 ** (album['input_tp'] / 20)
+    
+    break_hardlink(file_path)
+    if not write_gain_tags(file_path, gain_db, peak, settings.target_lufs, album_gain_db, album_peak):
+        return False
+    logging.info(f"Wrote gain tags to {file_path}: {gain_db:+.2f} dB, peak {peak:.6f}")
+    
+    # Tags don't change the audio, so the analysis still holds for the new file content
+    if db:
+        db.save_loudness_analysis(
+            hash_file(file_path),
+            analysis['input_i'],
+            analysis['input_tp'],
+            analysis['input_lra'],
+            analysis['input_thresh'],
+            source=analysis.get('source', 'measured')
+        )
+    return True
+
+def transcode_audio(src_path: str, dst_path: str, settings: AudioSettings, analysis: dict = None,
+                    gain_db: float = None) -> bool:
+    """Decode, filter and encode to 320k MP3 in a single FFmpeg invocation"""
+    if not tool_registry.has('ffmpeg'):
+        logging.warning("FFmpeg not found, cannot transcode audio")
+        return False
+    if not tool_registry.has('ffmpeg', 'libmp3lame'):
+        logging.error("FFmpeg was built without the libmp3lame encoder, cannot encode MP3")
+        return False
+    ffmpeg_path = get_tool_path('ffmpeg')
+    
+    cmd = [ffmpeg_path, "-i", str(src_path), "-vn", "-map_metadata", "0"]
+    audio_filter = build_audio_filter(settings, analysis, gain_db)
+    if audio_filter:
+        cmd += ["-af", audio_filter]
+    cmd += [
+        "-c:a", "libmp3lame",
+        "-ar", "44100",  # Sample rate
+        "-b:a", "320k",  # Bitrate
+        "-id3v2_version", "3",
+        "-y",  # Overwrite output
+        str(dst_path)
+    ]
+    
+    logging.info(f"Transcoding audio: {' '.join(cmd)}")
+    result = run_ffmpeg(cmd)
+    if result.returncode != 0:
+        logging.error(f"Audio transcoding failed: {result.stderr}")
+        if os.path.exists(dst_path):
+            os.remove(dst_path)
+        return False
+    return True
+
 def normalize_audio_volume(file_path: str, settings: AudioSettings = None) -> bool:
     """Normalize and amplify audio volume using FFmpeg"""
     if settings is None:
         settings = load_audio_settings()  # Load current settings from database
     
+    # Create temporary file for processing
+    temp_file = str(file_path) + ".temp.mp3"
+    
     try:
-        ffmpeg_path = get_tool_path('ffmpeg')
-        if not ffmpeg_path:
+        if not tool_registry.has('ffmpeg'):
             logging.warning("FFmpeg not found, skipping audio normalization")
             return False
         
-        # Create temporary file for processing
-        temp_file = str(file_path) + ".temp.mp3"
-        
-        # Build FFmpeg audio filter
-        audio_filter = ""
-        if settings.normalize_loudness:
-            audio_filter += f"loudnorm=I={settings.target_lufs}:TP=-1.5:LRA=11"
-        
-        if settings.volume_boost > 1.0:
-            if audio_filter:
-                audio_filter += f",volume={settings.volume_boost}"
-            else:
-                audio_filter = f"volume={settings.volume_boost}"
+        if settings.normalization_mode == "tags":
+            # Metadata only: scan loudness and write gain tags, no re-encode
+            if not settings.normalize_loudness and settings.volume_boost <= 1.0:
+                logging.info("No audio processing needed, skipping gain tags")
+                return True
+            return apply_gain_tags(file_path, settings)
         
         # If no audio processing needed, skip
-        if not audio_filter:
+        if not build_audio_filter(settings):
             logging.info("No audio processing needed, skipping normalization")
             return True
         
-        # FFmpeg command to normalize and amplify audio
-        cmd = [
-            ffmpeg_path,
-            "-i", str(file_path),
-            "-af", audio_filter,
-            "-ar", "44100",  # Sample rate
-            "-b:a", "320k",  # Bitrate
-            "-y",  # Overwrite output
-            temp_file
-        ]
-        
-        logging.info(f"Normalizing audio volume: {' '.join(cmd)}")
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
+        logging.info(f"Normalizing audio volume for {file_path}")
+        analysis = analyze_loudness(file_path, settings)
+        if transcode_audio(file_path, temp_file, settings, analysis):
             # Replace original file with normalized version
             shutil.move(temp_file, str(file_path))
+            save_processed_loudness(file_path, analysis, settings)
             logging.info(f"Audio normalization completed for {file_path}")
             return True
-        else:
-            logging.error(f"Audio normalization failed: {result.stderr}")
-            # Clean up temp file if it exists
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
-            return False
+        return False
             
     except Exception as e:
         logging.error(f"Error during audio normalization: {e}")
@@ -399,6 +769,150 @@ def normalize_audio_volume(file_path: str, settings: AudioSettings = None) -> bo
             os.remove(temp_file)
         return False
 
+def transcode_native_audio(directory: Path, settings: AudioSettings) -> int:
+    """Convert every downloaded native audio file in a directory to MP3.
+    
+    Returns the number of files converted. A file that fails with the audio
+    filter is converted without it, like a failed normalization keeps the
+    original file in the two-pass pipeline.
+    """
+    converted = 0
+    sources = [f for f in directory.iterdir()
+               if f.is_file() and f.suffix.lower() not in ('.mp3', '.part', '.ytdl', '.json')]
+    for src_file in sources:
+        dst_file = src_file.with_suffix('.mp3')
+        analysis = analyze_loudness(src_file, settings)
+        if transcode_audio(src_file, dst_file, settings, analysis):
+            if settings.normalization_mode == "tags":
+                # The MP3 sounds like its source, so the source's analysis applies
+                if analysis:
+                    apply_gain_tags(dst_file, settings, analysis)
+            else:
+                save_processed_loudness(dst_file, analysis, settings)
+        else:
+            logging.warning(f"Single-pass processing failed for {src_file}, converting without normalization")
+            if not transcode_audio(src_file, dst_file, AudioSettings(normalize_loudness=False, volume_boost=1.0)):
+                continue
+        src_file.unlink()
+        converted += 1
+    return converted
+
+def get_audio_duration(file_path: str) -> float:
+    """Duration in seconds from the file's headers, or None if unknown"""
+    if not MUTAGEN_AVAILABLE:
+        return None
+    if library_index is not None:
+        return extract_mp3_metadata(file_path).get('duration')
+    try:
+        from mutagen import File
+        audio = File(file_path)
+        return audio.info.length if audio else None
+    except Exception:
+        return None
+
+def compute_album_loudness(analyses: list, durations: list) -> dict:
+    """Integrated loudness and true peak of tracks played back to back.
+    
+    Loudness averages energy, so the tracks' loudness values are combined
+    in the linear domain, weighted by duration; the peak is the loudest
+    track peak.
+    """
+    import math
+    weights = [duration or 1.0 for duration in durations]
+    energy = sum(weight * 10 ** (analysis['input_i'] / 10) for analysis, weight in zip(analyses, weights))
+    return {
+        'input_i': round(10 * math.log10(energy / sum(weights)), 2),
+        'input_tp': max(analysis['input_tp'] for analysis in analyses),
+    }
+
+def apply_album_gain(file_path: str, analysis: dict, album: dict, settings: AudioSettings) -> bool:
+    """Bring a track to the level its album needs, keeping it relative to the other tracks"""
+    if settings.normalization_mode == "tags":
+        return bool(analysis) and apply_gain_tags(file_path, settings, analysis, album)
+    
+    # Same gain for every track, lowered so the album's loudest peak stays under the limit
+    gain_db = min(settings.target_lufs - album['input_i'], LOUDNORM_TRUE_PEAK - album['input_tp'])
+    temp_file = str(file_path) + ".temp.mp3"
+    if not transcode_audio(file_path, temp_file, settings, gain_db=gain_db):
+        return False
+    shutil.move(temp_file, str(file_path))
+    save_processed_loudness(file_path, analysis, settings, gain_db)
+    return True
+
+def normalize_playlist(download_id: str, files: list, settings: AudioSettings) -> int:
+    """Normalize the tracks of a playlist concurrently, one FFmpeg process per core.
+    
+    With album gain every track is measured first and all get the same
+    gain, so their relative levels are kept; otherwise each track is
+    normalized on its own. Finished tracks are reported as the playlist
+    download's normalization progress. Returns the number of tracks
+    normalized.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    if not files or not tool_registry.has('ffmpeg'):
+        return 0
+    album = None
+    normalized = 0
+    # FFmpeg runs are bounded by ffmpeg_slots, shared with the other post-processing work
+    with ThreadPoolExecutor(max_workers=min(len(files), FFMPEG_PROCESSES)) as pool:
+        if settings.album_gain and settings.normalize_loudness:
+            # Dynamic mode doesn't measure, but album gain needs every track's loudness
+            measure_settings = settings.model_copy(update={'normalization_mode': 'measured'}) \
+                if settings.normalization_mode == "dynamic" else settings
+            analyses = list(pool.map(lambda f: analyze_loudness(f, measure_settings), files))
+            measured = [(analysis, get_audio_duration(f)) for f, analysis in zip(files, analyses) if analysis]
+            if measured:
+                album = compute_album_loudness([m[0] for m in measured], [m[1] for m in measured])
+                logging.info(f"Album loudness of {download_id}: {album['input_i']} LUFS, "
+                             f"peak {album['input_tp']} dBTP over {len(measured)} tracks")
+            else:
+                logging.warning(f"No loudness analysis for the tracks of {download_id}, normalizing them one by one")
+        
+        if album:
+            futures = [pool.submit(apply_album_gain, f, analysis, album, settings)
+                       for f, analysis in zip(files, analyses)]
+        else:
+            futures = [pool.submit(normalize_audio_volume, f, settings) for f in files]
+        mode = "album" if album else "track"
+        set_playlist_normalization(download_id, 0, len(files), mode)
+        for done, future in enumerate(as_completed(futures), 1):
+            if future.result():
+                normalized += 1
+            set_playlist_normalization(download_id, done, len(files), mode)
+    set_playlist_normalization(download_id, None)
+    logging.info(f"Normalized {normalized} of {len(files)} tracks of {download_id} ({mode} gain)")
+    return normalized
+
+# Post-download audio processing time per pipeline, to compare the two modes:
+# 'two_pass' is yt-dlp's MP3 extraction plus normalize_audio_volume (two encodes),
+# 'single_pass' is transcode_native_audio from the native stream (one encode)
+audio_pipeline_stats = {
+    'two_pass': {'tracks': 0, 'seconds': 0.0},
+    'single_pass': {'tracks': 0, 'seconds': 0.0},
+}
+audio_pipeline_lock = threading.Lock()
+
+def record_audio_pipeline_time(mode: str, seconds: float, tracks: int = 1):
+    """Add the processing time of finished tracks to the pipeline statistics"""
+    with audio_pipeline_lock:
+        audio_pipeline_stats[mode]['tracks'] += tracks
+        audio_pipeline_stats[mode]['seconds'] += seconds
+    logging.info(f"Audio processing ({mode}) took {seconds / max(tracks, 1):.2f}s per track")
+
+def get_audio_pipeline_stats() -> dict:
+    """Average processing time per track for each pipeline and the time saved"""
+    with audio_pipeline_lock:
+        stats = {mode: dict(values) for mode, values in audio_pipeline_stats.items()}
+    for values in stats.values():
+        values['seconds_per_track'] = values['seconds'] / values['tracks'] if values['tracks'] else None
+    two_pass = stats['two_pass']['seconds_per_track']
+    single_pass = stats['single_pass']['seconds_per_track']
+    stats['saved_seconds_per_track'] = (
+        two_pass - single_pass if two_pass is not None and single_pass is not None else None
+    )
+    stats['loudness_analysis'] = dict(loudness_analysis_stats)
+    return stats
+
 def generate_filename_from_metadata(metadata: dict, download_id: str, fallback_title: str = None) -> str:
     """Generate a clean filename from MP3 metadata"""
     title = metadata.get('title') or fallback_title or "Unknown"
@@ -438,11 +952,250 @@ def get_playlist_id_from_url(url: str, platform: str) -> str:
         match = re.search(r'/playlist/([^/?#]+)', url)
         if match:
             return match.group(1)
+    elif platform == 'youtube':
+        # YouTube playlist: ...?list={playlist_id} or ...&list={playlist_id}
+        match = re.search(r'[?&]list=([^&#]+)', url)
+        if match:
+            return match.group(1)
     return 'unknown'
 
+def canonicalize_url(url: str) -> str:
+    """Reduce a URL to a platform content id, e.g. 'youtube:video:dQw4w9WgXcQ'
+
+    Different URLs for the same track or playlist (tracking parameters,
+    mobile hosts, short links, localized paths) map to the same id. Unknown
+    URL shapes fall back to the normalized URL itself.
+    """
+    import re
+    platform = get_platform(url)
+    parsed = urllib.parse.urlparse(url.strip())
+    host = (parsed.hostname or '').lower()
+    path = parsed.path.rstrip('/')
+    query = urllib.parse.parse_qs(parsed.query)
+    
+    if platform == 'youtube':
+        # Same rule as is_playlist_url uses to treat a URL as a playlist
+        if '/playlist' in path or ('v' in query and 'list' in query):
+            return f"youtube:playlist:{get_playlist_id_from_url(url, 'youtube')}"
+        if 'v' in query:
+            return f"youtube:video:{query['v'][0]}"
+        if host.endswith('youtu.be') and path:
+            return f"youtube:video:{path.lstrip('/').split('/')[0]}"
+        match = re.match(r'/(?:shorts|embed|live|v)/([^/]+)', path)
+        if match:
+            return f"youtube:video:{match.group(1)}"
+    elif platform == 'spotify':
+        # open.spotify.com/intl-de/track/{id} -> spotify:track:{id}
+        match = re.search(r'/(track|album|playlist|artist|episode|show)/([A-Za-z0-9]+)', path)
+        if match:
+            return f"spotify:{match.group(1)}:{match.group(2)}"
+    elif platform == 'soundcloud' and host != 'on.soundcloud.com':
+        parts = [part.lower() for part in path.split('/') if part]
+        if len(parts) >= 3 and parts[1] == 'sets':
+            return f"soundcloud:set:{parts[0]}/{parts[2]}"
+        if len(parts) >= 2:
+            return f"soundcloud:track:{parts[0]}/{parts[1]}"
+    
+    # Fallback: scheme-less URL without query string or fragment
+    return f"{platform}:url:{host.removeprefix('www.').removeprefix('m.')}{path}"
+
+def get_audio_settings_key(settings: AudioSettings, album_gain: bool = False) -> str:
+    """Short fingerprint of the audio settings a file was processed with.
+    
+    album_gain marks playlist tracks that get their album's gain, so a
+    single download of the same track never reuses one of them.
+    """
+    import hashlib
+    fields = settings.model_dump()
+    if album_gain:
+        fields['album_pass'] = True
+    encoded = json.dumps(fields, sort_keys=True)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()[:16]
+
+def link_or_copy(src: str, dst: str):
+    """Hardlink a file (or every file in a playlist folder), copying across devices"""
+    def link_file(src_file, dst_file):
+        try:
+            os.link(src_file, dst_file)
+        except OSError:
+            shutil.copy2(src_file, dst_file)
+    
+    if os.path.isdir(src):
+        shutil.copytree(src, dst, copy_function=link_file)
+    else:
+        link_file(src, dst)
+
+def complete_from_cache(download_id: str, cached: dict) -> bool:
+    """Finish a new download instantly from an identical completed download"""
+    src = cached['file_path']
+    if not src or not os.path.exists(src):
+        return False
+    
+    # Same file name with the new download id, so each download owns its file
+    src_name = os.path.basename(src)
+    if cached['id'] in src_name:
+        dst_name = src_name.replace(cached['id'], download_id)
+    else:
+        stem, ext = os.path.splitext(src_name)
+        dst_name = f"{stem}-{download_id}{ext}"
+    dst = os.path.join(get_output_dir(download_id), dst_name)
+    
+    link_or_copy(src, dst)
+    if db:
+        db.update_title(download_id, cached.get('title'))
+        if cached.get('artist'):
+            db.update_artist(download_id, cached['artist'])
+        if cached.get('album'):
+            db.update_album(download_id, cached['album'])
+    update_download_status(download_id, "completed", 100, dst, cached.get('file_size'))
+    logging.info(f"Completed {download_id} from cached download {cached['id']}: {dst}")
+    return True
+
+# Resolved metadata is reused for this many seconds; YouTube stream URLs in a
+# saved info JSON stay valid for several hours
+METADATA_CACHE_TTL = 1800
+
+# Leftover info files are cleared by initialize_backend
+metadata_cache = MetadataCache(Path.home() / ".all-dlp" / "info-cache", ttl=METADATA_CACHE_TTL)
+
+def resolve_with_yt_dlp(url: str, platform: str, is_playlist: bool, info_file: Path = None) -> dict:
+    """Probe a YouTube/SoundCloud URL once with yt-dlp --dump-single-json"""
+    cmd = [get_tool_path('yt-dlp'), url, "--dump-single-json"]
+    cmd.append("--flat-playlist" if is_playlist else "--no-playlist")
+    result = subprocess.run(cmd, capture_output=True, text=True, env=get_env_with_ffmpeg())
+    if result.returncode != 0:
+        logging.warning(f"[yt-dlp dump-json] failed for {url}: {result.stderr.strip()}")
+        if is_throttle_message(result.stderr):
+            rate_limiter.record_throttle(platform)
+        return None
+    
+    info = json.loads(result.stdout)
+    thumbnails = info.get('thumbnails') or [{}]
+    metadata = {
+        'title': info.get('track') or info.get('title'),
+        'artist': info.get('artist') or info.get('creator') or info.get('uploader'),
+        'album': info.get('album'),
+        'duration': info.get('duration'),
+        'thumbnail': info.get('thumbnail') or thumbnails[-1].get('url'),
+    }
+    if is_playlist:
+        tracks = []
+        for entry in info.get('entries') or []:
+            if not entry:
+                continue
+            track_url = entry.get('webpage_url') or entry.get('url')
+            if platform == 'youtube' and entry.get('id') and not (track_url or '').startswith('http'):
+                track_url = f"https://www.youtube.com/watch?v={entry['id']}"
+            if track_url:
+                tracks.append({'url': track_url, 'title': entry.get('title'), 'duration': entry.get('duration')})
+        metadata['tracks'] = tracks
+    elif info_file:
+        # The download loads this instead of extracting the page again
+        with open(info_file, 'w', encoding='utf-8') as f:
+            f.write(result.stdout)
+        metadata['info_file'] = str(info_file)
+    return metadata
+
+def spotdl_song_metadata(song: dict) -> dict:
+    """Metadata of one song from a spotdl save file"""
+    artists = ", ".join(song.get('artists') or [])
+    return {
+        'title': f"{artists} - {song.get('name')}" if artists else song.get('name'),
+        'artist': song.get('artist'),
+        'album': song.get('album_name'),
+        'duration': song.get('duration'),
+        'thumbnail': song.get('cover_url'),
+    }
+
+def resolve_with_spotdl(url: str, is_playlist: bool, info_file: Path) -> dict:
+    """Fetch Spotify metadata once with spotdl save (no download)"""
+    result = subprocess.run([
+        get_tool_path('spotdl'), "save", url.split('?')[0], "--save-file", str(info_file)
+    ], capture_output=True, text=True, env=get_env_with_ffmpeg())
+    if result.returncode != 0 or not os.path.exists(info_file):
+        logging.warning(f"[spotdl save] failed for {url}: {result.stderr.strip()}")
+        if is_throttle_message(result.stdout + result.stderr):
+            rate_limiter.record_throttle('spotify')
+        return None
+    with open(info_file, encoding='utf-8') as f:
+        songs = json.load(f)
+    if not songs:
+        return None
+    
+    if not is_playlist:
+        metadata = spotdl_song_metadata(songs[0])
+        # spotdl downloads from this file without asking Spotify again
+        metadata['info_file'] = str(info_file)
+        return metadata
+    
+    tracks = []
+    for song in songs:
+        if not song.get('url'):
+            continue
+        track = spotdl_song_metadata(song)
+        tracks.append({'url': song['url'], 'title': track['title'], 'duration': track['duration']})
+        # Seed the cache so the track jobs of the playlist skip their own spotdl save
+        track_key = canonicalize_url(song['url'])
+        track_file = metadata_cache.info_path(track_key, '.spotdl')
+        with open(track_file, 'w', encoding='utf-8') as f:
+            json.dump([song], f)
+        track.update(url=song['url'], platform='spotify', canonical_id=track_key, is_playlist=False,
+                     resolved_at=time.time(), info_file=str(track_file))
+        metadata_cache.put(track_key, track)
+    os.remove(info_file)
+    return {
+        'title': songs[0].get('list_name'),
+        'artist': None,
+        'album': None,
+        'duration': sum(song.get('duration') or 0 for song in songs),
+        'thumbnail': songs[0].get('cover_url'),
+        'tracks': tracks,
+    }
+
+def resolve_metadata(url: str, platform: str = None):
+    """Get title, artist, duration and thumbnail of a URL, probing it at most once per TTL
+    
+    Returns (metadata, cached); metadata is None if the URL could not be
+    resolved. The metadata dict is shared and must not be modified.
+    """
+    platform = platform or get_platform(url)
+    key = canonicalize_url(url)
+    is_playlist = is_playlist_url(url, platform)
+    
+    def resolver():
+        rate_limiter.acquire(platform)
+        if platform == 'spotify':
+            metadata = resolve_with_spotdl(url, is_playlist, metadata_cache.info_path(key, '.spotdl'))
+        else:
+            info_file = metadata_cache.info_path(key) if platform == 'youtube' else None
+            metadata = resolve_with_yt_dlp(url, platform, is_playlist, info_file)
+        if metadata:
+            metadata.update(url=url, platform=platform, canonical_id=key, is_playlist=is_playlist,
+                            resolved_at=time.time())
+        return metadata
+    
+    return metadata_cache.get_or_resolve(key, resolver)
+
+def copy_info_file(resolved: dict, temp_dir: Path):
+    """Copy the resolved info file into a download's temp dir, or None if there is none"""
+    info_file = resolved.get('info_file') if resolved else None
+    if not info_file or not os.path.exists(info_file):
+        return None
+    # A private copy, so the cache may expire the original mid-download
+    local_file = temp_dir / f"resolved{Path(info_file).suffix}"
+    shutil.copy2(info_file, local_file)
+    return local_file
+
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy", "message": "API server is running"}
+    # Answers while the backend is still starting; `ready` tells whether other requests would wait
+    return {
+        "status": "healthy",
+        "message": "API server is running",
+        "ready": startup_complete.is_set(),
+        "startup": startup_times,
+        "tools": tool_registry.snapshot(),
+    }
 
 @app.post("/api/download", response_model=DownloadResponse)
 async def start_download(request: DownloadRequest):
@@ -451,362 +1204,524 @@ async def start_download(request: DownloadRequest):
         download_id = str(uuid.uuid4())
         platform = get_platform(request.url)
         
+        if platform not in BACKENDS:
+            raise HTTPException(status_code=400, detail="Unsupported platform")
+        
+        canonical_id = canonicalize_url(request.url)
+        settings_key = get_audio_settings_key(load_audio_settings())
+        
+        if db and not request.force:
+            # Join a job for the same content that is still running
+            active = db.find_active_download(canonical_id, settings_key)
+            if active:
+                return DownloadResponse(
+                    id=active['id'],
+                    url=active['url'],
+                    status="joined",
+                    message="The same download is already in progress"
+                )
+        
         # Add to database
         if db:
-            db.addDownload(download_id, request.url, platform)
-        
-        # Start download in background thread
-        start_time = time.time()
+            db.addDownload(download_id, request.url, platform,
+                           canonical_id=canonical_id, settings_key=settings_key)
         
-        if platform == 'youtube':
-            thread = threading.Thread(target=download_youtube_sync, args=(request.url, download_id, start_time))
-        elif platform == 'spotify':
-            thread = threading.Thread(target=download_spotify_sync, args=(request.url, download_id, start_time))
-        elif platform == 'soundcloud':
-            thread = threading.Thread(target=download_soundcloud_sync, args=(request.url, download_id, start_time))
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported platform")
+        if db and not request.force:
+            # Reuse the file of an identical completed download; copying across devices can take a while
+            for cached in db.find_cached_downloads(canonical_id, settings_key):
+                if await asyncio.to_thread(complete_from_cache, download_id, cached):
+                    return DownloadResponse(
+                        id=download_id,
+                        url=request.url,
+                        status="completed",
+                        message="Download completed from cache"
+                    )
         
-        thread.daemon = True
-        thread.start()
+        # Queue the download; a worker picks it up when a slot is free
+        scheduler.submit(download_id, request.url, platform, request.priority)
+        event_bus.publish(download_id, status="queued", progress=0)
         
         return DownloadResponse(
             id=download_id,
             url=request.url,
-            status="started",
-            message="Download started successfully"
+            status="queued",
+            message="Download queued successfully"
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         if db:
             db.updateStatus(download_id, "failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
-def download_youtube_sync(url: str, download_id: str, start_time: float):
+# Per-job startup latency (until yt-dlp's first output) and memory of each YouTube engine
+youtube_engine_stats = {
+    'subprocess': {'jobs': 0, 'startup_seconds': 0.0, 'rss_jobs': 0, 'rss_kb': 0},
+    'library': {'jobs': 0, 'startup_seconds': 0.0, 'rss_jobs': 0, 'rss_kb': 0},
+}
+youtube_engine_lock = threading.Lock()
+
+def record_youtube_engine_job(engine: str, startup_seconds: float, rss_kb: int = None):
+    """Add one finished job to the engine statistics"""
+    with youtube_engine_lock:
+        stats = youtube_engine_stats[engine]
+        stats['jobs'] += 1
+        stats['startup_seconds'] += startup_seconds
+        if rss_kb:
+            stats['rss_jobs'] += 1
+            stats['rss_kb'] += rss_kb
+    logging.info(f"yt-dlp {engine} job: started in {startup_seconds:.2f}s, memory {rss_kb or '?'} KB")
+
+def get_youtube_engine_stats() -> dict:
+    """Average startup latency and memory per job for both YouTube engines"""
+    result = {}
+    with youtube_engine_lock:
+        for engine, stats in youtube_engine_stats.items():
+            result[engine] = {
+                'jobs': stats['jobs'],
+                'startup_seconds_per_job': stats['startup_seconds'] / stats['jobs'] if stats['jobs'] else None,
+                'rss_kb_per_job': stats['rss_kb'] // stats['rss_jobs'] if stats['rss_jobs'] else None,
+            }
+    result['library_available'] = YtDlpEngine.available()
+    result['pool'] = youtube_engine.stats()
+    return result
+
+def parse_download_speed(output: str):
+    """Bytes per second from a yt-dlp progress line ("... at 1.50MiB/s ..."), or None"""
+    import re
+    match = re.search(r' at\s+([\d.]+)([KMG]?i?B)/s', output)
+    if not match:
+        return None
+    units = {'B': 1, 'KiB': 1024, 'MiB': 1024 ** 2, 'GiB': 1024 ** 3, 'KB': 1000, 'MB': 1000 ** 2, 'GB': 1000 ** 3}
+    return float(match.group(1)) * units.get(match.group(2), 1)
+
+def run_yt_dlp_executable(job: DownloadJob, info_file: Path, output_template: str, single_pass: bool) -> int:
+    """Run the yt-dlp executable, parsing progress from its output.
+    
+    Returns the exit code; sets the job's MP3 extraction time and whether
+    YouTube throttled the download.
+    """
+    # --continue resumes .part files and fragments left in temp_dir by an interrupted run
+    yt_dlp_path = get_tool_path('yt-dlp')
+    if info_file:
+        cmd = [yt_dlp_path, "--load-info-json", str(info_file), "--output", output_template, "--continue"]
+    else:
+        cmd = [yt_dlp_path, job.url, "--output", output_template, "--continue"]
+    if not job.is_playlist:
+        cmd.append("--no-playlist")
+    if single_pass:
+        # Keep the native audio stream; the only encode happens in transcode_audio
+        cmd += ["--format", "bestaudio/best"]
+    else:
+        cmd += ["--extract-audio", "--audio-format", "mp3", "--audio-quality", "0"]
+    if job.rate_limit:
+        cmd += ["--limit-rate", str(job.rate_limit)]
+    started = time.monotonic()
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                               env=get_env_with_ffmpeg())
+    
+    # Time spent in yt-dlp's MP3 extraction, for the pipeline statistics
+    first_output = None
+    extract_started = None
+    extract_seconds = 0.0
+    for output in process.stdout:
+        log_tool_output('yt-dlp', output, job.download_id)
+        now = time.monotonic()
+        if first_output is None:
+            first_output = now
+        if extract_started is not None:
+            extract_seconds += now - extract_started
+            extract_started = None
+        if output.startswith("[ExtractAudio] Destination"):
+            extract_started = now
+        if is_throttle_message(output):
+            job.throttled = True
+        if "[download]" in output and "%" in output:
+            speed = parse_download_speed(output)
+            if speed is not None:
+                bandwidth.report_speed(job.download_id, speed)
+            try:
+                percent = float(output.split("%")[0].split()[-1])
+                update_download_status(job.download_id, "downloading", percent)
+            except:
+                pass
+    if extract_started is not None:
+        extract_seconds += time.monotonic() - extract_started
+    
+    # Reap the process ourselves to get its peak memory
+    rss_kb = None
+    if hasattr(os, 'wait4'):
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        # Bytes on macOS, KB elsewhere
+        rss_kb = usage.ru_maxrss // 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+    else:
+        process.wait()
+    record_youtube_engine_job('subprocess', (first_output or time.monotonic()) - started, rss_kb)
+    job.extract_seconds = extract_seconds
+    return process.returncode
+
+def run_yt_dlp_library(job: DownloadJob, info_file: Path, output_template: str, single_pass: bool) -> int:
+    """Run yt-dlp in a warm worker process of the library engine.
+    
+    Works like run_yt_dlp_executable; raises EngineError if the worker fails.
+    """
+    options = {
+        'outtmpl': output_template,
+        'continuedl': True,
+        'noplaylist': not job.is_playlist,
+        'format': 'bestaudio/best',
+    }
+    if not single_pass:
+        options['postprocessors'] = [
+            {'key': 'FFmpegExtractAudio', 'preferredcodec': 'mp3', 'preferredquality': '0'},
+        ]
+    
+    started = time.monotonic()
+    first_event = None
+    extract_started = None
+    extract_seconds = 0.0
+    
+    def on_event(event):
+        nonlocal first_event, extract_started, extract_seconds
+        if first_event is None:
+            first_event = time.monotonic()
+        if event['event'] == 'log':
+            level = logging.WARNING if event['level'] in ('warning', 'error') else None
+            log_tool_output('yt-dlp', event['message'], job.download_id, level)
+            if is_throttle_message(event['message'], error=event['level'] in ('warning', 'error')):
+                job.throttled = True
+        elif event['event'] == 'progress':
+            bandwidth.report_speed(job.download_id, event['speed'])
+            if event['status'] == 'downloading' and event['percent'] is not None:
+                update_download_status(job.download_id, "downloading", round(event['percent'], 1))
+        elif event['event'] == 'postprocess' and 'ExtractAudio' in (event['postprocessor'] or ''):
+            if event['status'] == 'started':
+                extract_started = time.monotonic()
+            elif event['status'] == 'finished' and extract_started is not None:
+                extract_seconds += time.monotonic() - extract_started
+                extract_started = None
+    
+    # The worker follows the share of the global budget while the download runs
+    rate = bandwidth.watch(job.download_id, lambda rate: youtube_engine.set_rate(job.download_id, rate))
+    if rate:
+        options['ratelimit'] = rate
     try:
+        result = youtube_engine.run(options, on_event, url=job.url, info_file=str(info_file) if info_file else None,
+                                    job_id=job.download_id)
+    finally:
+        # No rate changes once the worker is done; a fallback to the executable keeps the last share
+        job.rate_limit = bandwidth.unwatch(job.download_id)
+        youtube_engine.discard(job.download_id)
+    if result.get('error'):
+        logging.error(f"[yt-dlp] {result['error']}")
+        if is_throttle_message(result['error'], error=True):
+            job.throttled = True
+    record_youtube_engine_job('library', (first_event or time.monotonic()) - started, result.get('rss_kb'))
+    job.extract_seconds = extract_seconds
+    return result['returncode']
+
+# Extractor requests per second of each platform: start rate, burst and the
+# range the rate adapts within (AIMD on successful and throttled downloads)
+PLATFORM_RATE_LIMITS = {
+    'youtube': {'rate': 0.5, 'burst': 4, 'min_rate': 0.02, 'max_rate': 2.0},
+    'spotify': {'rate': 1.0, 'burst': 5, 'min_rate': 0.05, 'max_rate': 3.0},
+    'soundcloud': {'rate': 0.5, 'burst': 4, 'min_rate': 0.02, 'max_rate': 2.0},
+}
+
+# A throttled fetch is retried this many times, after exponential backoff
+FETCH_THROTTLE_RETRIES = 3
+FETCH_BACKOFF_BASE = 5.0
+FETCH_BACKOFF_CAP = 120.0
+
+rate_limiter = RateLimiter(PLATFORM_RATE_LIMITS)
+
+class AudioBackend(DownloadBackend):
+    """Resolve, postprocess and finalize stages shared by all platforms"""
+    
+    # Extractor takes a rate limit; other downloads get no share of the bandwidth budget
+    limits_rate = True
+    
+    def resolve(self, job: DownloadJob):
+        job.temp_dir.mkdir(exist_ok=True)
+        job.is_playlist = is_playlist_url(job.url, job.platform)
+        job.settings = load_audio_settings()
+        job.album_gain = uses_album_gain(job.settings) and (
+            job.is_playlist or playlist_parents.get(job.download_id) in album_gain_playlists)
+        if job.is_playlist:
+            # For playlists, use a generic title instead of individual track titles
+            playlist_id = get_playlist_id_from_url(job.url, job.platform)
+            job.title = f"{PLAYLIST_TITLES[job.platform]} ({playlist_id})"
+        else:
+            # Usually already cached by /api/resolve or the playlist expansion
+            job.resolved, _ = resolve_metadata(job.url, job.platform)
+            job.title = "Unknown Title"
+            if job.resolved and job.resolved.get('title'):
+                job.title = clean_extracted_title(job.resolved['title'])
         if db:
-            db.updateStatus(download_id, "downloading", 0)
-        yt_dlp_path = get_tool_path('yt-dlp')
-        env = get_env_with_ffmpeg()
-        temp_dir = DOWNLOADS_DIR / f"tmp-{download_id}"
-        temp_dir.mkdir(exist_ok=True)
+            db.update_title(job.download_id, job.title)
+    
+    @abstractmethod
+    def download(self, job: DownloadJob):
+        """Run the platform's extractor once; sets job.throttled if the platform throttled it"""
+    
+    def fetch(self, job: DownloadJob):
+        for attempt in range(FETCH_THROTTLE_RETRIES + 1):
+            waited = rate_limiter.acquire(self.platform)
+            if waited:
+                logging.info(f"Rate limit: {job.download_id} waited {waited:.1f}s for {self.platform}")
+            job.throttled = False
+            try:
+                job.rate_limit = bandwidth.register(job.download_id) if self.limits_rate else None
+                try:
+                    self.download(job)
+                finally:
+                    bandwidth.release(job.download_id)
+            except PipelineError:
+                if not job.throttled:
+                    raise
+            else:
+                if job.throttled:
+                    rate_limiter.record_throttle(self.platform)
+                else:
+                    rate_limiter.record_success(self.platform)
+                return
+            rate_limiter.record_throttle(self.platform)
+            if attempt == FETCH_THROTTLE_RETRIES:
+                raise PipelineError(f"Rate limited by {self.platform}, gave up after {attempt + 1} attempts")
+            # Holds the download slot while waiting, which is what a throttled platform needs
+            delay = backoff_delay(attempt, FETCH_BACKOFF_BASE, FETCH_BACKOFF_CAP)
+            logging.warning(f"{self.platform} throttled {job.download_id}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+    
+    def postprocess(self, job: DownloadJob):
+        if job.native_audio:
+            # Album gain needs all tracks first; otherwise the transcode normalizes each track
+            track_settings = AudioSettings(normalize_loudness=False, volume_boost=1.0) if job.album_gain else job.settings
+            started = time.monotonic()
+            converted = transcode_native_audio(job.temp_dir, track_settings)
+            if converted and not job.album_gain:
+                record_audio_pipeline_time('single_pass', time.monotonic() - started, converted)
+            job.processed = not job.album_gain
+        
+        job.files = sorted(job.temp_dir.glob('*.mp3'))
+        if not job.files or len(job.files) > 1 and not job.is_playlist:
+            raise PipelineError("No mp3 file found in temp dir")
+        if job.is_playlist:
+            # In tags mode the transcode only wrote track tags; the album tags need all tracks
+            if not job.processed or job.settings.album_gain and job.settings.normalize_loudness:
+                normalize_playlist(job.download_id, job.files, job.settings)
+            return
+        if job.processed or job.album_gain:
+            # Normalized already, or by the album gain pass once the playlist's last track is done
+            return
+        
+        # Normalize and amplify audio volume before the file is moved into place
+        logging.info(f"Starting audio normalization for {job.files[0]}")
+        started = time.monotonic()
+        if normalize_audio_volume(str(job.files[0]), job.settings):
+            logging.info(f"Audio normalization completed successfully")
+            if job.extract_seconds is not None:
+                record_audio_pipeline_time('two_pass', job.extract_seconds + time.monotonic() - started)
+        else:
+            logging.warning(f"Audio normalization failed, keeping original file")
+    
+    def finalize(self, job: DownloadJob):
+        if job.is_playlist:
+            # For playlists, move the entire folder
+            final_folder = get_playlist_folder(job.download_id, job.platform)
+            shutil.move(str(job.temp_dir), str(final_folder))
+            file_size = sum(f.stat().st_size for f in final_folder.glob('*.mp3'))
+            if library_index is not None:
+                library_index.scan(final_folder)
+            update_download_status(job.download_id, "completed", 100, str(final_folder), file_size)
+            return
         
-        # Detect if this is a playlist
-        is_playlist = '/playlist?' in url or '/watch?v=' in url and '&list=' in url
-        playlist_id = get_playlist_id_from_url(url, 'youtube') if is_playlist else None
+        src_file = job.files[0]
+        # Extract metadata from the downloaded MP3 file
+        metadata = extract_mp3_metadata(str(src_file))
+        logging.info(f"Extracted metadata: {metadata}")
         
-        title_process = subprocess.run([
-            yt_dlp_path, url, "--no-playlist", "--get-title"
-        ], capture_output=True, text=True, env=env)
-        logging.info(f"[yt-dlp get-title] stdout: {title_process.stdout}")
-        logging.info(f"[yt-dlp get-title] stderr: {title_process.stderr}")
-        flush_logs()
-        title = "Unknown Title"
-        if title_process.returncode == 0:
-            raw_title = title_process.stdout.strip()
-            title = clean_extracted_title(raw_title)
+        # Generate filename from metadata and move the file to its final location
+        final_name = generate_filename_from_metadata(metadata, job.download_id, job.title)
+        final_path = get_output_dir(job.download_id) / final_name
+        shutil.move(str(src_file), str(final_path))
+        file_size = final_path.stat().st_size
+        if library_index is not None:
+            # The tags were just read; a rename keeps size, mtime and inode
+            library_index.move(src_file, final_path)
         
-        # For playlists, use a generic title instead of individual track titles
-        if is_playlist:
-            title = f"YouTube Playlist ({playlist_id})" if playlist_id else "YouTube Playlist"
+        # Update database with metadata if available
+        if metadata.get('artist') and db:
+            db.update_artist(job.download_id, metadata['artist'])
+        if metadata.get('album') and db:
+            db.update_album(job.download_id, metadata['album'])
         
-            if db:
-                db.update_title(download_id, title)
-        if is_playlist:
+        update_download_status(job.download_id, "completed", 100, str(final_path), file_size)
+
+class YouTubeBackend(AudioBackend):
+    platform = 'youtube'
+    
+    def download(self, job: DownloadJob):
+        # Without FFmpeg yt-dlp can't extract MP3 either, but the native stream is no better
+        single_pass = job.settings.single_pass and tool_registry.has('ffmpeg')
+        if job.is_playlist:
             # For playlists, download all tracks
-            output_template = str(temp_dir / f"%(title)s.%(ext)s")
-            process = subprocess.Popen([
-                yt_dlp_path, url,
-                "--output", output_template,
-                "--extract-audio",
-                "--audio-format", "mp3",
-                "--audio-quality", "0"
-            ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=env)
-        else:
-            # For single tracks, use the original logic
-            output_template = str(temp_dir / f"download.%(ext)s")
-            
-        process = subprocess.Popen([
-            yt_dlp_path, url,
-            "--no-playlist",
-            "--output", output_template,
-            "--extract-audio",
-            "--audio-format", "mp3",
-            "--audio-quality", "0"
-        ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=env)
-        while True:
-            output = process.stdout.readline()
-            if output == '' and process.poll() is not None:
-                break
-            if output:
-                logging.info(f"[yt-dlp] {output.strip()}")
-                flush_logs()
-            if output and "[download]" in output and "%" in output:
-                try:
-                    percent = float(output.split("%")[0].split()[-1])
-                    if db:
-                        db.updateStatus(download_id, "downloading", percent)
-                except:
-                    pass
-        if process.returncode == 0:
-            mp3_files = list(temp_dir.glob('*.mp3'))
-            if is_playlist and len(mp3_files) > 1:
-                # For playlists, move the entire folder
-                folder_name = f"youtube-playlist-{download_id}"
-                final_folder = DOWNLOADS_DIR / folder_name
-                shutil.move(str(temp_dir), str(final_folder))
-                file_size = sum(f.stat().st_size for f in final_folder.glob('*.mp3'))
-                if db:
-                    db.updateStatus(download_id, "completed", 100, str(final_folder), file_size)
-            elif len(mp3_files) == 1:
-                src_file = mp3_files[0]
-                
-                # Extract metadata from the downloaded MP3 file
-                metadata = extract_mp3_metadata(str(src_file))
-                logging.info(f"Extracted metadata: {metadata}")
-                
-                # Generate filename from metadata
-                final_name = generate_filename_from_metadata(metadata, download_id, title)
-                final_path = DOWNLOADS_DIR / final_name
-                
-                # Move file to final location
-                shutil.move(str(src_file), str(final_path))
-                
-                # Normalize and amplify audio volume
-                logging.info(f"Starting audio normalization for {final_path}")
-                if normalize_audio_volume(str(final_path)):
-                    logging.info(f"Audio normalization completed successfully")
-                else:
-                    logging.warning(f"Audio normalization failed, keeping original file")
-                
-                file_size = final_path.stat().st_size
-                
-                # Update database with metadata if available
-                if metadata.get('artist') and db:
-                    db.update_artist(download_id, metadata['artist'])
-                if metadata.get('album') and db:
-                    db.update_album(download_id, metadata['album'])
-                
-                if db:
-                    db.updateStatus(download_id, "completed", 100, str(final_path), file_size)
-            else:
-                if db:
-                    db.updateStatus(download_id, "failed", error="No mp3 file found in temp dir")
+            output_template = str(job.temp_dir / f"%(title)s.%(ext)s")
         else:
-            if db:
-                db.updateStatus(download_id, "failed", error="Download failed")
-        shutil.rmtree(temp_dir, ignore_errors=True)
-    except Exception as e:
-        logging.exception(f"Exception in download_youtube_sync: {e}")
-        flush_logs()
-        if db:
-            db.updateStatus(download_id, "failed", error=str(e))
-        shutil.rmtree(temp_dir, ignore_errors=True)
-
-def download_spotify_sync(url: str, download_id: str, start_time: float):
-    try:
-        if db:
-            db.updateStatus(download_id, "downloading", 0)
-        spotdl_path = get_tool_path('spotdl')
-        env = get_env_with_ffmpeg()
-        temp_dir = DOWNLOADS_DIR / f"tmp-{download_id}"
-        temp_dir.mkdir(exist_ok=True)
-        clean_url = url.split('?')[0]
-        # Detect playlist
-        is_playlist = '/playlist/' in clean_url
-        playlist_id = get_playlist_id_from_url(clean_url, 'spotify') if is_playlist else None
-        # Get title
-        title = "Unknown Title"
-        title_process = subprocess.run([
-            spotdl_path, clean_url, "--print-errors"
-        ], capture_output=True, text=True, env=env)
-        logging.info(f"[spotdl get-title] stdout: {title_process.stdout}")
-        logging.info(f"[spotdl get-title] stderr: {title_process.stderr}")
-        flush_logs()
-        if title_process.returncode == 0:
-            for line in title_process.stdout.strip().split('\n'):
-                if ' - ' in line and not line.startswith('Found') and not line.startswith('Error'):
-                    raw_title = line.strip()
-                    title = clean_extracted_title(raw_title)
-                    break
+            output_template = str(job.temp_dir / f"download.%(ext)s")
         
-        # For playlists, use a generic title instead of individual track titles
-        if is_playlist:
-            title = f"Playlist ({playlist_id})" if playlist_id else "Playlist"
-        
-        if db:
-            db.update_title(download_id, title)
-        # Download to temp dir
-        process = subprocess.Popen([
-            spotdl_path, clean_url, "--output", str(temp_dir)
-        ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=env)
+        info_file = None if job.is_playlist else copy_info_file(job.resolved, job.temp_dir)
+        returncode = None
+        if load_download_settings().youtube_engine == "library" and YtDlpEngine.available():
+            try:
+                returncode = run_yt_dlp_library(job, info_file, output_template, single_pass)
+            except EngineError as e:
+                logging.warning(f"yt-dlp library engine failed, falling back to the executable: {e}")
+        if returncode is None:
+            if not tool_registry.has('yt-dlp'):
+                raise PipelineError("yt-dlp is not installed")
+            returncode = run_yt_dlp_executable(job, info_file, output_template, single_pass)
+        if returncode != 0:
+            if info_file:
+                # The saved stream URLs may have expired; resolve again next time
+                metadata_cache.invalidate(canonicalize_url(job.url))
+            raise PipelineError("Download failed")
+        # Single pass keeps the native stream; the only encode happens in postprocess
+        job.native_audio = single_pass
+
+class SpotifyBackend(AudioBackend):
+    platform = 'spotify'
+    
+    def download(self, job: DownloadJob):
+        # Download to temp dir, from the saved song metadata when available
+        if not tool_registry.has('spotdl'):
+            raise PipelineError("spotdl is not installed")
+        info_file = None if job.is_playlist else copy_info_file(job.resolved, job.temp_dir)
+        cmd = [get_tool_path('spotdl'), str(info_file or job.url.split('?')[0]), "--output", str(job.temp_dir)]
+        audio_filter = build_audio_filter(job.settings)
+        # A measured normalization needs the downloaded file and album gain all tracks, so only a
+        # dynamic or volume-only filter can run without an analysis
+        without_analysis = job.settings.normalization_mode == "dynamic" or not job.settings.normalize_loudness
+        if (job.settings.single_pass and not job.is_playlist and not job.album_gain and without_analysis
+                and audio_filter and tool_registry.has('spotdl', 'ffmpeg-args')):
+            # Apply the audio filter in spotdl's own MP3 conversion instead of re-encoding afterwards
+            cmd += ["--ffmpeg-args", f"-af {audio_filter}"]
+            job.processed = True
+        if job.rate_limit and tool_registry.has('spotdl', 'yt-dlp-args'):
+            # spotdl downloads through yt-dlp
+            cmd += ["--yt-dlp-args", f"--limit-rate {job.rate_limit}"]
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                   env=get_env_with_ffmpeg())
         ffmpeg_error = None
-        while True:
-            output = process.stdout.readline()
-            if output == '' and process.poll() is not None:
-                break
-            if output:
-                logging.info(f"[spotdl] {output.strip()}")
-                flush_logs()
-                # Detect FFmpegError in output
-                if "FFmpegError" in output:
-                    ffmpeg_error = output.strip()
+        for output in process.stdout:
+            log_tool_output('spotdl', output, job.download_id)
+            if is_throttle_message(output):
+                job.throttled = True
+            # Detect FFmpegError in output
+            if "FFmpegError" in output:
+                ffmpeg_error = output.strip()
         process.wait()
         if ffmpeg_error:
-            if db:
-                db.updateStatus(download_id, "failed", error=ffmpeg_error)
-            shutil.rmtree(temp_dir, ignore_errors=True)
-            return
-        if process.returncode == 0:
-            mp3_files = list(temp_dir.glob('*.mp3'))
-            if is_playlist:
-                # For playlist, move the folder and keep it
-                folder_name = f"spotify-playlist-{download_id}"
-                final_folder = DOWNLOADS_DIR / folder_name
-                shutil.move(str(temp_dir), str(final_folder))
-                file_size = sum(f.stat().st_size for f in final_folder.glob('*.mp3'))
-                if db:
-                    db.updateStatus(download_id, "completed", 100, str(final_folder), file_size)
-                # Notify user in API response (handled by status/file_path)
-            elif len(mp3_files) == 1:
-                src_file = mp3_files[0]
-                
-                # Extract metadata from the downloaded MP3 file
-                metadata = extract_mp3_metadata(str(src_file))
-                logging.info(f"Extracted metadata: {metadata}")
-                
-                # Generate filename from metadata
-                final_name = generate_filename_from_metadata(metadata, download_id, title)
-                final_path = DOWNLOADS_DIR / final_name
-                
-                # Move file to final location
-                shutil.move(str(src_file), str(final_path))
-                
-                # Normalize and amplify audio volume
-                logging.info(f"Starting audio normalization for {final_path}")
-                if normalize_audio_volume(str(final_path)):
-                    logging.info(f"Audio normalization completed successfully")
-                else:
-                    logging.warning(f"Audio normalization failed, keeping original file")
-                
-                file_size = final_path.stat().st_size
-                
-                # Update database with metadata if available
-                if metadata.get('artist') and db:
-                    db.update_artist(download_id, metadata['artist'])
-                if metadata.get('album') and db:
-                    db.update_album(download_id, metadata['album'])
-                
-                if db:
-                    db.updateStatus(download_id, "completed", 100, str(final_path), file_size)
-                shutil.rmtree(temp_dir, ignore_errors=True)
-            else:
-                if db:
-                    db.updateStatus(download_id, "failed", error="No mp3 file found in temp dir")
-                shutil.rmtree(temp_dir, ignore_errors=True)
-        else:
-            if db:
-                db.updateStatus(download_id, "failed", error="Download failed")
-            shutil.rmtree(temp_dir, ignore_errors=True)
-    except Exception as e:
-        logging.exception(f"Exception in download_spotify_sync: {e}")
-        flush_logs()
-        if db:
-            db.updateStatus(download_id, "failed", error=str(e))
-        shutil.rmtree(temp_dir, ignore_errors=True)
+            raise PipelineError(ffmpeg_error)
+        if process.returncode != 0:
+            raise PipelineError("Download failed")
 
-def download_soundcloud_sync(url: str, download_id: str, start_time: float):
-    try:
-        if db:
-            db.updateStatus(download_id, "downloading", 0)
-        scdl_path = get_tool_path('scdl')
-        env = get_env_with_ffmpeg()
-        temp_dir = DOWNLOADS_DIR / f"tmp-{download_id}"
-        shutil.rmtree(temp_dir, ignore_errors=True)
-        temp_dir.mkdir(exist_ok=True)
-        is_playlist = is_soundcloud_playlist(url)
-        playlist_id = get_playlist_id_from_url(url, 'soundcloud') if is_playlist else None
+class SoundCloudBackend(AudioBackend):
+    platform = 'soundcloud'
+    # scdl has no rate option
+    limits_rate = False
+    
+    def resolve(self, job: DownloadJob):
+        if is_playlist_url(job.url, job.platform):
+            super().resolve(job)
+        else:
+            # scdl names the file after the track; fetch takes the title from there
+            job.settings = load_audio_settings()
+            job.title = "Unknown Title"
+        # scdl cannot resume, start from an empty temp dir
+        shutil.rmtree(job.temp_dir, ignore_errors=True)
+        job.temp_dir.mkdir(exist_ok=True)
+    
+    def download(self, job: DownloadJob):
+        if not tool_registry.has('scdl'):
+            raise PipelineError("scdl is not installed")
         process = subprocess.Popen(
-            [scdl_path, "-l", url, "--path", str(temp_dir), "--overwrite", "--onlymp3"],
-            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=env
+            [get_tool_path('scdl'), "-l", job.url, "--path", str(job.temp_dir), "--overwrite", "--onlymp3"],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=get_env_with_ffmpeg()
         )
-        downloaded_file = None
-        title = "Unknown Title"
-        
-        # For playlists, use a generic title
-        if is_playlist:
-            title = f"SoundCloud Playlist ({playlist_id})" if playlist_id else "SoundCloud Playlist"
-        while True:
-            output = process.stdout.readline()
-            if output == '' and process.poll() is not None:
-                break
-            if output:
-                logging.info(f"[scdl] {output.strip()}")
-                flush_logs()
-            if output and output.strip().endswith(".mp3 Downloaded."):
+        for output in process.stdout:
+            log_tool_output('scdl', output, job.download_id)
+            if is_throttle_message(output):
+                job.throttled = True
+            if output.strip().endswith(".mp3 Downloaded.") and not job.is_playlist:
+                # Only extract title for single tracks, not playlists
                 filename = output.strip().replace(" Downloaded.", "")
-                downloaded_file = temp_dir / filename
-                if not is_playlist:
-                    # Only extract title for single tracks, not playlists
-                    raw_title = filename.rsplit(".mp3", 1)[0]
-                    title = clean_extracted_title(raw_title)
+                job.title = clean_extracted_title(filename.rsplit(".mp3", 1)[0])
         process.wait()
-        if process.returncode == 0:
-            mp3_files = list(temp_dir.glob('*.mp3'))
-            if is_playlist:
-                # For playlist, move the folder and keep it
-                folder_name = f"soundcloud-playlist-{download_id}"
-                final_folder = DOWNLOADS_DIR / folder_name
-                shutil.move(str(temp_dir), str(final_folder))
-                file_size = sum(f.stat().st_size for f in final_folder.glob('*.mp3'))
-                if db:
-                    db.updateStatus(download_id, "completed", 100, str(final_folder), file_size)
-                # Notify user in API response (handled by status/file_path)
-            elif len(mp3_files) == 1:
-                # Extract metadata from the downloaded MP3 file
-                metadata = extract_mp3_metadata(str(downloaded_file))
-                logging.info(f"Extracted metadata: {metadata}")
-                
-                # Generate filename from metadata
-                final_name = generate_filename_from_metadata(metadata, download_id, title)
-                final_path = DOWNLOADS_DIR / final_name
-                
-                # Move file to final location
-                shutil.move(str(downloaded_file), str(final_path))
-                
-                # Normalize and amplify audio volume
-                logging.info(f"Starting audio normalization for {final_path}")
-                if normalize_audio_volume(str(final_path)):
-                    logging.info(f"Audio normalization completed successfully")
-                else:
-                    logging.warning(f"Audio normalization failed, keeping original file")
-                
-                file_size = final_path.stat().st_size
-                
-                # Update database with metadata if available
-                if metadata.get('artist') and db:
-                    db.update_artist(download_id, metadata['artist'])
-                if metadata.get('album') and db:
-                    db.update_album(download_id, metadata['album'])
-                
-                if db:
-                    db.updateStatus(download_id, "completed", 100, str(final_path), file_size)
-                    db.update_title(download_id, title)
-                shutil.rmtree(temp_dir, ignore_errors=True)
-            else:
-                if db:
-                    db.updateStatus(download_id, "failed", error="No mp3 file found in temp dir or download failed")
-                shutil.rmtree(temp_dir, ignore_errors=True)
-        else:
-            if db:
-                db.updateStatus(download_id, "failed", error="No mp3 file found in temp dir or download failed")
-            shutil.rmtree(temp_dir, ignore_errors=True)
+        if process.returncode != 0:
+            raise PipelineError("No mp3 file found in temp dir or download failed")
+        if db and not job.is_playlist:
+            db.update_title(job.download_id, job.title)
+
+BACKENDS = {
+    'youtube': YouTubeBackend(),
+    'spotify': SpotifyBackend(),
+    'soundcloud': SoundCloudBackend(),
+}
+
+pipeline_stats = PipelineStats()
+
+# Post-processing (FFmpeg, tags, moving files) is CPU-bound; one worker per core, started by initialize_backend
+postprocess_pool = StagePool("postprocess", FFMPEG_PROCESSES)
+
+def run_job_stages(job: DownloadJob, stages) -> bool:
+    """Run pipeline stages of a job, marking the download failed if one fails"""
+    try:
+        run_stages(BACKENDS[job.platform], job, stages, pipeline_stats)
+        return True
+    except PipelineError as e:
+        update_download_status(job.download_id, "failed", error=str(e))
     except Exception as e:
-        logging.exception(f"Exception in download_soundcloud_sync: {e}")
-        flush_logs()
-        if db:
-            db.updateStatus(download_id, "failed", error=str(e))
-        shutil.rmtree(temp_dir, ignore_errors=True)
+        logging.exception(f"Exception in {job.platform} download pipeline: {e}")
+        update_download_status(job.download_id, "failed", error=str(e))
+    return False
+
+def process_download(job: DownloadJob, on_done=None):
+    """Postprocess and finalize a fetched download on the post-processing pool"""
+    try:
+        with download_context(job.download_id):
+            run_job_stages(job, PROCESS_STAGES)
+    finally:
+        shutil.rmtree(job.temp_dir, ignore_errors=True)
+        if on_done:
+            on_done()
+
+def run_backend(url: str, download_id: str, platform: str, on_done=None):
+    """Resolve and fetch a URL on this thread, then queue its post-processing.
+    
+    Returns once the fetch is done, freeing the download slot for the next
+    fetch. on_done is called after the download completed or failed.
+    """
+    job = DownloadJob(download_id, url, platform, DOWNLOADS_DIR / f"tmp-{download_id}")
+    update_download_status(download_id, "downloading", 0)
+    if run_job_stages(job, FETCH_STAGES):
+        postprocess_pool.submit(process_download, job, on_done)
+        return
+    shutil.rmtree(job.temp_dir, ignore_errors=True)
+    if on_done:
+        on_done()
+
+# Entry points of the former per-platform downloaders
+def download_youtube_sync(url: str, download_id: str, start_time: float):
+    run_backend(url, download_id, 'youtube')
+
+def download_spotify_sync(url: str, download_id: str, start_time: float):
+    run_backend(url, download_id, 'spotify')
+
+def download_soundcloud_sync(url: str, download_id: str, start_time: float):
+    run_backend(url, download_id, 'soundcloud')
 
 # Keep the old async functions for backward compatibility but they're not used
 async def download_youtube(url: str, download_id: str, start_time: float):
@@ -821,24 +1736,493 @@ async def download_soundcloud(url: str, download_id: str, start_time: float):
     """Download from SoundCloud using scdl"""
     download_soundcloud_sync(url, download_id, start_time)
 
+# A failed playlist track is queued again this many times before it counts as failed
+PLAYLIST_TRACK_RETRIES = 2
+
+# Seconds between aggregate progress updates of a playlist
+PLAYLIST_PROGRESS_INTERVAL = 1.0
+
+PLAYLIST_TITLES = {
+    'youtube': "YouTube Playlist",
+    'spotify': "Playlist",
+    'soundcloud': "SoundCloud Playlist",
+}
+
+playlist_parents = {}  # track download id -> playlist download id
+playlist_progress_times = {}  # playlist download id -> time of the last progress update
+album_gain_playlists = set()  # playlists whose tracks wait for an album gain pass
+playlist_normalization = {}  # playlist download id -> normalization progress
+playlist_lock = threading.Lock()
+
+def uses_album_gain(settings: AudioSettings) -> bool:
+    """Whether playlist tracks defer their loudness normalization to an album gain pass.
+    
+    Gain tags don't touch the audio, so in tags mode tracks are tagged
+    right away and the album pass only adds the album tags.
+    """
+    return settings.album_gain and settings.normalize_loudness and settings.normalization_mode != "tags"
+
+def set_playlist_normalization(download_id: str, done: int, total: int = None, mode: str = None):
+    """Report how many tracks of a playlist are normalized; done=None when finished"""
+    with playlist_lock:
+        if done is None:
+            playlist_normalization.pop(download_id, None)
+            return
+        progress = playlist_normalization[download_id] = {'done': done, 'total': total, 'mode': mode}
+    event_bus.publish(download_id, status="downloading", normalization=dict(progress))
+
+def is_playlist_url(url: str, platform: str) -> bool:
+    """Detect playlist URLs the same way the downloaders do"""
+    if platform == 'youtube':
+        return '/playlist?' in url or '/watch?v=' in url and '&list=' in url
+    if platform == 'spotify':
+        return '/playlist/' in url.split('?')[0]
+    if platform == 'soundcloud':
+        return is_soundcloud_playlist(url)
+    return False
+
+def get_playlist_folder(parent_id: str, platform: str) -> Path:
+    """Folder that holds the tracks of a playlist download"""
+    return DOWNLOADS_DIR / f"{platform}-playlist-{parent_id}"
+
+def get_output_dir(download_id: str) -> Path:
+    """Where a finished single-track download is moved to"""
+    download = db.get_download(download_id) if db else None
+    if download and download.get('parent_id'):
+        folder = get_playlist_folder(download['parent_id'], download['platform'])
+        folder.mkdir(exist_ok=True)
+        return folder
+    return DOWNLOADS_DIR
+
+def list_playlist_tracks(url: str, platform: str) -> list:
+    """List the tracks of a playlist (url and title) without downloading them"""
+    resolved, _ = resolve_metadata(url, platform)
+    return list(resolved.get('tracks') or []) if resolved else []
+
+def expand_playlist(download_id: str, url: str, platform: str) -> bool:
+    """Split a playlist download into one queued job per track.
+    
+    The playlist row becomes the parent of the track rows and finishes once
+    every track has. Returns False if the tracks could not be listed, in
+    which case the playlist is downloaded by a single extractor run.
+    """
+    tracks = list_playlist_tracks(url, platform)
+    if not tracks:
+        return False
+    
+    playlist = db.get_download(download_id)
+    priority = (playlist or {}).get('priority') or 0
+    playlist_id = get_playlist_id_from_url(url, platform)
+    db.update_title(download_id, f"{PLAYLIST_TITLES[platform]} ({playlist_id})")
+    
+    # Tracks of an earlier run of this playlist (redownload) are replaced
+    for track in db.get_child_downloads(download_id):
+        scheduler.cancel(track['id'])
+    db.delete_child_downloads(download_id)
+    
+    settings = load_audio_settings()
+    settings_key = get_audio_settings_key(settings, album_gain=settings.album_gain and settings.normalize_loudness)
+    with playlist_lock:
+        if settings.album_gain and settings.normalize_loudness:
+            album_gain_playlists.add(download_id)
+        else:
+            album_gain_playlists.discard(download_id)
+    # All rows first, so a track finishing early never sees a partial playlist
+    rows = [{
+        'id': str(uuid.uuid4()),
+        'url': track['url'],
+        'title': clean_extracted_title(track['title']) if track.get('title') else None,
+        'canonical_id': canonicalize_url(track['url']),
+    } for track in tracks]
+    db.add_queued_tracks(download_id, platform, rows, settings_key=settings_key, priority=priority)
+    with playlist_lock:
+        for row in rows:
+            playlist_parents[row['id']] = download_id
+    scheduler.submit_many([{'id': row['id'], 'url': row['url'], 'platform': platform} for row in rows], priority)
+    # Only now, so a restart during expansion expands the still queued playlist again
+    update_download_status(download_id, "downloading", round(db.get_playlist_summary(download_id)['progress'], 1))
+    logging.info(f"Expanded playlist {download_id} into {len(tracks)} track jobs")
+    return True
+
+def update_playlist_progress(parent_id: str):
+    """Publish the aggregate progress of a playlist, at most once per interval"""
+    now = time.monotonic()
+    with playlist_lock:
+        if now - playlist_progress_times.get(parent_id, 0) < PLAYLIST_PROGRESS_INTERVAL:
+            return
+        playlist_progress_times[parent_id] = now
+    summary = db.get_playlist_summary(parent_id)
+    if summary['active']:
+        update_download_status(parent_id, "downloading", round(summary['progress'], 1))
+
+def update_playlist_status(parent_id: str, platform: str):
+    """Update a playlist after one of its tracks finished; complete it after the last one"""
+    summary = db.get_playlist_summary(parent_id)
+    if not summary['total']:
+        # Playlist was deleted
+        return
+    if summary['active']:
+        update_download_status(parent_id, "downloading", round(summary['progress'], 1))
+        return
+    
+    with playlist_lock:
+        playlist_progress_times.pop(parent_id, None)
+        if parent_id in playlist_normalization:
+            # Another track's completion already started the album pass
+            return
+        album_pass = parent_id in album_gain_playlists and summary['completed']
+        album_gain_playlists.discard(parent_id)
+        if album_pass:
+            playlist_normalization[parent_id] = {'done': 0, 'total': summary['completed'], 'mode': 'album'}
+    if album_pass:
+        # A failed last track finishes on its download worker; FFmpeg work belongs on the post-processing pool
+        postprocess_pool.submit(complete_playlist, parent_id, platform, True)
+    else:
+        complete_playlist(parent_id, platform)
+
+def complete_playlist(parent_id: str, platform: str, album_pass: bool = False):
+    """Complete (or fail) a playlist whose tracks all finished, after the album gain pass if requested"""
+    if album_pass:
+        try:
+            normalize_playlist_tracks(parent_id)
+        except Exception as e:
+            logging.exception(f"Album gain pass of {parent_id} failed: {e}")
+    summary = db.get_playlist_summary(parent_id)
+    if summary['completed']:
+        error = f"{summary['failed']} of {summary['total']} tracks failed" if summary['failed'] else None
+        folder = get_playlist_folder(parent_id, platform)
+        update_download_status(parent_id, "completed", 100, str(folder), summary['file_size'], error)
+    else:
+        update_download_status(parent_id, "failed", error=f"All {summary['total']} tracks failed")
+
+def normalize_playlist_tracks(parent_id: str):
+    """Album gain pass over the finished tracks of an expanded playlist"""
+    tracks = [track for track in db.get_child_downloads(parent_id)
+              if track['status'] == 'completed' and track['file_path'] and os.path.exists(track['file_path'])]
+    try:
+        normalize_playlist(parent_id, [track['file_path'] for track in tracks], load_audio_settings())
+    finally:
+        set_playlist_normalization(parent_id, None)
+    for track in tracks:
+        # The summary's total size comes from the tracks
+        update_download_status(track['id'], "completed", 100, track['file_path'],
+                               os.path.getsize(track['file_path']))
+
+def run_playlist_track(download_id: str, url: str, platform: str, parent_id: str):
+    """Download one playlist track, requeueing it if it fails"""
+    with playlist_lock:
+        playlist_parents[download_id] = parent_id
+    run_backend(url, download_id, platform,
+                on_done=lambda: finish_playlist_track(download_id, url, platform, parent_id))
+
+def finish_playlist_track(download_id: str, url: str, platform: str, parent_id: str):
+    """Retry a failed playlist track or update its playlist after the track finished"""
+    track = db.get_download(download_id)
+    retries = db.increment_attempts(download_id) if track and track['status'] == 'failed' else None
+    if retries is not None and retries <= PLAYLIST_TRACK_RETRIES:
+        logging.warning(f"Playlist track {download_id} failed, retry {retries} of {PLAYLIST_TRACK_RETRIES}")
+        scheduler.submit(download_id, url, platform, track.get('priority') or 0)
+        event_bus.publish(download_id, status="queued", progress=0, parent_id=parent_id)
+    else:
+        with playlist_lock:
+            playlist_parents.pop(download_id, None)
+    update_playlist_status(parent_id, platform)
+
+def run_download_job(download_id: str, url: str, platform: str):
+    """Run a queued download on a scheduler worker thread"""
+    with download_context(download_id):
+        download = db.get_download(download_id) if db else None
+        if download and download.get('parent_id'):
+            run_playlist_track(download_id, url, platform, download['parent_id'])
+            return
+        if download and is_playlist_url(url, platform) and expand_playlist(download_id, url, platform):
+            return
+        run_backend(url, download_id, platform)
+
+def load_download_settings() -> DownloadSettings:
+    """Load download scheduler settings from database or return defaults"""
+    try:
+        if db:
+            return DownloadSettings(**db.get_download_settings())
+    except Exception as e:
+        logging.warning(f"Failed to load download settings from database, using defaults: {e}")
+    return DownloadSettings()
+
+def get_platform_limits(settings: DownloadSettings) -> dict:
+    """Map download settings to the scheduler's per-platform limits"""
+    return {platform: getattr(settings, f"max_{platform}_downloads") for platform in PLATFORMS}
+
+# Platforms whose downloader resumes from the partial files in its tmp-<id> directory
+RESUMABLE_PLATFORMS = ('youtube',)
+
+def recover_interrupted_downloads():
+    """Requeue downloads a crash or restart interrupted and clean up temp data.
+    
+    Runs before the scheduler starts. Rows left pending or downloading are
+    queued again, keeping their queue position. A playlist whose tracks
+    exist is not expanded again; it finishes with its tracks. tmp-<id>
+    directories are kept for resumable downloads (yt-dlp continues .part
+    files and fragments) and deleted otherwise, like leftover temporary
+    files of interrupted post-processing.
+    """
+    if not db:
+        return
+    requeue = []
+    playlists = []
+    for download in db.get_interrupted_downloads():
+        if not download['parent_id'] and db.get_child_downloads(download['id']):
+            playlists.append(download)
+        else:
+            requeue.append(download)
+    db.requeue_downloads([download['id'] for download in requeue])
+    
+    resumable = {download['id'] for download in requeue if download['platform'] in RESUMABLE_PLATFORMS}
+    resumed = removed = 0
+    for temp_dir in DOWNLOADS_DIR.glob('tmp-*'):
+        if not temp_dir.is_dir():
+            continue
+        if temp_dir.name[len('tmp-'):] in resumable and any(temp_dir.iterdir()):
+            resumed += 1
+            continue
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        removed += 1
+    
+    # Interrupted normalize_audio_volume / break_hardlink runs
+    for pattern in ('*.temp.mp3', '*.unlink.tmp', '*/*.temp.mp3', '*/*.unlink.tmp'):
+        for temp_file in DOWNLOADS_DIR.glob(pattern):
+            temp_file.unlink(missing_ok=True)
+            removed += 1
+    
+    # Playlists whose last tracks finished just before the restart; the
+    # album gain pass (if any) runs on the post-processing pool
+    settings = load_audio_settings()
+    for playlist in playlists:
+        if settings.album_gain and settings.normalize_loudness:
+            album_gain_playlists.add(playlist['id'])
+        postprocess_pool.submit(update_playlist_status, playlist['id'], playlist['platform'])
+    
+    if requeue or playlists or removed:
+        logging.info(f"Recovery: requeued {len(requeue)} download(s) ({resumed} resuming partial files), "
+                     f"{len(playlists)} playlist(s) continue with their tracks, "
+                     f"removed {removed} unrecoverable temp item(s)")
+
+# Created with the default settings; initialize_backend applies the stored ones
+_download_settings = DownloadSettings()
+scheduler = DownloadScheduler(
+    run_download_job,
+    max_workers=_download_settings.max_concurrent_downloads,
+    platform_limits=get_platform_limits(_download_settings),
+)
+
+def get_youtube_engine_size(settings: DownloadSettings) -> int:
+    """Worker processes for the library engine: one per concurrent YouTube download"""
+    return settings.max_youtube_downloads or settings.max_concurrent_downloads
+
+bandwidth = BandwidthAllocator(_download_settings.max_total_rate_kb * 1024,
+                               _download_settings.max_job_rate_kb * 1024,
+                               _download_settings.max_concurrent_downloads)
+
+# Worker processes start on the first library-engine job
+youtube_engine = YtDlpEngine(max_processes=get_youtube_engine_size(_download_settings), env=get_env_with_ffmpeg())
+
+def apply_download_settings(settings: DownloadSettings):
+    """Resize the worker pools and set the bandwidth limits"""
+    scheduler.configure(settings.max_concurrent_downloads, get_platform_limits(settings))
+    youtube_engine.configure(get_youtube_engine_size(settings))
+    bandwidth.configure(settings.max_total_rate_kb * 1024, settings.max_job_rate_kb * 1024,
+                        settings.max_concurrent_downloads)
+    set_extractor_log_level(settings.extractor_log_level)
+
+def publish_reconciled_files(changes: dict):
+    """Push file_missing/completed flips found by the reconciler to clients"""
+    for download_id, status in changes.items():
+        if status == 'file_missing':
+            event_bus.publish(download_id, status=status, error="File was deleted")
+        else:
+            event_bus.publish(download_id, status=status, error=None)
+
+# Keeps file_missing status and the library index in sync with the downloads folder (see initialize_backend)
+reconciler = None
+
+def initialize_backend():
+    """Startup work that doesn't need to delay the HTTP listener.
+    
+    Runs on a background thread started by the lifespan handler: opens and
+    migrates the database, applies the stored settings, recovers interrupted
+    downloads and starts the workers. Requests other than /api/health wait
+    until it has finished.
+    """
+    global db, library_index, reconciler
+    started = time.monotonic()
+    try:
+        log_startup_environment()
+        # Version and capability probes run alongside the rest of startup
+        threading.Thread(target=tool_registry.probe_all, daemon=True, name="tool-probe").start()
+        db = open_database()
+        if db:
+            library_index = LibraryIndex(db, DOWNLOADS_DIR, read_audio_metadata)
+            scheduler.db = db
+        apply_download_settings(load_download_settings())
+        download_logs.prune()
+        metadata_cache.clear_files()
+        recover_interrupted_downloads()
+        postprocess_pool.start()
+        scheduler.start()
+        if db:
+            reconciler = FileReconciler(db, DOWNLOADS_DIR, on_change=publish_reconciled_files,
+                                        library_index=library_index)
+            reconciler.start()
+    except Exception as e:
+        logging.exception(f"❌ Startup failed: {e}")
+    finally:
+        startup_times['init_seconds'] = round(time.monotonic() - started, 3)
+        startup_complete.set()
+        logging.info(f"Backend initialized in {startup_times['init_seconds']}s "
+                     f"(module import took {startup_times['import_seconds']}s)")
+
+def split_query_list(value: str) -> list:
+    """Split a comma separated query parameter into a list of values"""
+    if not value:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def normalize_date_param(value: str) -> str:
+    """Accept ISO dates/datetimes and match SQLite's CURRENT_TIMESTAMP format"""
+    if not value:
+        return None
+    return value.replace('T', ' ').rstrip('Z')
+
 @app.get("/api/downloads")
-async def get_downloads():
-    """Get all downloads from database with file verification"""
-    if db:
-        downloads = db.getDownloads()
-        
-        # Verify file existence for completed downloads
-        for download in downloads:
-            if download.get('status') == 'completed' and download.get('file_path'):
-                if not os.path.exists(download['file_path']):
-                    # File was deleted, update status
-                    db.updateStatus(download['id'], "file_missing", error="File was deleted")
-                    download['status'] = 'file_missing'
-                    download['error'] = 'File was deleted'
+async def get_downloads(request: Request, response: Response, since: int = None,
+                        limit: int = None, before: str = None, status: str = None,
+                        platform: str = None, artist: str = None, album: str = None,
+                        created_after: str = None, created_before: str = None,
+                        fields: str = None):
+    """Get downloads from database
+
+    Files are not checked here; the file reconciler keeps the file_missing
+    status up to date in the background.
+
+    Without parameters the full history is returned as a list. With `since`
+    only the rows changed after that revision are returned, together with the
+    ids deleted since then and the new revision to use as the next cursor.
+
+    With `limit`, `before` or any filter (`status`, `platform`, `artist`,
+    `album`, `created_after`, `created_before`) one page is returned, newest
+    first, with `next_cursor` to pass as `before` for the next page. `status`,
+    `platform` and `fields` take comma separated lists.
+    """
+    if not db:
+        if since is not None:
+            return {"revision": 0, "downloads": [], "deleted": [], "queue_positions": {}}
+        if limit is not None or before or status or platform or artist or album or created_after or created_before:
+            return {"downloads": [], "next_cursor": None}
+        return []
+    
+    if limit is not None or before or status or platform or artist or album or created_after or created_before:
+        page = db.query_downloads(
+            limit=limit or 50,
+            before=before,
+            status=split_query_list(status),
+            platform=split_query_list(platform),
+            artist=artist,
+            album=album,
+            created_after=normalize_date_param(created_after),
+            created_before=normalize_date_param(created_before),
+            fields=split_query_list(fields),
+        )
+        queue_positions = scheduler.queue_positions()
+        for download in page['downloads']:
+            if download.get('status') == 'queued':
+                download['queue_position'] = queue_positions.get(download['id'])
+        return page
+    
+    if since is not None:
+        # Nothing changed since the client's last poll
+        etag = f'"{db.get_revision()}"'
+        if since > 0 and request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
         
-        return downloads
-    else:
+        changes = db.get_changes_since(since)
+        changes['queue_positions'] = scheduler.queue_positions()
+        for download in changes['downloads']:
+            if download.get('status') == 'queued':
+                download['queue_position'] = changes['queue_positions'].get(download['id'])
+        response.headers["ETag"] = f'"{changes["revision"]}"'
+        return changes
+    
+    # Checked before querying, so an unchanged history costs one lookup
+    etag = f'"{db.get_revision()}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    # The ETag must be the revision the rows were read at, not a later one
+    revision, downloads = db.get_downloads_at_revision()
+    queue_positions = scheduler.queue_positions()
+    for download in downloads:
+        if download.get('status') == 'queued':
+            download['queue_position'] = queue_positions.get(download['id'])
+    response.headers["ETag"] = f'"{revision}"'
+    return downloads
+
+@app.post("/api/resolve")
+async def resolve_url(request: ResolveRequest):
+    """Get title, artist, duration and thumbnail of a URL before downloading it"""
+    platform = get_platform(request.url)
+    if platform not in BACKENDS:
+        raise HTTPException(status_code=400, detail="Unsupported platform")
+    
+    metadata, cached = await asyncio.to_thread(resolve_metadata, request.url, platform)
+    if not metadata:
+        raise HTTPException(status_code=422, detail="Could not resolve metadata for this URL")
+    
+    result = {key: value for key, value in metadata.items() if key != 'info_file'}
+    result['cached'] = cached
+    return result
+
+@app.get("/api/downloads/search")
+async def search_downloads(q: str, limit: int = 50):
+    """Full-text search over title, artist, album and URL with prefix matching"""
+    if not db:
         return []
+    results = db.search_downloads(q, limit)
+    queue_positions = scheduler.queue_positions()
+    for download in results:
+        if download.get('status') == 'queued':
+            download['queue_position'] = queue_positions.get(download['id'])
+    return results
+
+@app.get("/api/events")
+async def stream_events(request: Request):
+    """Server-Sent Events stream of download status and progress updates
+
+    Each `download` event carries the changed fields of one download. Updates
+    for the same download are merged while a client is behind, and a
+    `resync` event tells the client to reload the list after an overflow.
+    """
+    subscription = event_bus.subscribe()
+    
+    async def event_stream():
+        try:
+            yield "retry: 2000\n\n"
+            while not await request.is_disconnected():
+                await subscription.wait(timeout=15)
+                events, overflowed = event_bus.drain(subscription)
+                if overflowed:
+                    yield "event: resync\ndata: {}\n\n"
+                for event in events:
+                    yield f"event: download\ndata: {json.dumps(event)}\n\n"
+                if not events and not overflowed:
+                    # Keep-alive comment so proxies don't close an idle stream
+                    yield ": keep-alive\n\n"
+        finally:
+            event_bus.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/api/download/{download_id}")
 async def get_download(download_id: str):
@@ -846,17 +2230,38 @@ async def get_download(download_id: str):
     if db:
         download = db.getDownload(download_id)
         if download:
+            if is_playlist_url(download['url'], download['platform']):
+                tracks = db.get_child_downloads(download_id)
+                if tracks:
+                    download['playlist'] = db.get_playlist_summary(download_id)
+                    download['tracks'] = tracks
+                if download_id in playlist_normalization:
+                    download['normalization'] = dict(playlist_normalization[download_id])
             return download
         else:
             raise HTTPException(status_code=404, detail="Download not found")
     else:
         raise HTTPException(status_code=500, detail="Database not available")
 
+@app.get("/api/download/{download_id}/log")
+async def get_download_log(download_id: str, lines: int = None):
+    """Log lines recorded while the download ran (the last `lines` if given)"""
+    text = await asyncio.to_thread(download_logs.read, download_id, lines)
+    if text is None:
+        raise HTTPException(status_code=404, detail="No log for this download")
+    return PlainTextResponse(text)
+
 @app.delete("/api/download/{download_id}")
 async def delete_download(download_id: str):
     """Delete a download from database"""
     if db:
+        scheduler.cancel(download_id)
+        for track in db.get_child_downloads(download_id):
+            scheduler.cancel(track['id'])
+            download_logs.remove(track['id'])
+        download_logs.remove(download_id)
         db.deleteDownload(download_id)
+        event_bus.publish(download_id, deleted=True)
         return {"message": "Download deleted"}
     else:
         raise HTTPException(status_code=500, detail="Database not available")
@@ -876,31 +2281,22 @@ async def redownload_file(download_id: str):
     try:
         platform = get_platform(download['url'])
         
-        # Reset the download status to started
-        db.updateStatus(download_id, "started")
-        
-        # Start download in background thread
-        start_time = time.time()
-        
-        if platform == 'youtube':
-            thread = threading.Thread(target=download_youtube_sync, args=(download['url'], download_id, start_time))
-        elif platform == 'spotify':
-            thread = threading.Thread(target=download_spotify_sync, args=(download['url'], download_id, start_time))
-        elif platform == 'soundcloud':
-            thread = threading.Thread(target=download_soundcloud_sync, args=(download['url'], download_id, start_time))
-        else:
+        if platform not in BACKENDS:
             raise HTTPException(status_code=400, detail="Unsupported platform")
         
-        thread.daemon = True
-        thread.start()
+        # Put the download back in the queue
+        scheduler.submit(download_id, download['url'], platform)
+        event_bus.publish(download_id, status="queued", progress=0)
         
         return DownloadResponse(
             id=download_id,
             url=download['url'],
-            status="started",
-            message="Re-download started successfully"
+            status="queued",
+            message="Re-download queued successfully"
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         if db:
             db.updateStatus(download_id, "failed", error=str(e))
@@ -913,7 +2309,9 @@ async def clear_database():
         raise HTTPException(status_code=500, detail="Database not available")
     
     try:
+        scheduler.clear()
         db.clearAllDownloads()
+        download_logs.prune(keep=0)
         return {"message": "All downloads cleared successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -923,11 +2321,7 @@ async def update_audio_settings(settings: AudioSettings):
     """Update audio settings"""
     try:
         if db:
-            db.update_audio_settings(
-                settings.volume_boost,
-                settings.normalize_loudness,
-                settings.target_lufs
-            )
+            db.update_audio_settings(**settings.model_dump())
             logging.info(f"Audio settings updated in database: {settings.model_dump()}")
             return {"status": "success", "message": "Audio settings updated successfully"}
         else:
@@ -937,6 +2331,30 @@ async def update_audio_settings(settings: AudioSettings):
         logging.error(f"Failed to update audio settings: {e}")
         return {"status": "error", "message": f"Failed to update audio settings: {str(e)}"}
 
+@app.get("/api/audio-pipeline-stats")
+async def audio_pipeline_stats_endpoint():
+    """Get the average processing time per track of each audio pipeline"""
+    return get_audio_pipeline_stats()
+
+@app.get("/api/pipeline-stats")
+async def pipeline_stats_endpoint():
+    """Time spent per download stage (resolve, fetch, postprocess, finalize) and platform"""
+    return pipeline_stats.stats()
+
+@app.get("/api/library-index")
+async def get_library_index():
+    """Number and size of the indexed library files and the result of the last full scan"""
+    if library_index is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+    return library_index.stats()
+
+@app.post("/api/library-index/scan")
+async def scan_library_index():
+    """Rescan the downloads folder; only new or changed files are read again"""
+    if library_index is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+    return await asyncio.to_thread(library_index.scan)
+
 @app.get("/api/audio-settings")
 async def get_audio_settings():
     """Get current audio settings"""
@@ -952,6 +2370,34 @@ async def get_audio_settings():
         logging.error(f"Failed to get audio settings: {e}")
         return AudioSettings().model_dump()
 
+@app.post("/api/download-settings")
+async def update_download_settings(settings: DownloadSettings):
+    """Update download scheduler settings"""
+    try:
+        if db:
+            db.update_download_settings(**settings.model_dump())
+            db.set_progress_flush_interval(settings.progress_flush_interval)
+        apply_download_settings(settings)
+        logging.info(f"Download settings updated: {settings.model_dump()}")
+        return {"status": "success", "message": "Download settings updated successfully"}
+    except Exception as e:
+        logging.error(f"Failed to update download settings: {e}")
+        return {"status": "error", "message": f"Failed to update download settings: {str(e)}"}
+
+@app.get("/api/download-settings")
+async def get_download_settings():
+    """Get current download settings, download and post-processing queue usage, progress write counts and engine statistics"""
+    settings = load_download_settings().model_dump()
+    settings['scheduler'] = scheduler.stats()
+    settings['postprocess'] = postprocess_pool.stats()
+    settings['rate_limits'] = rate_limiter.stats()
+    settings['bandwidth'] = bandwidth.stats()
+    settings['metadata_cache'] = metadata_cache.stats()
+    settings['youtube_engines'] = get_youtube_engine_stats()
+    if db:
+        settings['progress_buffer'] = db.get_progress_buffer_stats()
+    return settings
+
 @app.post("/api/purchase-search", response_model=PurchaseSearchResponse)
 async def search_purchase_options(request: PurchaseSearchRequest):
     """Search for legal purchase options for a song"""
@@ -1075,16 +2521,19 @@ async def make_download_louder(download_id: str, request: VolumeBoostRequest):
         if volume_boost < 1.0 or volume_boost > 5.0:
             return {"status": "error", "message": "Volume boost must be between 1.0x and 5.0x"}
         
-        # Create custom audio settings with the specified volume boost
+        # Create custom audio settings with the specified volume boost;
+        # in "tags" mode this only rewrites the gain tags
         settings = AudioSettings(
             volume_boost=volume_boost,
             normalize_loudness=True,
-            target_lufs=-16.0
+            target_lufs=-16.0,
+            normalization_mode=load_audio_settings().normalization_mode
         )
         
         # Make the file louder
-        logging.info(f"Making file louder: {file_path} with {volume_boost}x boost")
-        success = normalize_audio_volume(file_path, settings)
+        logging.info(f"Making file louder: {file_path} with {volume_boost}x boost ({settings.normalization_mode})")
+        # Hashing, measuring and re-encoding take seconds; keep the event loop serving other requests
+        success = await asyncio.to_thread(normalize_audio_volume, file_path, settings)
         
         if success:
             # Update file size in database
@@ -1097,7 +2546,8 @@ async def make_download_louder(download_id: str, request: VolumeBoostRequest):
                 "message": f"File volume updated to {volume_boost}x successfully",
                 "volume_boost": volume_boost,
                 "normalize_loudness": settings.normalize_loudness,
-                "target_lufs": settings.target_lufs
+                "target_lufs": settings.target_lufs,
+                "normalization_mode": settings.normalization_mode
             }
         else:
             return {"status": "error", "message": "Failed to process audio file"}
@@ -1106,7 +2556,10 @@ async def make_download_louder(download_id: str, request: VolumeBoostRequest):
         logging.error(f"Error making download louder: {e}")
         return {"status": "error", "message": f"Error processing file: {str(e)}"}
 
+startup_times['import_seconds'] = round(time.monotonic() - IMPORT_STARTED, 3)
+
 if __name__ == "__main__":
+    import uvicorn
     try:
         logging.info("Starting uvicorn server...")
         logging.info(f"Server will be available at: http://127.0.0.1:8000")
@@ -0,0 +1,135 @@
+import logging
+import threading
+import time
+
+# A job's reported speed counts towards the throughput for this many seconds
+SPEED_MAX_AGE = 5.0
+
+# Floor for the share of watched jobs, e.g. while the budget was just lowered (0 would mean unlimited)
+MIN_JOB_RATE = 16 * 1024
+
+
+class BandwidthAllocator:
+    """Divides a global download rate budget between the running jobs.
+
+    At most `slots` jobs run at once (the download workers). A job that
+    can't change its rate while running gets its slot's part of the
+    budget, total_rate / slots, for its whole run, so later jobs still get
+    the same fair rate. Jobs that can (see watch) split what the
+    fixed-rate jobs leave and follow their share as jobs start and finish.
+    All rates are capped by the per-job limit. Rates are in bytes per
+    second, 0 or None meaning unlimited.
+    """
+
+    def __init__(self, total_rate=0, job_rate=0, slots=1):
+        self.total_rate = total_rate or 0
+        self.job_rate = job_rate or 0
+        self.slots = max(1, int(slots or 1))
+        self._jobs = {}  # job id -> {'rate', 'on_change', 'speed', 'speed_at'}
+        self._lock = threading.Lock()
+
+    def _slot_rate(self):
+        # Called with the lock held; rate of a fixed-rate job
+        rates = [rate for rate in (self.total_rate / self.slots if self.total_rate else 0, self.job_rate) if rate]
+        return int(min(rates)) if rates else None
+
+    def _share(self):
+        # Called with the lock held; rate of each watched job
+        rates = [self.job_rate] if self.job_rate else []
+        if self.total_rate:
+            fixed = sum(job['rate'] or 0 for job in self._jobs.values() if not job['on_change'])
+            sharing = sum(1 for job in self._jobs.values() if job['on_change'])
+            rates.append(max((self.total_rate - fixed) / max(sharing, 1), MIN_JOB_RATE))
+        return int(min(rates)) if rates else None
+
+    def _rebalance(self):
+        # Called with the lock held; returns the callbacks to run outside of it
+        share = self._share()
+        changed = []
+        for job_id, job in self._jobs.items():
+            if job['on_change'] and job['rate'] != share:
+                job['rate'] = share
+                changed.append((job['on_change'], share))
+        return changed
+
+    def _notify(self, changed):
+        for on_change, rate in changed:
+            try:
+                on_change(rate)
+            except Exception as e:
+                logging.warning(f"Could not change the rate of a running download: {e}")
+
+    def register(self, job_id):
+        """Add a starting job and return its rate (None = unlimited)"""
+        with self._lock:
+            rate = self._slot_rate()
+            self._jobs[job_id] = {'rate': rate, 'on_change': None, 'speed': 0.0, 'speed_at': 0.0}
+            changed = self._rebalance()
+        self._notify(changed)
+        return rate
+
+    def watch(self, job_id, on_change):
+        """Call on_change(rate) whenever the share of a registered job changes.
+
+        Returns the job's current rate.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job['on_change'] = on_change
+            changed = self._rebalance()
+            rate = job['rate']
+        self._notify(changed)
+        return rate
+
+    def unwatch(self, job_id):
+        """Stop calling the on_change of a job; it is fixed at its slot's rate, which is returned"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job['on_change'] = None
+            rate = job['rate'] = self._slot_rate()
+            changed = self._rebalance()
+        self._notify(changed)
+        return rate
+
+    def release(self, job_id):
+        with self._lock:
+            if self._jobs.pop(job_id, None) is None:
+                return
+            changed = self._rebalance()
+        self._notify(changed)
+
+    def configure(self, total_rate=0, job_rate=0, slots=None):
+        """Change the limits; running fixed-rate jobs keep their rate until they finish"""
+        with self._lock:
+            self.total_rate = total_rate or 0
+            self.job_rate = job_rate or 0
+            if slots:
+                self.slots = max(1, int(slots))
+            changed = self._rebalance()
+        self._notify(changed)
+
+    def report_speed(self, job_id, speed):
+        """Current download speed of a job in bytes per second"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and speed is not None:
+                job['speed'] = float(speed)
+                job['speed_at'] = time.monotonic()
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            throughput = sum(job['speed'] for job in self._jobs.values()
+                             if now - job['speed_at'] <= SPEED_MAX_AGE)
+            return {
+                'total_rate': self.total_rate,
+                'job_rate': self.job_rate,
+                'slots': self.slots,
+                'active_jobs': len(self._jobs),
+                'allocations': {job_id: job['rate'] for job_id, job in self._jobs.items()},
+                'throughput': int(throughput),
+            }
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the API server
+
+Measures how long importing api_server takes, how long a freshly started
+server needs until /api/health answers (the check the Electron app waits
+for), the latency of that first request, and when the backend reports
+ready. Runs against a throwaway HOME unless --home is given.
+
+    python benchmark_startup.py --runs 5 --budget 2.0
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_SCRIPT = "import time; t = time.perf_counter(); import api_server; print(time.perf_counter() - t)"
+SERVER_SCRIPT = ("import sys, uvicorn, api_server; "
+                 "uvicorn.run(api_server.app, host='127.0.0.1', port=int(sys.argv[1]), log_level='warning')")
+
+
+def get_json(url, timeout=2.0):
+    """GET a URL; returns (seconds taken, parsed JSON) or None if it can't connect"""
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            body = json.loads(response.read() or b'null')
+    except (urllib.error.URLError, ConnectionError):
+        return None
+    return time.perf_counter() - started, body
+
+
+def measure_import(env):
+    """Seconds a fresh interpreter spends importing api_server"""
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=API_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_server(env, port, timeout=60.0):
+    """Start the server and time the first health check and the end of startup"""
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-c", SERVER_SCRIPT, str(port)], cwd=API_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        result = {}
+        while time.perf_counter() - started < timeout:
+            response = get_json(f"{base}/api/health")
+            if response is not None:
+                result['health_seconds'] = time.perf_counter() - started
+                result['first_request_seconds'] = response[0]
+                break
+            time.sleep(0.01)
+        else:
+            raise RuntimeError(f"Server did not answer /api/health within {timeout}s")
+
+        while not response[1].get('ready'):
+            time.sleep(0.01)
+            response = get_json(f"{base}/api/health")
+        result['ready_seconds'] = time.perf_counter() - started
+        result['server_startup'] = response[1].get('startup')
+
+        # A request that needs the database
+        result['first_query_seconds'] = get_json(f"{base}/api/downloads?limit=1")[0]
+        return result
+    finally:
+        server.terminate()
+        server.wait(10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API server import time and first-request latency")
+    parser.add_argument("--runs", type=int, default=3, help="number of cold starts to measure")
+    parser.add_argument("--port", type=int, default=8765, help="port for the benchmark server")
+    parser.add_argument("--home", help="HOME to run with (default: a new empty directory)")
+    parser.add_argument("--budget", type=float,
+                        help="fail if the median time until /api/health answers exceeds this many seconds")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    home = args.home or tempfile.mkdtemp(prefix="all-dlp-startup-")
+    os.makedirs(os.path.join(home, "Downloads"), exist_ok=True)
+    env["HOME"] = home
+    print(f"Benchmarking startup with HOME={home}")
+
+    results = []
+    for run in range(args.runs):
+        result = {'import_seconds': measure_import(env)}
+        result.update(measure_server(env, args.port))
+        results.append(result)
+        print(f"Run {run + 1}: import {result['import_seconds']:.3f}s, "
+              f"/api/health after {result['health_seconds']:.3f}s "
+              f"(first request {result['first_request_seconds'] * 1000:.1f}ms), "
+              f"ready after {result['ready_seconds']:.3f}s, "
+              f"first query {result['first_query_seconds'] * 1000:.1f}ms")
+
+    print("\nMedian over runs:")
+    for key in ('import_seconds', 'health_seconds', 'first_request_seconds', 'ready_seconds', 'first_query_seconds'):
+        print(f"  {key}: {statistics.median(result[key] for result in results):.3f}")
+
+    if args.budget is not None:
+        health = statistics.median(result['health_seconds'] for result in results)
+        if health > args.budget:
+            print(f"❌ /api/health answered after {health:.3f}s, over the {args.budget:.3f}s budget")
+            return 1
+        print(f"✅ /api/health answered after {health:.3f}s, within the {args.budget:.3f}s budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,153 @@
 import sqlite3
 import os
 import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
 
+# Default worker limits for the download scheduler
+DOWNLOAD_SETTINGS_DEFAULTS = {
+    'max_concurrent_downloads': 3,
+    'max_youtube_downloads': 2,
+    'max_spotify_downloads': 2,
+    'max_soundcloud_downloads': 2,
+    'progress_flush_interval': 1.0,
+    'youtube_engine': 'subprocess',
+    'max_total_rate_kb': 0,
+    'max_job_rate_kb': 0,
+    'extractor_log_level': 'info',
+}
+
+# Default audio processing settings
+AUDIO_SETTINGS_DEFAULTS = {
+    'volume_boost': 2.0,
+    'normalize_loudness': True,
+    'target_lufs': -16.0,
+    'single_pass': True,
+    'normalization_mode': 'measured',
+    'album_gain': False,
+}
+
+# Buffered progress updates are flushed early once this many downloads are waiting
+PROGRESS_BUFFER_MAX = 50
+
+# Columns that can be requested through field projection
+DOWNLOAD_COLUMNS = (
+    'id', 'url', 'title', 'artist', 'album', 'platform', 'status', 'progress',
+    'file_path', 'file_size', 'created_at', 'completed_at', 'error',
+    'priority', 'queue_seq', 'revision', 'updated_at', 'canonical_id', 'settings_key',
+    'parent_id', 'attempts',
+)
+
+# Largest page a paginated listing returns
+MAX_PAGE_SIZE = 500
+
+# Stored in PRAGMA user_version once init_database has created and migrated
+# everything; bump it whenever init_database gains a table, column, index or trigger
+SCHEMA_VERSION = 4
+
+# Columns of the downloads table; seq is the stable integer key of the search index
+DOWNLOADS_COLUMNS = '''
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    title TEXT,
+    artist TEXT,
+    album TEXT,
+    platform TEXT,
+    status TEXT DEFAULT 'pending',
+    progress REAL DEFAULT 0,
+    file_path TEXT,
+    file_size INTEGER,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    completed_at DATETIME,
+    error TEXT,
+    priority INTEGER DEFAULT 0,
+    queue_seq INTEGER,
+    revision INTEGER DEFAULT 0,
+    updated_at DATETIME,
+    canonical_id TEXT,
+    settings_key TEXT,
+    parent_id TEXT,
+    attempts INTEGER DEFAULT 0
+'''
+
+# Connection pool limits
+POOL_MAX_SIZE = 8
+POOL_TIMEOUT = 5.0  # Seconds to wait for a free connection / a locked database
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared by all threads"""
+    
+    def __init__(self, db_path, max_size=POOL_MAX_SIZE, timeout=POOL_TIMEOUT):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.closed = False
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+    
+    def _connect(self):
+        """Open a new connection with WAL journaling and tuned pragmas"""
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # Readers don't block behind writers in WAL mode
+        conn.execute('PRAGMA journal_mode = WAL')
+        # Safe with WAL; only the last transactions can be lost on power failure
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA busy_timeout = {int(self.timeout * 1000)}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        return conn
+    
+    def acquire(self):
+        """Take an idle connection, open a new one or wait for one to be released"""
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self.closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    raise sqlite3.OperationalError("Timed out waiting for a database connection")
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+    
+    def release(self, conn):
+        """Return a connection to the pool"""
+        with self._cond:
+            if self.closed:
+                conn.close()
+                self._size -= 1
+                return
+            self._idle.append(conn)
+            self._cond.notify()
+    
+    def close(self):
+        """Close idle connections; connections in use are closed on release"""
+        with self._cond:
+            self.closed = True
+            for conn in self._idle:
+                conn.close()
+            self._size -= len(self._idle)
+            self._idle = []
+            self._cond.notify_all()
+    
+    def stats(self):
+        with self._cond:
+            return {'size': self._size, 'idle': len(self._idle), 'max_size': self.max_size}
+
 class DownloadDatabase:
     def __init__(self):
         # Create database in the user's home directory for write permissions
@@ -13,38 +157,69 @@ class DownloadDatabase:
         
         db_path = app_data_dir / "downloads.db"
         self.db_path = str(db_path)
-        self._local = threading.local()
+        self._pool = ConnectionPool(self.db_path)
+        
+        # Write-behind buffer for progress-only updates (download id -> progress)
+        self.progress_flush_interval = DOWNLOAD_SETTINGS_DEFAULTS['progress_flush_interval']
+        self._progress_buffer = {}
+        self._downloading_ids = set()
+        self._progress_lock = threading.Lock()
+        self._progress_flusher = None
+        self._progress_wakeup = threading.Event()
+        self._progress_stats = {'buffered': 0, 'flushed': 0, 'flushes': 0}
+        
+        # Set by init_database when this SQLite build supports FTS5
+        self.fts_available = False
+        
         self.init_database()
+        self.progress_flush_interval = self.get_download_settings()['progress_flush_interval']
     
-    def _get_connection(self):
-        """Get a database connection for the current thread"""
-        if not hasattr(self._local, 'connection'):
-            self._local.connection = sqlite3.connect(self.db_path)
-            self._local.connection.row_factory = sqlite3.Row
-        return self._local.connection
+    @contextmanager
+    def _connection(self):
+        """Borrow a pooled connection; commits on success and rolls back on error"""
+        conn = self._pool.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._pool.release(conn)
     
     def init_database(self):
         """Initialize the database with the required tables"""
+        conn = self._pool.acquire()
         try:
-            conn = self._get_connection()
             cursor = conn.cursor()
             
+            # Up to date: skip the table checks and migrations, which hold up startup
+            cursor.execute('PRAGMA user_version')
+            if cursor.fetchone()[0] == SCHEMA_VERSION:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'downloads_fts'")
+                self.fts_available = cursor.fetchone() is not None
+                return
+            
             # Create downloads table
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS downloads ({DOWNLOADS_COLUMNS})')
+            cursor.execute('PRAGMA table_info(downloads)')
+            columns = [row[1] for row in cursor.fetchall()]
+            if 'seq' not in columns:
+                self._add_download_seq(cursor, columns)
+            
+            # Single-row change counter used for incremental listings
             cursor.execute('''
-                CREATE TABLE IF NOT EXISTS downloads (
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    revision INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            
+            # Deleted download ids, so incremental listings can report removals
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS download_tombstones (
                     id TEXT PRIMARY KEY,
-                    url TEXT NOT NULL,
-                    title TEXT,
-                    artist TEXT,
-                    album TEXT,
-                    platform TEXT,
-                    status TEXT DEFAULT 'pending',
-                    progress REAL DEFAULT 0,
-                    file_path TEXT,
-                    file_size INTEGER,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    completed_at DATETIME,
-                    error TEXT
+                    revision INTEGER NOT NULL
                 )
             ''')
             
@@ -55,6 +230,9 @@ class DownloadDatabase:
                     volume_boost REAL DEFAULT 2.0,
                     normalize_loudness BOOLEAN DEFAULT 1,
                     target_lufs REAL DEFAULT -16.0,
+                    single_pass BOOLEAN DEFAULT 1,
+                    normalization_mode TEXT DEFAULT 'measured',
+                    album_gain BOOLEAN DEFAULT 0,
                     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
                 )
@@ -68,6 +246,61 @@ class DownloadDatabase:
                     VALUES (2.0, 1, -16.0)
                 ''')
             
+            # Create loudness_analysis table (loudnorm measurements keyed by file content hash)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS loudness_analysis (
+                    file_hash TEXT PRIMARY KEY,
+                    input_i REAL NOT NULL,
+                    input_tp REAL NOT NULL,
+                    input_lra REAL NOT NULL,
+                    input_thresh REAL NOT NULL,
+                    source TEXT DEFAULT 'measured',
+                    analyzed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Create library_index table (stat and tag data of the audio files in the library)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS library_index (
+                    path TEXT PRIMARY KEY,
+                    folder TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    inode INTEGER,
+                    duration REAL,
+                    title TEXT,
+                    artist TEXT,
+                    album TEXT,
+                    year TEXT,
+                    track TEXT,
+                    indexed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_library_folder ON library_index (folder, mtime_ns)')
+            
+            # Create download_settings table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS download_settings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    max_concurrent_downloads INTEGER DEFAULT 3,
+                    max_youtube_downloads INTEGER DEFAULT 2,
+                    max_spotify_downloads INTEGER DEFAULT 2,
+                    max_soundcloud_downloads INTEGER DEFAULT 2,
+                    progress_flush_interval REAL DEFAULT 1.0,
+                    youtube_engine TEXT DEFAULT 'subprocess',
+                    max_total_rate_kb INTEGER DEFAULT 0,
+                    max_job_rate_kb INTEGER DEFAULT 0,
+                    extractor_log_level TEXT DEFAULT 'info',
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Insert default download settings if table is empty
+            cursor.execute('SELECT COUNT(*) FROM download_settings')
+            if cursor.fetchone()[0] == 0:
+                cursor.execute('INSERT INTO download_settings DEFAULT VALUES')
+            
             # Add album column if it doesn't exist (for existing databases)
             try:
                 cursor.execute('ALTER TABLE downloads ADD COLUMN album TEXT')
@@ -76,115 +309,716 @@ class DownloadDatabase:
                 # Column already exists
                 pass
             
+            # Add queue columns if they don't exist (for existing databases)
+            for column, definition in (('priority', 'INTEGER DEFAULT 0'), ('queue_seq', 'INTEGER')):
+                try:
+                    cursor.execute(f'ALTER TABLE downloads ADD COLUMN {column} {definition}')
+                    print(f"Added {column} column to existing database")
+                except sqlite3.OperationalError:
+                    # Column already exists
+                    pass
+            
+            # Add settings columns if they don't exist (for existing databases)
+            for column, definition in (('progress_flush_interval', 'REAL DEFAULT 1.0'),
+                                       ('youtube_engine', "TEXT DEFAULT 'subprocess'"),
+                                       ('max_total_rate_kb', 'INTEGER DEFAULT 0'),
+                                       ('max_job_rate_kb', 'INTEGER DEFAULT 0'),
+                                       ('extractor_log_level', "TEXT DEFAULT 'info'")):
+                try:
+                    cursor.execute(f'ALTER TABLE download_settings ADD COLUMN {column} {definition}')
+                    print(f"Added {column} column to existing database")
+                except sqlite3.OperationalError:
+                    # Column already exists
+                    pass
+            for column, definition in (('single_pass', 'BOOLEAN DEFAULT 1'),
+                                       ('normalization_mode', "TEXT DEFAULT 'measured'"),
+                                       ('album_gain', 'BOOLEAN DEFAULT 0')):
+                try:
+                    cursor.execute(f'ALTER TABLE audio_settings ADD COLUMN {column} {definition}')
+                    print(f"Added {column} column to existing database")
+                except sqlite3.OperationalError:
+                    # Column already exists
+                    pass
+            
+            # Add change tracking columns if they don't exist (for existing databases)
+            for column, definition in (('revision', 'INTEGER DEFAULT 0'), ('updated_at', 'DATETIME')):
+                try:
+                    cursor.execute(f'ALTER TABLE downloads ADD COLUMN {column} {definition}')
+                    print(f"Added {column} column to existing database")
+                except sqlite3.OperationalError:
+                    # Column already exists
+                    pass
+            
+            # Add result cache columns if they don't exist (for existing databases)
+            for column in ('canonical_id', 'settings_key'):
+                try:
+                    cursor.execute(f'ALTER TABLE downloads ADD COLUMN {column} TEXT')
+                    print(f"Added {column} column to existing database")
+                except sqlite3.OperationalError:
+                    # Column already exists
+                    pass
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_downloads_canonical ON downloads (canonical_id, settings_key, status)')
+            
+            # Add playlist track columns if they don't exist (for existing databases)
+            for column, definition in (('parent_id', 'TEXT'), ('attempts', 'INTEGER DEFAULT 0')):
+                try:
+                    cursor.execute(f'ALTER TABLE downloads ADD COLUMN {column} {definition}')
+                    print(f"Added {column} column to existing database")
+                except sqlite3.OperationalError:
+                    # Column already exists
+                    pass
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_downloads_parent ON downloads (parent_id)')
+            
+            # Existing rows start at revision 1 so a full sync (since=0) includes them
+            cursor.execute('UPDATE downloads SET revision = 1 WHERE revision IS NULL OR revision = 0')
+            cursor.execute('''
+                INSERT OR IGNORE INTO sync_state (id, revision)
+                SELECT 1, COALESCE(MAX(revision), 0) FROM downloads
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_downloads_revision ON downloads (revision)')
+            # Top-level changes since a revision (get_changes_since), already in revision order
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_downloads_parent_revision ON downloads (parent_id, revision)')
+            
+            # Composite indexes for the (filtered) keyset-paginated listings,
+            # all ending in the (created_at, id) sort key
+            cursor.execute('DROP INDEX IF EXISTS idx_downloads_status')
+            cursor.execute('DROP INDEX IF EXISTS idx_downloads_created_at')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_downloads_created ON downloads (created_at, id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_downloads_status_created ON downloads (status, created_at, id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_downloads_platform_created ON downloads (platform, created_at, id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_downloads_artist_created ON downloads (artist COLLATE NOCASE, created_at, id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_downloads_album_created ON downloads (album COLLATE NOCASE, created_at, id)')
+            
+            # Bump the revision on every insert, update and delete
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS downloads_revision_insert
+                AFTER INSERT ON downloads
+                BEGIN
+                    UPDATE sync_state SET revision = revision + 1 WHERE id = 1;
+                    UPDATE downloads
+                    SET revision = (SELECT revision FROM sync_state WHERE id = 1),
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id = NEW.id;
+                    DELETE FROM download_tombstones WHERE id = NEW.id;
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS downloads_revision_update
+                AFTER UPDATE ON downloads
+                WHEN NEW.revision IS OLD.revision
+                BEGIN
+                    UPDATE sync_state SET revision = revision + 1 WHERE id = 1;
+                    UPDATE downloads
+                    SET revision = (SELECT revision FROM sync_state WHERE id = 1),
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id = NEW.id;
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS downloads_revision_delete
+                AFTER DELETE ON downloads
+                BEGIN
+                    UPDATE sync_state SET revision = revision + 1 WHERE id = 1;
+                    INSERT OR REPLACE INTO download_tombstones (id, revision)
+                    VALUES (OLD.id, (SELECT revision FROM sync_state WHERE id = 1));
+                END
+            ''')
+            
+            self.fts_available = self._init_search_index(cursor)
+            
+            cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
             conn.commit()
             print(f"Database initialized successfully at: {self.db_path}")
         except Exception as e:
             print(f"Error initializing database: {e}")
             print(f"Database path: {self.db_path}")
             raise
+        finally:
+            self._pool.release(conn)
     
-    def add_download(self, id, url, platform, title=None, artist=None):
-        """Add a new download to the database"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
+    def _add_download_seq(self, cursor, columns):
+        """Rebuild a downloads table from before the seq column, keeping its rows in order.
+        
+        The search index used the implicit rowid, which VACUUM may renumber;
+        it is dropped and rebuilt on seq by _init_search_index.
+        """
+        cursor.execute('DROP TABLE IF EXISTS downloads_fts')
+        cursor.execute(f'CREATE TABLE downloads_new ({DOWNLOADS_COLUMNS})')
+        cursor.execute('PRAGMA table_info(downloads_new)')
+        shared = ', '.join(row[1] for row in cursor.fetchall() if row[1] in columns)
+        cursor.execute(f'INSERT INTO downloads_new ({shared}) SELECT {shared} FROM downloads ORDER BY rowid')
+        # Indexes and triggers go with the old table and are created again below
+        cursor.execute('DROP TABLE downloads')
+        cursor.execute('ALTER TABLE downloads_new RENAME TO downloads')
+        print("Added seq column to existing database")
+    
+    def _init_search_index(self, cursor):
+        """Create the FTS5 search index over downloads, kept in sync by triggers"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'downloads_fts'")
+        exists = cursor.fetchone() is not None
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS downloads_fts USING fts5(
+                    title, artist, album, url,
+                    content='downloads', content_rowid='seq',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5; search falls back to LIKE
+            print(f"Full-text search not available: {e}")
+            return False
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS downloads_fts_insert
+            AFTER INSERT ON downloads
+            BEGIN
+                INSERT INTO downloads_fts (rowid, title, artist, album, url)
+                VALUES (NEW.seq, NEW.title, NEW.artist, NEW.album, NEW.url);
+            END
+        ''')
         cursor.execute('''
-            INSERT INTO downloads (id, url, platform, title, artist, status)
-            VALUES (?, ?, ?, ?, ?, 'pending')
-        ''', (id, url, platform, title, artist))
-        conn.commit()
+            CREATE TRIGGER IF NOT EXISTS downloads_fts_delete
+            AFTER DELETE ON downloads
+            BEGIN
+                INSERT INTO downloads_fts (downloads_fts, rowid, title, artist, album, url)
+                VALUES ('delete', OLD.seq, OLD.title, OLD.artist, OLD.album, OLD.url);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS downloads_fts_update
+            AFTER UPDATE OF title, artist, album, url ON downloads
+            BEGIN
+                INSERT INTO downloads_fts (downloads_fts, rowid, title, artist, album, url)
+                VALUES ('delete', OLD.seq, OLD.title, OLD.artist, OLD.album, OLD.url);
+                INSERT INTO downloads_fts (rowid, title, artist, album, url)
+                VALUES (NEW.seq, NEW.title, NEW.artist, NEW.album, NEW.url);
+            END
+        ''')
+        
+        if not exists:
+            # Index the rows that existed before the search table
+            cursor.execute("INSERT INTO downloads_fts (downloads_fts) VALUES ('rebuild')")
+            print("Built full-text search index for existing downloads")
+        return True
+    
+    def add_download(self, id, url, platform, title=None, artist=None, canonical_id=None, settings_key=None,
+                     parent_id=None):
+        """Add a new download to the database (a playlist track when parent_id is set)"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO downloads (id, url, platform, title, artist, status, canonical_id, settings_key, parent_id)
+                VALUES (?, ?, ?, ?, ?, 'pending', ?, ?, ?)
+            ''', (id, url, platform, title, artist, canonical_id, settings_key, parent_id))
+    
+    def find_active_download(self, canonical_id, settings_key):
+        """Get an in-flight download of the same content with the same audio settings"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT * FROM downloads
+                WHERE canonical_id = ? AND settings_key = ?
+                  AND status IN ('pending', 'queued', 'downloading')
+                  AND parent_id IS NULL
+                ORDER BY created_at DESC
+                LIMIT 1
+            ''', (canonical_id, settings_key))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    def find_cached_downloads(self, canonical_id, settings_key):
+        """Get completed downloads of the same content and audio settings, newest first"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT * FROM downloads
+                WHERE canonical_id = ? AND settings_key = ? AND status = 'completed'
+                ORDER BY completed_at DESC
+            ''', (canonical_id, settings_key))
+            return [dict(row) for row in cursor.fetchall()]
     
     def update_status(self, id, status, progress=None, file_path=None, file_size=None, error=None):
-        """Update download status"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        """Update download status
+
+        Progress-only updates for a download that is already downloading are
+        buffered and written in batches; any other update first flushes the
+        buffer so it is never overwritten by stale progress.
+        """
+        if (status == 'downloading' and id in self._downloading_ids and progress is not None
+                and file_path is None and file_size is None and error is None
+                and self.progress_flush_interval > 0):
+            self._buffer_progress(id, status, progress)
+            return
+        
+        self.flush_progress()
+        if status == 'downloading':
+            self._downloading_ids.add(id)
+        else:
+            self._downloading_ids.discard(id)
+        with self._connection() as conn:
+            cursor = conn.cursor()
         
-        # Build the SQL query dynamically based on what parameters are provided
-        set_parts = ['status = ?']
-        params = [status]
+            # Build the SQL query dynamically based on what parameters are provided
+            set_parts = ['status = ?']
+            params = [status]
         
-        if progress is not None:
-            set_parts.append('progress = ?')
-            params.append(progress)
+            if progress is not None:
+                set_parts.append('progress = ?')
+                params.append(progress)
         
-        if file_path is not None:
-            set_parts.append('file_path = ?')
-            params.append(file_path)
+            if file_path is not None:
+                set_parts.append('file_path = ?')
+                params.append(file_path)
         
-        if file_size is not None:
-            set_parts.append('file_size = ?')
-            params.append(file_size)
+            if file_size is not None:
+                set_parts.append('file_size = ?')
+                params.append(file_size)
         
-        if error is not None:
-            set_parts.append('error = ?')
-            params.append(error)
+            if error is not None:
+                set_parts.append('error = ?')
+                params.append(error)
         
-        if status == 'completed':
-            set_parts.append('completed_at = CURRENT_TIMESTAMP')
+            if status == 'completed':
+                set_parts.append('completed_at = CURRENT_TIMESTAMP')
         
-        sql = f"UPDATE downloads SET {', '.join(set_parts)} WHERE id = ?"
-        params.append(id)
+            sql = f"UPDATE downloads SET {', '.join(set_parts)} WHERE id = ?"
+            params.append(id)
+        
+            cursor.execute(sql, params)
+    
+    def _buffer_progress(self, id, status, progress):
+        """Keep the latest progress for a download until the next flush"""
+        with self._progress_lock:
+            self._progress_buffer[id] = (status, progress)
+            self._progress_stats['buffered'] += 1
+            flush_now = len(self._progress_buffer) >= PROGRESS_BUFFER_MAX
+            if self._progress_flusher is None or not self._progress_flusher.is_alive():
+                self._progress_flusher = threading.Thread(
+                    target=self._progress_flush_loop, daemon=True, name="progress-flusher")
+                self._progress_flusher.start()
+        if flush_now:
+            self.flush_progress()
+    
+    def _progress_flush_loop(self):
+        """Flush buffered progress every progress_flush_interval seconds"""
+        while not self._pool.closed:
+            self._progress_wakeup.wait(max(self.progress_flush_interval, 0.05))
+            self._progress_wakeup.clear()
+            try:
+                self.flush_progress()
+            except Exception as e:
+                print(f"Error flushing progress updates: {e}")
+    
+    def flush_progress(self):
+        """Write all buffered progress updates in a single transaction"""
+        with self._progress_lock:
+            if not self._progress_buffer:
+                return 0
+            pending = self._progress_buffer
+            self._progress_buffer = {}
+            # Write while holding the lock so a later status update can't be
+            # overtaken by this batch
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    'UPDATE downloads SET status = ?, progress = ? WHERE id = ?',
+                    [(status, progress, id) for id, (status, progress) in pending.items()]
+                )
+            self._progress_stats['flushed'] += len(pending)
+            self._progress_stats['flushes'] += 1
+            return len(pending)
+    
+    def set_progress_flush_interval(self, interval):
+        """Change how often buffered progress is flushed (0 disables buffering)"""
+        self.progress_flush_interval = max(0.0, float(interval))
+        if self.progress_flush_interval == 0:
+            self.flush_progress()
+        self._progress_wakeup.set()
+    
+    def get_progress_buffer_stats(self):
+        """Report how many progress updates were buffered and written"""
+        with self._progress_lock:
+            return dict(self._progress_stats,
+                        pending=len(self._progress_buffer),
+                        flush_interval=self.progress_flush_interval)
+    
+    def enqueue_download(self, id, priority=0):
+        """Mark a download as queued and append it to the persistent queue"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE downloads
+                SET status = 'queued', progress = 0, error = NULL, priority = ?,
+                    queue_seq = (SELECT COALESCE(MAX(queue_seq), 0) + 1 FROM downloads)
+                WHERE id = ?
+            ''', (priority, id))
+    
+    def add_queued_tracks(self, parent_id, platform, tracks, settings_key=None, priority=0):
+        """Add the track rows of a playlist, queued in order, in one transaction.
         
-        cursor.execute(sql, params)
-        conn.commit()
+        tracks are dicts with id, url, title and canonical_id.
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COALESCE(MAX(queue_seq), 0) FROM downloads')
+            last_seq = cursor.fetchone()[0]
+            cursor.executemany('''
+                INSERT INTO downloads (id, url, platform, title, status, progress, canonical_id, settings_key,
+                                       parent_id, priority, queue_seq)
+                VALUES (?, ?, ?, ?, 'queued', 0, ?, ?, ?, ?, ?)
+            ''', [(track['id'], track['url'], platform, track.get('title'), track.get('canonical_id'),
+                   settings_key, parent_id, priority, last_seq + offset)
+                  for offset, track in enumerate(tracks, 1)])
+    
+    def get_queued_downloads(self):
+        """Get queued downloads in the order they should be started"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT * FROM downloads
+                WHERE status = 'queued'
+                ORDER BY priority DESC, queue_seq ASC
+            ''')
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_interrupted_downloads(self):
+        """Get downloads a previous run left pending or downloading"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT * FROM downloads
+                WHERE status IN ('pending', 'downloading')
+                ORDER BY created_at, seq
+            ''')
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def requeue_downloads(self, ids):
+        """Put interrupted downloads back in the queue, ahead of jobs queued after them"""
+        if not ids:
+            return
+        placeholders = ', '.join('?' * len(ids))
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                UPDATE downloads SET status = 'queued', error = NULL
+                WHERE id IN ({placeholders})
+            ''', list(ids))
+            # Downloads that never had a queue position are queued last, oldest first
+            cursor.execute(f'''
+                SELECT id FROM downloads
+                WHERE id IN ({placeholders}) AND queue_seq IS NULL
+                ORDER BY created_at, id
+            ''', list(ids))
+            unqueued = [row[0] for row in cursor.fetchall()]
+            if unqueued:
+                cursor.execute('SELECT COALESCE(MAX(queue_seq), 0) FROM downloads')
+                last_seq = cursor.fetchone()[0]
+                cursor.executemany('UPDATE downloads SET queue_seq = ? WHERE id = ?',
+                                   [(last_seq + offset, id) for offset, id in enumerate(unqueued, 1)])
     
     def get_downloads(self):
         """Get all downloads from the database"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM downloads 
-            ORDER BY created_at DESC
-        ''')
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT * FROM downloads 
+                WHERE parent_id IS NULL
+                ORDER BY created_at DESC
+            ''')
         
-        # Convert sqlite3.Row objects to dictionaries
-        rows = cursor.fetchall()
-        downloads = []
-        for row in rows:
-            download = dict(row)
-            downloads.append(download)
+            # Convert sqlite3.Row objects to dictionaries
+            rows = cursor.fetchall()
+            downloads = []
+            for row in rows:
+                download = dict(row)
+                downloads.append(download)
         
-        return downloads
+            return downloads
+    
+    def query_downloads(self, limit=50, before=None, status=None, platform=None, artist=None,
+                        album=None, created_after=None, created_before=None, fields=None):
+        """Get one page of downloads, newest first, using keyset pagination
+
+        `before` is the `next_cursor` of the previous page. `status` and
+        `platform` accept a list of values, `artist` and `album` match
+        case-insensitively and `fields` limits the returned columns.
+        Returns a dict with the rows and the cursor of the next page (None
+        on the last page).
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        
+        # The sort key is always selected so the next cursor can be built
+        if fields:
+            columns = [column for column in DOWNLOAD_COLUMNS if column in fields]
+            for column in ('id', 'created_at'):
+                if column not in columns:
+                    columns.append(column)
+        else:
+            columns = list(DOWNLOAD_COLUMNS)
+        
+        # Playlist tracks are listed with their playlist, not on their own
+        where = ['parent_id IS NULL']
+        params = []
+        if status:
+            where.append(f"status IN ({', '.join('?' * len(status))})")
+            params.extend(status)
+        if platform:
+            where.append(f"platform IN ({', '.join('?' * len(platform))})")
+            params.extend(platform)
+        if artist:
+            where.append('artist = ? COLLATE NOCASE')
+            params.append(artist)
+        if album:
+            where.append('album = ? COLLATE NOCASE')
+            params.append(album)
+        if created_after:
+            where.append('created_at >= ?')
+            params.append(created_after)
+        if created_before:
+            where.append('created_at < ?')
+            params.append(created_before)
+        if before:
+            before_created_at, _, before_id = before.rpartition('|')
+            where.append('(created_at, id) < (?, ?)')
+            params.extend([before_created_at, before_id])
+        
+        sql = f"SELECT {', '.join(columns)} FROM downloads WHERE {' AND '.join(where)}"
+        # Fetch one extra row to know whether there is a next page
+        sql += ' ORDER BY created_at DESC, id DESC LIMIT ?'
+        params.append(limit + 1)
+        
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            downloads = [dict(row) for row in cursor.fetchall()]
+        
+        next_cursor = None
+        if len(downloads) > limit:
+            downloads = downloads[:limit]
+            last = downloads[-1]
+            next_cursor = f"{last['created_at']}|{last['id']}"
+        return {'downloads': downloads, 'next_cursor': next_cursor}
+    
+    def search_downloads(self, query, limit=50):
+        """Search title, artist, album and url; every word matches as a prefix
+
+        Results are ranked by BM25 with title matches weighted highest.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        words = [word for word in query.split() if word]
+        if not words:
+            return []
+        
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            if self.fts_available:
+                # Quote each word so FTS5 syntax characters are matched literally
+                match = ' '.join('"' + word.replace('"', '""') + '"*' for word in words)
+                cursor.execute('''
+                    SELECT downloads.*, bm25(downloads_fts, 10.0, 5.0, 3.0, 1.0) AS rank
+                    FROM downloads_fts
+                    JOIN downloads ON downloads.seq = downloads_fts.rowid
+                    WHERE downloads_fts MATCH ?
+                    ORDER BY rank
+                    LIMIT ?
+                ''', (match, limit))
+            else:
+                where = []
+                params = []
+                for word in words:
+                    where.append("(title LIKE ? OR artist LIKE ? OR album LIKE ? OR url LIKE ?)")
+                    params.extend([f"%{word}%"] * 4)
+                params.append(limit)
+                cursor.execute(f'''
+                    SELECT * FROM downloads
+                    WHERE {' AND '.join(where)}
+                    ORDER BY created_at DESC
+                    LIMIT ?
+                ''', params)
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_revision(self):
+        """Get the current change revision of the downloads table"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT revision FROM sync_state WHERE id = 1')
+            row = cursor.fetchone()
+            return row[0] if row else 0
+    
+    def get_downloads_at_revision(self):
+        """Get all downloads and the revision they are current at, read in one transaction"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN')
+            cursor.execute('SELECT revision FROM sync_state WHERE id = 1')
+            row = cursor.fetchone()
+            revision = row[0] if row else 0
+            cursor.execute('''
+                SELECT * FROM downloads
+                WHERE parent_id IS NULL
+                ORDER BY created_at DESC
+            ''')
+            downloads = [dict(row) for row in cursor.fetchall()]
+        return revision, downloads
+    
+    def get_changes_since(self, since):
+        """Get downloads changed and ids deleted after the given revision"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            # Read everything in one transaction so the cursor matches the rows
+            cursor.execute('BEGIN')
+            cursor.execute('SELECT revision FROM sync_state WHERE id = 1')
+            row = cursor.fetchone()
+            revision = row[0] if row else 0
+            cursor.execute('''
+                SELECT * FROM downloads
+                WHERE parent_id IS NULL AND revision > ?
+                ORDER BY revision
+            ''', (since,))
+            downloads = [dict(row) for row in cursor.fetchall()]
+            deleted = []
+            if since > 0:
+                cursor.execute('SELECT id FROM download_tombstones WHERE revision > ?', (since,))
+                deleted = [row[0] for row in cursor.fetchall()]
+        return {'revision': revision, 'downloads': downloads, 'deleted': deleted}
     
     def get_download(self, id):
         """Get a specific download by ID"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM downloads WHERE id = ?', (id,))
-        row = cursor.fetchone()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM downloads WHERE id = ?', (id,))
+            row = cursor.fetchone()
         
-        if row:
-            return dict(row)
-        return None
+            if row:
+                return dict(row)
+            return None
     
     def delete_download(self, id):
-        """Delete a download from the database"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM downloads WHERE id = ?', (id,))
-        conn.commit()
+        """Delete a download (and the tracks of a playlist) from the database"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM downloads WHERE id = ? OR parent_id = ?', (id, id))
+    
+    def delete_child_downloads(self, parent_id):
+        """Delete the tracks of a playlist"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM downloads WHERE parent_id = ?', (parent_id,))
+    
+    def get_child_downloads(self, parent_id):
+        """Get the tracks of a playlist in playlist order"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM downloads WHERE parent_id = ? ORDER BY seq', (parent_id,))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_playlist_summary(self, parent_id):
+        """Count the tracks of a playlist by state and compute its overall progress
+
+        Finished tracks (completed or failed) count as 100% towards progress.
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT
+                    COUNT(*) AS total,
+                    COALESCE(SUM(status = 'completed'), 0) AS completed,
+                    COALESCE(SUM(status = 'failed'), 0) AS failed,
+                    COALESCE(SUM(status IN ('pending', 'queued', 'downloading')), 0) AS active,
+                    COALESCE(AVG(CASE WHEN status IN ('pending', 'queued', 'downloading')
+                                      THEN COALESCE(progress, 0) ELSE 100 END), 0) AS progress,
+                    COALESCE(SUM(CASE WHEN status = 'completed' THEN file_size END), 0) AS file_size
+                FROM downloads
+                WHERE parent_id = ?
+            ''', (parent_id,))
+            return dict(cursor.fetchone())
+    
+    def increment_attempts(self, id):
+        """Count a failed attempt of a download and return the new total"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('UPDATE downloads SET attempts = COALESCE(attempts, 0) + 1 WHERE id = ?', (id,))
+            cursor.execute('SELECT attempts FROM downloads WHERE id = ?', (id,))
+            row = cursor.fetchone()
+            return row[0] if row else 0
     
     def verify_file_exists(self, id):
         """Check if file exists and update status if needed"""
+        self.reconcile_files([id])
         download = self.get_download(id)
-        if download and download.get('file_path'):
-            if os.path.exists(download['file_path']):
-                stats = os.stat(download['file_path'])
-                self.update_status(id, 'completed', 100, download['file_path'], stats.st_size)
-                return True
-            else:
-                self.update_status(id, 'failed', 0, None, None, 'File not found')
-                return False
-        return False
+        return bool(download and download['status'] == 'completed')
+    
+    def get_tracked_files(self, ids=None, paths=None):
+        """Get (id, file_path, status, file_size) of completed or missing downloads
+
+        Limited to the given download ids or file paths when provided.
+        """
+        sql = "SELECT id, file_path, status, file_size FROM downloads WHERE status IN ('completed', 'file_missing') AND file_path IS NOT NULL"
+        params = []
+        if ids is not None:
+            sql += f" AND id IN ({', '.join('?' * len(ids))})"
+            params.extend(ids)
+        if paths is not None:
+            sql += f" AND file_path IN ({', '.join('?' * len(paths))})"
+            params.extend(paths)
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def reconcile_files(self, ids=None, paths=None, pause_every=0):
+        """Stat tracked files and flip completed <-> file_missing in one transaction
+
+        Checks every completed/missing download, or only the given ids or
+        paths. With pause_every > 0 the scan yields the CPU after that many
+        stats so a full sweep stays in the background. Returns a dict of
+        download id -> new status for the rows that changed.
+        """
+        if (ids is not None and not ids) or (paths is not None and not paths):
+            return {}
+        missing = []
+        restored = []
+        for index, row in enumerate(self.get_tracked_files(ids, paths)):
+            if pause_every and index and index % pause_every == 0:
+                time.sleep(0.01)
+            try:
+                stats = os.stat(row['file_path'])
+            except OSError:
+                stats = None
+            if stats is None and row['status'] == 'completed':
+                missing.append(row['id'])
+            elif stats is not None and row['status'] == 'file_missing':
+                # Playlist folders keep their stored total size
+                size = row['file_size'] if os.path.isdir(row['file_path']) else stats.st_size
+                restored.append((size, row['id']))
+        
+        if not missing and not restored:
+            return {}
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                "UPDATE downloads SET status = 'file_missing', error = 'File was deleted' WHERE id = ? AND status = 'completed'",
+                [(id,) for id in missing]
+            )
+            cursor.executemany(
+                "UPDATE downloads SET status = 'completed', error = NULL, file_size = ? WHERE id = ? AND status = 'file_missing'",
+                restored
+            )
+        changes = {id: 'file_missing' for id in missing}
+        changes.update({id: 'completed' for _, id in restored})
+        return changes
     
     def close(self):
-        """Close the database connection"""
-        if hasattr(self._local, 'connection'):
-            self._local.connection.close()
-            delattr(self._local, 'connection')
+        """Flush pending progress and close all pooled connections"""
+        self.flush_progress()
+        self._pool.close()
+        self._progress_wakeup.set()
     
     # Alias methods for compatibility with the existing code
-    def addDownload(self, id, url, platform, title=None, artist=None):
-        return self.add_download(id, url, platform, title, artist)
+    def addDownload(self, id, url, platform, title=None, artist=None, canonical_id=None, settings_key=None,
+                    parent_id=None):
+        return self.add_download(id, url, platform, title, artist, canonical_id, settings_key, parent_id)
     
     def updateStatus(self, id, status, progress=None, file_path=None, file_size=None, error=None):
         return self.update_status(id, status, progress, file_path, file_size, error)
@@ -203,32 +1037,116 @@ class DownloadDatabase:
     
     def update_title(self, id, title):
         """Update the title of a download"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute('UPDATE downloads SET title = ? WHERE id = ?', (title, id))
-        conn.commit()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('UPDATE downloads SET title = ? WHERE id = ?', (title, id))
     
     def update_artist(self, id, artist):
         """Update the artist of a download"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute('UPDATE downloads SET artist = ? WHERE id = ?', (artist, id))
-        conn.commit()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('UPDATE downloads SET artist = ? WHERE id = ?', (artist, id))
     
     def update_album(self, id, album):
         """Update the album of a download"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute('UPDATE downloads SET album = ? WHERE id = ?', (album, id))
-        conn.commit()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('UPDATE downloads SET album = ? WHERE id = ?', (album, id))
+    
+    def get_loudness_analysis(self, file_hash):
+        """Get the stored loudness analysis of a file, or None"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT file_hash, input_i, input_tp, input_lra, input_thresh, source
+                FROM loudness_analysis WHERE file_hash = ?
+            ''', (file_hash,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    def save_loudness_analysis(self, file_hash, input_i, input_tp, input_lra, input_thresh, source='measured'):
+        """Store the loudness analysis of a file"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR REPLACE INTO loudness_analysis
+                    (file_hash, input_i, input_tp, input_lra, input_thresh, source)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (file_hash, input_i, input_tp, input_lra, input_thresh, source))
+    
+    def get_library_index(self, folder, recursive=True):
+        """Get path -> (size, mtime_ns, inode) of the indexed files in a folder"""
+        folder = folder.rstrip(os.sep)
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            if recursive:
+                # Every path below folder sorts between "folder/" and the
+                # character after the separator
+                cursor.execute(
+                    'SELECT path, size, mtime_ns, inode FROM library_index WHERE path > ? AND path < ?',
+                    (folder + os.sep, folder + chr(ord(os.sep) + 1))
+                )
+            else:
+                cursor.execute('SELECT path, size, mtime_ns, inode FROM library_index WHERE folder = ?', (folder,))
+            return {row['path']: dict(row) for row in cursor.fetchall()}
+    
+    def get_library_entry(self, path):
+        """Get the index row of a file, or None"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM library_index WHERE path = ?', (path,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    def get_library_files(self, folder, min_size=0):
+        """Get the index rows of the files directly in a folder, newest first"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT * FROM library_index WHERE folder = ? AND size > ?
+                ORDER BY mtime_ns DESC
+            ''', (folder.rstrip(os.sep), min_size))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def save_library_entries(self, entries):
+        """Insert or replace index rows in one transaction"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT OR REPLACE INTO library_index
+                    (path, folder, size, mtime_ns, inode, duration, title, artist, album, year, track, indexed_at)
+                VALUES (:path, :folder, :size, :mtime_ns, :inode, :duration, :title, :artist, :album, :year, :track,
+                        CURRENT_TIMESTAMP)
+            ''', entries)
+    
+    def move_library_entry(self, old_path, new_path):
+        """Point the index row of a moved file at its new path"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM library_index WHERE path = ?', (new_path,))
+            cursor.execute('UPDATE library_index SET path = ?, folder = ? WHERE path = ?',
+                           (new_path, os.path.dirname(new_path), old_path))
+    
+    def delete_library_entries(self, paths):
+        """Drop the index rows of files that no longer exist"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany('DELETE FROM library_index WHERE path = ?', [(path,) for path in paths])
+    
+    def get_library_stats(self):
+        """Number and total size of the indexed files"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM library_index')
+            files, total_size = cursor.fetchone()
+            return {'files': files, 'total_size': total_size}
     
     def clear_all_downloads(self):
         """Clear all downloads from the database"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM downloads')
-            conn.commit()
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM downloads')
             print(f"Successfully cleared all downloads from database: {self.db_path}")
         except Exception as e:
             print(f"Error clearing downloads: {e}")
@@ -237,38 +1155,74 @@ class DownloadDatabase:
     
     def clearAllDownloads(self):
         """Clear all downloads from the database"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM downloads')
-        conn.commit()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM downloads')
     
     def get_audio_settings(self):
         """Get the current audio settings"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT volume_boost, normalize_loudness, target_lufs FROM audio_settings ORDER BY id DESC LIMIT 1')
-        row = cursor.fetchone()
-        if row:
-            return {
-                'volume_boost': row[0],
-                'normalize_loudness': bool(row[1]),
-                'target_lufs': row[2]
-            }
-        else:
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            columns = ', '.join(AUDIO_SETTINGS_DEFAULTS)
+            cursor.execute(f'SELECT {columns} FROM audio_settings ORDER BY id DESC LIMIT 1')
+            row = cursor.fetchone()
+            if row:
+                settings = {}
+                for key, default in AUDIO_SETTINGS_DEFAULTS.items():
+                    value = row[key]
+                    settings[key] = bool(value) if isinstance(default, bool) else value
+                return settings
             # Return defaults if no settings found
-            return {
-                'volume_boost': 2.0,
-                'normalize_loudness': True,
-                'target_lufs': -16.0
-            }
+            return dict(AUDIO_SETTINGS_DEFAULTS)
     
-    def update_audio_settings(self, volume_boost, normalize_loudness, target_lufs):
+    def update_audio_settings(self, **settings):
         """Update the audio settings"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE audio_settings 
-            SET volume_boost = ?, normalize_loudness = ?, target_lufs = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = (SELECT MAX(id) FROM audio_settings)
-        ''', (volume_boost, 1 if normalize_loudness else 0, target_lufs))
-        conn.commit() 
\ No newline at end of file
+        set_parts = []
+        params = []
+        for key, value in settings.items():
+            if key in AUDIO_SETTINGS_DEFAULTS:
+                set_parts.append(f'{key} = ?')
+                params.append(value)
+        if not set_parts:
+            return
+        set_parts.append('updated_at = CURRENT_TIMESTAMP')
+        
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                UPDATE audio_settings
+                SET {', '.join(set_parts)}
+                WHERE id = (SELECT MAX(id) FROM audio_settings)
+            ''', params)
+    
+    def get_download_settings(self):
+        """Get the current download scheduler settings"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            columns = ', '.join(DOWNLOAD_SETTINGS_DEFAULTS)
+            cursor.execute(f'SELECT {columns} FROM download_settings ORDER BY id DESC LIMIT 1')
+            row = cursor.fetchone()
+            if row:
+                return {key: row[key] for key in DOWNLOAD_SETTINGS_DEFAULTS}
+            # Return defaults if no settings found
+            return dict(DOWNLOAD_SETTINGS_DEFAULTS)
+    
+    def update_download_settings(self, **settings):
+        """Update the download scheduler settings"""
+        set_parts = []
+        params = []
+        for key, value in settings.items():
+            if key in DOWNLOAD_SETTINGS_DEFAULTS:
+                set_parts.append(f'{key} = ?')
+                params.append(value)
+        if not set_parts:
+            return
+        set_parts.append('updated_at = CURRENT_TIMESTAMP')
+        
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                UPDATE download_settings
+                SET {', '.join(set_parts)}
+                WHERE id = (SELECT MAX(id) FROM download_settings)
+            ''', params)
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+
+
+class Subscription:
+    """Pending events for one connected client.
+
+    Updates for the same download are merged (latest value wins per field),
+    so a slow client only ever holds one pending event per download. If the
+    number of distinct downloads waiting exceeds `max_pending`, the pending
+    updates are dropped and the client is told to resync instead.
+    """
+
+    def __init__(self, loop, max_pending=500):
+        self.loop = loop
+        self.max_pending = max_pending
+        self.pending = {}  # download_id -> merged event, in arrival order
+        self.overflowed = False
+        self.coalesced = 0
+        self._ready = asyncio.Event()
+
+    def _wake(self):
+        self._ready.set()
+
+    def offer(self, download_id, fields):
+        # Called with the bus lock held, from any thread; must never block
+        if self.overflowed:
+            return
+        if download_id in self.pending:
+            self.pending[download_id].update(fields)
+            self.coalesced += 1
+        elif len(self.pending) >= self.max_pending:
+            self.pending.clear()
+            self.overflowed = True
+        else:
+            self.pending[download_id] = dict(fields, id=download_id)
+        try:
+            self.loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:
+            # Event loop already closed
+            pass
+
+    async def wait(self, timeout):
+        """Wait until events are pending or the timeout expires"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class EventBus:
+    """In-process publish/subscribe for download status and progress"""
+
+    def __init__(self, max_pending=500):
+        self.max_pending = max_pending
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self):
+        """Register a client; must be called from the event loop thread"""
+        subscription = Subscription(asyncio.get_running_loop(), self.max_pending)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, download_id, **fields):
+        """Send an update for a download to every subscriber without blocking"""
+        fields['ts'] = time.time()
+        with self._lock:
+            self.published += 1
+            for subscription in self._subscribers:
+                subscription.offer(download_id, fields)
+
+    def drain(self, subscription):
+        """Take all pending events for a subscriber.
+
+        Returns (events, overflowed); when overflowed is True the client
+        missed updates and should reload the downloads list.
+        """
+        with self._lock:
+            events = list(subscription.pending.values())
+            overflowed = subscription.overflowed
+            subscription.pending = {}
+            subscription.overflowed = False
+            subscription._ready.clear()
+        return events, overflowed
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'published': self.published,
+            }
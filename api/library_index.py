@@ -0,0 +1,157 @@
+import logging
+import os
+import threading
+import time
+
+# Files the index keeps tag data for
+AUDIO_EXTENSIONS = {'.mp3', '.m4a', '.wav', '.flac', '.ogg', '.opus', '.webm'}
+
+# Tag fields stored per file, besides size/mtime/inode
+TAG_FIELDS = ('duration', 'title', 'artist', 'album', 'year', 'track')
+
+# Changed rows are written in batches of this size
+WRITE_BATCH = 500
+
+
+class LibraryIndex:
+    """Size, mtime, inode and parsed tags of every audio file in the library.
+
+    A scan walks the directory tree with os.scandir and compares each
+    file's size, mtime and inode with its stored row; only new or changed
+    files are opened to read their tags (read_tags(path) -> dict of
+    TAG_FIELDS), and rows of vanished files are dropped. Unchanged files
+    cost a single stat, so rescanning a large library takes seconds.
+    Lookups of a single file validate the row the same way and re-read
+    the tags only when it is stale. Folders named tmp-* hold downloads in
+    progress and are skipped.
+    """
+
+    def __init__(self, db, root, read_tags):
+        self.db = db
+        self.root = str(root)
+        self.read_tags = read_tags
+        self.last_scan = None
+        self._scan_lock = threading.Lock()
+
+    def _walk(self, folder, recursive):
+        try:
+            with os.scandir(folder) as entries:
+                entries = list(entries)
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and not entry.name.startswith(('tmp-', '.')):
+                        yield from self._walk(entry.path, recursive)
+                elif (entry.is_file() and not entry.name.startswith('.')
+                      and os.path.splitext(entry.name)[1].lower() in AUDIO_EXTENSIONS):
+                    yield entry.path, entry.stat()
+            except OSError:
+                continue
+
+    def _entry(self, path, stats):
+        tags = {}
+        try:
+            tags = self.read_tags(path) or {}
+        except Exception as e:
+            logging.warning(f"Could not read tags of {path}: {e}")
+        entry = {
+            'path': path,
+            'folder': os.path.dirname(path),
+            'size': stats.st_size,
+            'mtime_ns': stats.st_mtime_ns,
+            'inode': stats.st_ino,
+        }
+        entry.update({field: tags.get(field) for field in TAG_FIELDS})
+        return entry
+
+    @staticmethod
+    def _unchanged(row, stats):
+        return (row['size'] == stats.st_size and row['mtime_ns'] == stats.st_mtime_ns
+                and row['inode'] == stats.st_ino)
+
+    def scan(self, folder=None, recursive=True, pause_every=0):
+        """Bring the rows of a folder (default: the library root) up to date.
+
+        With pause_every > 0 the scan yields the CPU after that many files
+        so a full rescan stays in the background. Returns counts of the
+        files seen, re-read and removed, and the seconds taken.
+        """
+        folder = str(folder or self.root)
+        started = time.monotonic()
+        with self._scan_lock:
+            known = self.db.get_library_index(folder, recursive)
+            changed = []
+            seen = 0
+            updated = 0
+            for path, stats in self._walk(folder, recursive):
+                seen += 1
+                if pause_every and seen % pause_every == 0:
+                    time.sleep(0.01)
+                row = known.pop(path, None)
+                if row is not None and self._unchanged(row, stats):
+                    continue
+                changed.append(self._entry(path, stats))
+                if len(changed) >= WRITE_BATCH:
+                    self.db.save_library_entries(changed)
+                    updated += len(changed)
+                    changed = []
+            if changed:
+                self.db.save_library_entries(changed)
+                updated += len(changed)
+            # Whatever is left was not found on disk any more
+            if known:
+                self.db.delete_library_entries(list(known))
+            result = {
+                'folder': folder,
+                'files': seen,
+                'updated': updated,
+                'removed': len(known),
+                'seconds': round(time.monotonic() - started, 3),
+            }
+        if folder == self.root and recursive:
+            self.last_scan = dict(result, finished_at=time.time())
+        if updated or known:
+            logging.info(f"Library index scan of {folder}: {result}")
+        return result
+
+    def refresh(self, paths):
+        """Re-check single files or folders, e.g. after a watcher event"""
+        for path in paths:
+            path = str(path)
+            if os.path.splitext(path)[1].lower() in AUDIO_EXTENSIONS and not os.path.isdir(path):
+                self.lookup(path)
+            else:
+                # A folder, or a removed one whose rows have to go
+                self.scan(path)
+
+    def lookup(self, path):
+        """Stored row of a file, re-read first if the file changed; None if it is gone"""
+        path = os.path.abspath(str(path))
+        try:
+            stats = os.stat(path)
+        except OSError:
+            self.db.delete_library_entries([path])
+            return None
+        row = self.db.get_library_entry(path)
+        if row is not None and self._unchanged(row, stats):
+            return row
+        entry = self._entry(path, stats)
+        self.db.save_library_entries([entry])
+        return entry
+
+    def move(self, old_path, new_path):
+        """Carry the row of a moved file over instead of reading its tags again"""
+        self.db.move_library_entry(os.path.abspath(str(old_path)), os.path.abspath(str(new_path)))
+        return self.lookup(new_path)
+
+    def metadata(self, path):
+        """Tag data of a file (see TAG_FIELDS), served from the index when current"""
+        row = self.lookup(path)
+        if row is None:
+            return None
+        return {field: row[field] for field in TAG_FIELDS}
+
+    def stats(self):
+        return dict(self.db.get_library_stats(), root=self.root, last_scan=self.last_scan)
@@ -0,0 +1,200 @@
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+# Main log file: rotated at this size, keeping this many old files
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+
+# A download's own log stops growing at this size
+DOWNLOAD_LOG_MAX_BYTES = 1024 * 1024
+
+# Per-download logs kept; the oldest are deleted beyond this
+MAX_DOWNLOAD_LOGS = 500
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(message)s'
+
+# Output lines of yt-dlp/spotdl/scdl go to this logger; its level sets their verbosity
+EXTRACTOR_LOGGER = 'all-dlp.extractor'
+EXTRACTOR_LOG_LEVELS = {'debug': logging.DEBUG, 'info': logging.INFO, 'warning': logging.WARNING}
+
+# Extractor output that is only progress (logged at DEBUG)
+PROGRESS_LINE = re.compile(r'^\[download\]\s+[\d.]+%|^\s*\d+%\|')
+
+_context = threading.local()
+
+
+@contextmanager
+def download_context(download_id):
+    """Tag the records logged by this thread with a download id"""
+    previous = getattr(_context, 'download_id', None)
+    _context.download_id = download_id
+    try:
+        yield
+    finally:
+        _context.download_id = previous
+
+
+class DownloadContextFilter(logging.Filter):
+    """Adds the download id of the logging thread (see download_context) to records"""
+
+    def filter(self, record):
+        if getattr(record, 'download_id', None) is None:
+            record.download_id = getattr(_context, 'download_id', None)
+        return True
+
+
+class DownloadLogHandler(logging.Handler):
+    """Writes records tagged with a download id to <directory>/<download id>.log.
+
+    Records are written on the queue listener thread, and the recently
+    used files stay open between records; remove and prune run on other
+    threads and close a file under the handler lock before deleting it.
+    """
+
+    def __init__(self, directory, max_open=32):
+        super().__init__()
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_open = max_open
+        self._files = OrderedDict()  # download id -> open file, least recently used first
+
+    def path(self, download_id):
+        # Download ids are UUIDs; anything else must not escape the directory
+        return self.directory / f"{os.path.basename(str(download_id))}.log"
+
+    def _file(self, download_id):
+        stream = self._files.pop(download_id, None)
+        if stream is None:
+            stream = open(self.path(download_id), 'a', encoding='utf-8')
+        self._files[download_id] = stream
+        while len(self._files) > self.max_open:
+            _, oldest = self._files.popitem(last=False)
+            oldest.close()
+        return stream
+
+    def emit(self, record):
+        download_id = getattr(record, 'download_id', None)
+        if not download_id:
+            return
+        try:
+            stream = self._file(download_id)
+            if stream.tell() >= DOWNLOAD_LOG_MAX_BYTES:
+                return
+            stream.write(self.format(record) + '\n')
+            stream.flush()
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        for stream in self._files.values():
+            stream.close()
+        self._files.clear()
+        super().close()
+
+    def read(self, download_id, lines=None):
+        """Contents of a download's log (the last `lines` lines if given), or None"""
+        try:
+            with open(self.path(download_id), encoding='utf-8', errors='replace') as stream:
+                text = stream.read()
+        except OSError:
+            return None
+        if lines:
+            text = ''.join(text.splitlines(keepends=True)[-lines:])
+        return text
+
+    def _forget(self, download_id):
+        # Called with the handler lock held
+        stream = self._files.pop(download_id, None)
+        if stream is not None:
+            stream.close()
+
+    def remove(self, download_id):
+        """Delete a download's log"""
+        self.acquire()
+        try:
+            self._forget(download_id)
+            os.remove(self.path(download_id))
+        except OSError:
+            pass
+        finally:
+            self.release()
+
+    def prune(self, keep=MAX_DOWNLOAD_LOGS):
+        """Delete all but the `keep` most recently written download logs"""
+        try:
+            logs = sorted(self.directory.glob('*.log'), key=lambda path: path.stat().st_mtime, reverse=True)
+        except OSError:
+            return 0
+        self.acquire()
+        try:
+            for path in logs[keep:]:
+                self._forget(path.stem)
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+        finally:
+            self.release()
+        return max(0, len(logs) - keep)
+
+
+def setup_logging(log_dir, level=logging.INFO):
+    """Route all logging through a queue to a listener thread.
+
+    Threads only enqueue records; the listener writes the rotated main log
+    file, the console and the per-download logs. Returns the started
+    QueueListener and the DownloadLogHandler.
+    """
+    log_dir = Path(log_dir)
+    log_dir.mkdir(parents=True, exist_ok=True)
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_dir / "all-dlp.log", maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding='utf-8'
+    )
+    stream_handler = logging.StreamHandler()
+    download_handler = DownloadLogHandler(log_dir / "downloads")
+    for handler in (file_handler, stream_handler, download_handler):
+        handler.setFormatter(formatter)
+
+    queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(DownloadContextFilter())
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(queue_handler.queue, file_handler, stream_handler, download_handler,
+                                              respect_handler_level=True)
+    listener.start()
+    return listener, download_handler
+
+
+def set_extractor_log_level(name):
+    """Verbosity of extractor output: 'debug' (everything, with progress lines), 'info' or 'warning'"""
+    logging.getLogger(EXTRACTOR_LOGGER).setLevel(EXTRACTOR_LOG_LEVELS.get(name, logging.INFO))
+
+
+def log_tool_output(tool, line, download_id=None, level=None):
+    """Log a line of extractor output, at a level matching its content unless given"""
+    line = line.strip()
+    if not line:
+        return
+    if level is None:
+        if line.startswith(('ERROR', 'WARNING')) or 'Error' in line:
+            level = logging.WARNING
+        elif PROGRESS_LINE.search(line):
+            level = logging.DEBUG
+        else:
+            level = logging.INFO
+    logger = logging.getLogger(EXTRACTOR_LOGGER)
+    if logger.isEnabledFor(level):
+        logger.log(level, f"[{tool}] {line}", extra={'download_id': download_id} if download_id else None)
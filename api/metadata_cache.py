@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+class MetadataCache:
+    """Resolved URL metadata with a time-to-live, keyed by canonical URL.
+
+    Concurrent lookups of the same key share a single resolve, so a URL the
+    UI is resolving while its download starts is only probed once. Entries
+    may reference an info file (e.g. yt-dlp's info JSON) in `files_dir`;
+    it is deleted together with the entry.
+    """
+
+    def __init__(self, files_dir, ttl=1800, max_entries=256):
+        self.files_dir = Path(files_dir)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, metadata), least recently used first
+        self._inflight = {}  # key -> threading.Event set when the resolve finished
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def clear_files(self):
+        """Create files_dir and delete the info files of a previous run, which are unknown to this cache"""
+        self.files_dir.mkdir(parents=True, exist_ok=True)
+        for leftover in self.files_dir.iterdir():
+            try:
+                leftover.unlink()
+            except OSError:
+                pass
+
+    def info_path(self, key, suffix='.json'):
+        """Path for the info file of a key"""
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return self.files_dir / f"{digest}{suffix}"
+
+    def _drop(self, key, keep=None):
+        # Called with the lock held; the info file is kept if it is `keep`
+        _, metadata = self._entries.pop(key)
+        info_file = metadata.get('info_file')
+        if info_file and str(info_file) != str(keep):
+            try:
+                os.remove(info_file)
+            except OSError:
+                pass
+
+    def _lookup(self, key):
+        # Called with the lock held
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def get(self, key):
+        """Return the cached metadata for a key, or None if missing or expired"""
+        with self._lock:
+            metadata = self._lookup(key)
+            if metadata is not None:
+                self.hits += 1
+            return metadata
+
+    def put(self, key, metadata):
+        with self._lock:
+            if key in self._entries:
+                # The new metadata may have been written to the old entry's info file
+                self._drop(key, keep=metadata.get('info_file'))
+            self._entries[key] = (time.time() + self.ttl, metadata)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def get_or_resolve(self, key, resolver):
+        """Return cached metadata or call resolver() once for all waiting callers.
+
+        Returns (metadata, cached). A resolver returning None is not cached.
+        """
+        while True:
+            with self._lock:
+                metadata = self._lookup(key)
+                if metadata is not None:
+                    self.hits += 1
+                    return metadata, True
+                pending = self._inflight.get(key)
+                if pending is None:
+                    pending = self._inflight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Another thread is resolving this key; use its result
+            pending.wait()
+            with self._lock:
+                metadata = self._lookup(key)
+                if metadata is not None:
+                    self.hits += 1
+                    return metadata, True
+            # It failed; try ourselves
+
+        try:
+            metadata = resolver()
+            if metadata is not None:
+                self.put(key, metadata)
+            return metadata, False
+        except Exception as e:
+            logging.warning(f"Resolving metadata for {key} failed: {e}")
+            return None, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            pending.set()
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'ttl': self.ttl,
+            }
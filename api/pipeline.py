@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+
+# Stages every download runs through, in order
+STAGES = ('resolve', 'fetch', 'postprocess', 'finalize')
+
+# Network-bound stages run on the download worker, CPU-bound ones on a StagePool
+FETCH_STAGES = STAGES[:2]
+PROCESS_STAGES = STAGES[2:]
+
+
+class PipelineError(Exception):
+    """An expected download failure; the message is stored as the download's error"""
+
+
+class DownloadJob:
+    """State of one download passed from stage to stage"""
+
+    def __init__(self, download_id, url, platform, temp_dir):
+        self.download_id = download_id
+        self.url = url
+        self.platform = platform
+        self.temp_dir = temp_dir
+        self.is_playlist = False
+        self.title = None
+        self.resolved = None  # metadata from the resolve stage
+        self.settings = None  # audio settings the download is processed with
+        self.native_audio = False  # fetch left non-MP3 audio that postprocess converts
+        self.processed = False  # audio processing already happened during fetch
+        self.album_gain = False  # loudness is normalized over the whole playlist, not per track
+        self.extract_seconds = None  # time the extractor spent converting to MP3
+        self.throttled = False  # the platform throttled the last extractor run
+        self.rate_limit = None  # bytes per second the extractor may download at (None = unlimited)
+        self.files = []  # audio files ready to finalize
+        self.timings = {}  # stage -> seconds
+
+
+class DownloadBackend(ABC):
+    """One platform's implementation of the download stages.
+
+    resolve: find out what the URL is (title, playlist, metadata)
+    fetch: download the audio into job.temp_dir
+    postprocess: convert and normalize the downloaded audio
+    finalize: move the result into place and record it
+
+    A stage fails a download by raising PipelineError. Stages share state
+    only through the DownloadJob, so a backend can replace one stage
+    without touching the others.
+    """
+
+    platform = None
+
+    def resolve(self, job):
+        pass
+
+    @abstractmethod
+    def fetch(self, job):
+        pass
+
+    def postprocess(self, job):
+        pass
+
+    def finalize(self, job):
+        pass
+
+
+class PipelineStats:
+    """Time spent in each stage, per platform"""
+
+    def __init__(self):
+        self._stats = {}  # platform -> stage -> {'runs', 'seconds'}
+        self._lock = threading.Lock()
+
+    def record(self, platform, timings):
+        with self._lock:
+            stages = self._stats.setdefault(platform, {})
+            for stage, seconds in timings.items():
+                values = stages.setdefault(stage, {'runs': 0, 'seconds': 0.0})
+                values['runs'] += 1
+                values['seconds'] += seconds
+
+    def stats(self):
+        """Run count, total and average seconds per platform and stage"""
+        with self._lock:
+            result = {}
+            for platform, stages in self._stats.items():
+                result[platform] = {
+                    stage: dict(values, seconds_per_run=values['seconds'] / values['runs'])
+                    for stage, values in stages.items()
+                }
+            return result
+
+
+class StagePool:
+    """Fixed number of threads running queued stage tasks in FIFO order.
+
+    Separate from the download scheduler, so CPU-bound post-processing of
+    finished fetches doesn't occupy the slots that start new downloads.
+    Tasks submitted before start() wait in the queue.
+    """
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = max(1, int(workers))
+        self._queue = deque()
+        self._running = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._started = False
+
+    def start(self):
+        """Start the worker threads"""
+        with self._cond:
+            if self._started:
+                return
+            self._started = True
+            self._stopped = False
+        for index in range(self.workers):
+            threading.Thread(target=self._worker_loop, daemon=True,
+                             name=f"{self.name}-worker-{index + 1}").start()
+
+    def submit(self, task, *args):
+        with self._cond:
+            self._queue.append((task, args))
+            self._cond.notify()
+
+    def stop(self):
+        """Ask the workers to exit once their current task is finished"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {'workers': self.workers, 'queued': len(self._queue), 'running': self._running}
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    if self._stopped:
+                        return
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                task, args = self._queue.popleft()
+                self._running += 1
+            try:
+                task(*args)
+            except Exception as e:
+                logging.exception(f"Unhandled error in {self.name} task: {e}")
+            finally:
+                with self._cond:
+                    self._running -= 1
+
+
+def run_stages(backend, job, stages=STAGES, stats=None):
+    """Run stages of a backend in order, timing each one.
+
+    Exceptions propagate to the caller; the timings of the stages that ran,
+    including the failed one, are recorded either way.
+    """
+    timings = {}
+    try:
+        for stage in stages:
+            started = time.monotonic()
+            try:
+                getattr(backend, stage)(job)
+            finally:
+                timings[stage] = time.monotonic() - started
+    finally:
+        job.timings.update(timings)
+        if stats is not None:
+            stats.record(job.platform, timings)
+        logging.info(f"Download {job.download_id} stage timings: "
+                     + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items()))
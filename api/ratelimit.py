@@ -0,0 +1,129 @@
+import random
+import re
+import threading
+import time
+
+# An HTTP 429 status in extractor output means the platform is throttling us
+HTTP_429_PATTERN = re.compile(r'HTTP Error 429|\b429 Too Many Requests|\bstatus:? 429\b', re.IGNORECASE)
+
+# Throttling wording; titles and metadata can contain it too, so only error and warning lines count
+THROTTLE_PATTERN = re.compile(r'Too Many Requests|rate[/ -]?(?:request )?limit|rate-limited', re.IGNORECASE)
+
+# yt-dlp/scdl error and warning lines, and exceptions printed by spotdl
+ERROR_LINE = re.compile(r'^\s*(?:ERROR|WARNING)\b|^\s*[\w.]*(?:Error|Exception):')
+
+
+def is_throttle_message(text, error=False):
+    """True if extractor output reports throttling.
+
+    Each line counts if it has an HTTP 429 status, or throttling wording
+    on an error or warning line; error=True marks text that is an error or
+    warning message without the prefix (e.g. from the library engine).
+    """
+    if not text:
+        return False
+    for line in text.splitlines():
+        if HTTP_429_PATTERN.search(line):
+            return True
+        if (error or ERROR_LINE.match(line)) and THROTTLE_PATTERN.search(line):
+            return True
+    return False
+
+
+def backoff_delay(attempt, base=5.0, cap=120.0):
+    """Seconds to wait before retry number `attempt` (0-based): exponential with jitter"""
+    delay = min(cap, base * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class TokenBucket:
+    """Requests per second with a burst allowance; the rate can change at runtime"""
+
+    def __init__(self, rate, burst, min_rate, max_rate):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def refill(self):
+        # Called with the limiter lock held
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self):
+        """Take a token, or return the seconds until one is available"""
+        self.refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Token bucket per platform whose rate adapts by AIMD.
+
+    Every extractor request takes a token from its platform's bucket.
+    A successful download raises the rate by `increase` requests per
+    second (additive increase); a throttled one multiplies it by
+    `decrease` and empties the bucket (multiplicative decrease). Batches
+    then settle just below the rate a platform tolerates instead of
+    running into 429s and stalling.
+    """
+
+    def __init__(self, limits, increase=0.05, decrease=0.5):
+        self.increase = increase
+        self.decrease = decrease
+        self._buckets = {platform: TokenBucket(**limit) for platform, limit in limits.items()}
+        self._counters = {platform: {'requests': 0, 'throttled': 0, 'waited_seconds': 0.0}
+                          for platform in limits}
+        self._lock = threading.Lock()
+
+    def acquire(self, platform):
+        """Block until the platform allows another request; returns the seconds waited"""
+        bucket = self._buckets.get(platform)
+        if bucket is None:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                delay = bucket.take()
+                if not delay:
+                    counters = self._counters[platform]
+                    counters['requests'] += 1
+                    counters['waited_seconds'] += waited
+                    return waited
+            time.sleep(delay)
+            waited += delay
+
+    def record_success(self, platform):
+        bucket = self._buckets.get(platform)
+        if bucket is None:
+            return
+        with self._lock:
+            bucket.rate = min(bucket.max_rate, bucket.rate + self.increase)
+
+    def record_throttle(self, platform):
+        bucket = self._buckets.get(platform)
+        if bucket is None:
+            return
+        with self._lock:
+            bucket.rate = max(bucket.min_rate, bucket.rate * self.decrease)
+            bucket.refill()
+            bucket.tokens = 0.0
+            self._counters[platform]['throttled'] += 1
+
+    def stats(self):
+        with self._lock:
+            result = {}
+            for platform, bucket in self._buckets.items():
+                bucket.refill()
+                result[platform] = dict(
+                    self._counters[platform],
+                    rate=round(bucket.rate, 3),
+                    tokens=round(bucket.tokens, 2),
+                    burst=bucket.burst,
+                )
+            return result
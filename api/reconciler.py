@@ -0,0 +1,176 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+# inotify event flags (see inotify(7))
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o0004000
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Minimal inotify wrapper reporting names created/removed in one directory"""
+
+    def __init__(self, path):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(IN_CLOEXEC | IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {path}")
+        self.path = str(path)
+
+    def poll(self, timeout):
+        """Wait up to timeout seconds; return (removed, added) file paths"""
+        removed, added = set(), set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return removed, added
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return removed, added
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            path = os.path.join(self.path, os.fsdecode(name))
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                removed.add(path)
+                added.discard(path)
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                added.add(path)
+                removed.discard(path)
+        return removed, added
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback watcher that diffs directory listings every poll"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._snapshot = self._list()
+
+    def _list(self):
+        try:
+            with os.scandir(self.path) as entries:
+                return {entry.path for entry in entries}
+        except OSError:
+            return set()
+
+    def poll(self, timeout):
+        time.sleep(timeout)
+        current = self._list()
+        removed = self._snapshot - current
+        added = current - self._snapshot
+        self._snapshot = current
+        return removed, added
+
+    def close(self):
+        pass
+
+
+class FileReconciler:
+    """Keeps the file_missing state of downloads in sync with DOWNLOADS_DIR.
+
+    A directory watcher reacts to files being deleted or restored, and a
+    periodic low-priority sweep catches anything the watcher can't see
+    (e.g. files outside the watched folder or events lost while stopped).
+    All status changes are written in bulk by DownloadDatabase.reconcile_files.
+    The same events and sweeps keep an optional LibraryIndex up to date.
+    """
+
+    def __init__(self, db, downloads_dir, on_change=None, sweep_interval=600, poll_interval=5.0,
+                 library_index=None):
+        self.db = db
+        self.library_index = library_index
+        self.downloads_dir = downloads_dir
+        self.on_change = on_change
+        self.sweep_interval = sweep_interval
+        self.poll_interval = poll_interval
+        self.watcher_type = None
+        self.last_sweep = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="file-reconciler")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _make_watcher(self):
+        if sys.platform.startswith('linux'):
+            try:
+                return InotifyWatcher(self.downloads_dir)
+            except (OSError, AttributeError) as e:
+                logging.warning(f"inotify not available, polling {self.downloads_dir} instead: {e}")
+        return PollingWatcher(self.downloads_dir)
+
+    def _apply(self, changes):
+        if changes:
+            logging.info(f"File reconciler updated {len(changes)} download(s)")
+            if self.on_change:
+                self.on_change(changes)
+
+    def sweep(self):
+        """Stat every completed/missing download in the background"""
+        changes = self.db.reconcile_files(pause_every=200)
+        self.last_sweep = time.time()
+        self._apply(changes)
+        if self.library_index is not None:
+            self.library_index.scan(pause_every=200)
+        return changes
+
+    def _run(self):
+        watcher = self._make_watcher()
+        self.watcher_type = type(watcher).__name__
+        logging.info(f"File reconciler watching {self.downloads_dir} with {self.watcher_type}")
+        next_sweep = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                try:
+                    if time.monotonic() >= next_sweep:
+                        self.sweep()
+                        next_sweep = time.monotonic() + self.sweep_interval
+                    removed, added = watcher.poll(self.poll_interval)
+                    if removed or added:
+                        # Let a burst of events (e.g. a folder being deleted) settle
+                        time.sleep(0.2)
+                        more_removed, more_added = watcher.poll(0)
+                        paths = list(removed | added | more_removed | more_added)
+                        self._apply(self.db.reconcile_files(paths=paths))
+                        if self.library_index is not None:
+                            self.library_index.refresh(paths)
+                except Exception as e:
+                    logging.error(f"File reconciler error: {e}")
+                    self._stop.wait(self.poll_interval)
+        finally:
+            watcher.close()
+
+    def stats(self):
+        return {
+            'watcher': self.watcher_type,
+            'sweep_interval': self.sweep_interval,
+            'last_sweep': self.last_sweep,
+        }
@@ -0,0 +1,185 @@
+import heapq
+import logging
+import threading
+
+# Platforms the scheduler knows how to limit individually
+PLATFORMS = ('youtube', 'spotify', 'soundcloud')
+
+
+class DownloadScheduler:
+    """Bounded worker pool that runs queued downloads.
+
+    Jobs are persisted in the downloads table with status 'queued' so that
+    they survive a server restart. In memory every platform has a heap
+    ordered by priority (highest first) and then by submission order
+    (FIFO); the next job is the first one of the platforms below their
+    limit. Cancelled and resubmitted jobs leave stale heap entries behind,
+    which are skipped when they come up.
+    """
+
+    def __init__(self, runner, db=None, max_workers=3, platform_limits=None):
+        self.runner = runner
+        self.db = db
+        self.max_workers = max(1, int(max_workers))
+        self.platform_limits = dict(platform_limits or {})
+        self._queues = {}  # platform -> heap of (-priority, seq, job)
+        self._queued = {}  # download_id -> seq of its live heap entry
+        self._running = {}  # download_id -> platform
+        self._seq = 0
+        self._workers = []
+        self._cond = threading.Condition()
+        self._stopped = False
+
+    def start(self):
+        """Restore persisted queued jobs and start the worker threads"""
+        if self.db:
+            for row in self.db.get_queued_downloads():
+                self._push({
+                    'id': row['id'],
+                    'url': row['url'],
+                    'platform': row['platform'],
+                }, row.get('priority') or 0)
+            if self._queued:
+                logging.info(f"Restored {len(self._queued)} queued download(s) from database")
+        with self._cond:
+            self._stopped = False
+            self._spawn_workers()
+
+    def stop(self):
+        """Ask the workers to exit once their current job is finished"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def configure(self, max_workers=None, platform_limits=None):
+        """Change the global and per-platform concurrency limits at runtime"""
+        with self._cond:
+            if max_workers is not None:
+                self.max_workers = max(1, int(max_workers))
+            if platform_limits is not None:
+                self.platform_limits = dict(platform_limits)
+            self._spawn_workers()
+            self._cond.notify_all()
+        logging.info(f"Scheduler configured: max_workers={self.max_workers}, platform_limits={self.platform_limits}")
+
+    def submit(self, download_id, url, platform, priority=0):
+        """Queue a download; it starts as soon as a worker slot is free"""
+        if self.db:
+            self.db.enqueue_download(download_id, priority)
+        # A redownload may resubmit an id that is still waiting; its old entry goes stale
+        self._push({'id': download_id, 'url': url, 'platform': platform}, priority)
+
+    def submit_many(self, jobs, priority=0):
+        """Queue downloads (dicts with id, url and platform) that are already queued in the database"""
+        with self._cond:
+            for job in jobs:
+                self._push_locked(job, priority)
+            self._cond.notify_all()
+
+    def cancel(self, download_id):
+        """Remove a job from the queue if it has not started yet"""
+        with self._cond:
+            return self._queued.pop(download_id, None) is not None
+
+    def clear(self):
+        """Drop every job that has not started yet"""
+        with self._cond:
+            self._queues = {}
+            self._queued = {}
+
+    def queue_positions(self):
+        """Return a mapping of download id -> 1-based position in the queue"""
+        with self._cond:
+            live = sorted(entry[:2] + (entry[2]['id'],) for queue in self._queues.values()
+                          for entry in queue if self._is_live(entry))
+            return {download_id: index + 1 for index, (_, _, download_id) in enumerate(live)}
+
+    def stats(self):
+        """Return a snapshot of queue and worker usage"""
+        with self._cond:
+            running_by_platform = {}
+            for platform in self._running.values():
+                running_by_platform[platform] = running_by_platform.get(platform, 0) + 1
+            return {
+                'max_workers': self.max_workers,
+                'platform_limits': dict(self.platform_limits),
+                'queued': len(self._queued),
+                'running': len(self._running),
+                'running_by_platform': running_by_platform,
+            }
+
+    def _push(self, job, priority):
+        with self._cond:
+            self._push_locked(job, priority)
+            self._cond.notify_all()
+
+    def _push_locked(self, job, priority):
+        # Called with the condition held
+        self._seq += 1
+        self._queued[job['id']] = self._seq
+        queue = self._queues.setdefault(job['platform'], [])
+        heapq.heappush(queue, (-int(priority), self._seq, job))
+        if len(queue) > 2 * len(self._queued) + 64:
+            # Mostly stale entries; rebuild without them
+            queue[:] = [entry for entry in queue if self._is_live(entry)]
+            heapq.heapify(queue)
+
+    def _is_live(self, entry):
+        # Called with the condition held
+        return self._queued.get(entry[2]['id']) == entry[1]
+
+    def _spawn_workers(self):
+        # Called with the condition held
+        self._workers = [worker for worker in self._workers if worker.is_alive()]
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._worker_loop, daemon=True,
+                                      name=f"download-worker-{len(self._workers) + 1}")
+            self._workers.append(worker)
+            worker.start()
+
+    def _platform_has_capacity(self, platform):
+        limit = self.platform_limits.get(platform)
+        if not limit:
+            return True
+        running = sum(1 for running_platform in self._running.values() if running_platform == platform)
+        return running < limit
+
+    def _take_next_job(self):
+        # Called with the condition held
+        if len(self._running) >= self.max_workers:
+            return None
+        best = None
+        for platform, queue in self._queues.items():
+            while queue and not self._is_live(queue[0]):
+                heapq.heappop(queue)
+            if queue and self._platform_has_capacity(platform) and (best is None or queue[0] < best[0]):
+                best = (queue[0], queue)
+        if best is None:
+            return None
+        job = heapq.heappop(best[1])[2]
+        del self._queued[job['id']]
+        self._running[job['id']] = job['platform']
+        return job
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                job = None
+                while job is None:
+                    if self._stopped or len(self._workers) > self.max_workers:
+                        self._workers = [worker for worker in self._workers
+                                         if worker is not threading.current_thread()]
+                        return
+                    job = self._take_next_job()
+                    if job is None:
+                        self._cond.wait()
+            try:
+                self.runner(job['id'], job['url'], job['platform'])
+            except Exception as e:
+                logging.exception(f"Unhandled error in download worker for {job['id']}: {e}")
+                if self.db:
+                    self.db.update_status(job['id'], "failed", error=str(e))
+            finally:
+                with self._cond:
+                    self._running.pop(job['id'], None)
+                    self._cond.notify_all()
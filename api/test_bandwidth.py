@@ -0,0 +1,40 @@
+from bandwidth import BandwidthAllocator
+
+KB = 1024
+
+
+def test_fixed_rate_jobs_get_a_fair_slot_share():
+    """Subprocess jobs started one after another all get total / slots"""
+    bandwidth = BandwidthAllocator(total_rate=900 * KB, slots=3)
+    rates = [bandwidth.register(job_id) for job_id in ('a', 'b', 'c')]
+    assert rates == [300 * KB] * 3
+    assert sum(bandwidth.stats()['allocations'].values()) <= 900 * KB
+
+    # A job starting after one finished gets the same rate, not what was left
+    bandwidth.release('a')
+    assert bandwidth.register('d') == 300 * KB
+
+
+def test_fixed_rate_jobs_are_capped_by_the_job_rate():
+    bandwidth = BandwidthAllocator(total_rate=900 * KB, job_rate=100 * KB, slots=3)
+    assert bandwidth.register('a') == 100 * KB
+
+
+def test_watched_jobs_share_what_fixed_rate_jobs_leave():
+    bandwidth = BandwidthAllocator(total_rate=900 * KB, slots=3)
+    rates = {}
+    bandwidth.register('fixed')
+    bandwidth.register('watched')
+    bandwidth.watch('watched', lambda rate: rates.update(watched=rate))
+    assert rates['watched'] == 600 * KB
+
+    bandwidth.register('other')
+    assert rates['watched'] == 300 * KB
+    bandwidth.release('fixed')
+    assert rates['watched'] == 600 * KB
+    assert sum(bandwidth.stats()['allocations'].values()) <= 900 * KB
+
+
+def test_unlimited_without_a_budget():
+    bandwidth = BandwidthAllocator(slots=3)
+    assert bandwidth.register('a') is None
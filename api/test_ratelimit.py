@@ -0,0 +1,20 @@
+from ratelimit import is_throttle_message
+
+
+def test_throttle_errors_are_detected():
+    assert is_throttle_message("ERROR: [youtube] abc: Unable to download webpage: HTTP Error 429: Too Many Requests")
+    assert is_throttle_message("WARNING: [soundcloud] Got rate limited, retrying")
+    assert is_throttle_message("spotipy.exceptions.SpotifyException: http status: 429, code:-1")
+    assert is_throttle_message("You are being rate-limited", error=True)
+
+
+def test_titles_with_the_phrase_are_not_throttling():
+    assert not is_throttle_message("[download] Destination: /tmp/Rate Limit - Too Many Requests.webm")
+    assert not is_throttle_message('[info] Downloading "Rate Limit" by The Throttles')
+    assert not is_throttle_message("Downloaded \"Rate-Limited Love\": https://open.spotify.com/track/x")
+
+
+def test_multi_line_output_is_checked_per_line():
+    output = "[youtube] Extracting URL\nRate Limit (Official Video)\nERROR: HTTP Error 429: Too Many Requests"
+    assert is_throttle_message(output)
+    assert not is_throttle_message("[youtube] Extracting URL\nRate Limit (Official Video)\n")
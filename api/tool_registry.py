@@ -0,0 +1,127 @@
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Seconds between checks whether a tool's binary was replaced (or installed)
+RECHECK_INTERVAL = 10.0
+
+# Seconds a single probe command may take
+PROBE_TIMEOUT = 20.0
+
+VERSION_PATTERN = re.compile(r'(\d+(?:\.\d+)+)')
+
+
+class ToolRegistry:
+    """Paths, versions and capabilities of the external tools, probed once.
+
+    probes maps a tool name to its version arguments and a list of
+    (arguments, {capability: regex}) probes; a capability is present when
+    its regex matches the probe's output. locate(name) returns the path to
+    try (bundle or virtualenv) or the bare name, which is looked up on the
+    PATH of env. Results are cached; the binary's mtime is checked at most
+    every RECHECK_INTERVAL seconds and the tool is probed again when it
+    changed or appeared.
+    """
+
+    def __init__(self, probes, locate, env=None):
+        self.probes = probes
+        self.locate = locate
+        self.env = env
+        self._entries = {}  # name -> probe result
+        self._checked = {}  # name -> monotonic time of the last mtime check
+        self._locks = {name: threading.Lock() for name in probes}
+
+    def _resolve(self, name):
+        candidate = self.locate(name)
+        if os.path.isabs(candidate):
+            return candidate if os.access(candidate, os.X_OK) else None
+        return shutil.which(candidate, path=(self.env or os.environ).get('PATH'))
+
+    def _run(self, path, args):
+        result = subprocess.run([path, *args], capture_output=True, text=True, timeout=PROBE_TIMEOUT,
+                                env=self.env)
+        return result.stdout + result.stderr
+
+    def _probe(self, name):
+        started = time.monotonic()
+        entry = {'path': None, 'version': None, 'capabilities': None, 'mtime': None, 'error': None}
+        path = self._resolve(name)
+        if path is None:
+            entry['error'] = "not found"
+        else:
+            entry['path'] = path
+            entry['mtime'] = os.stat(path).st_mtime
+            spec = self.probes[name]
+            try:
+                output = self._run(path, spec['version'])
+                match = VERSION_PATTERN.search(output)
+                lines = output.strip().splitlines()
+                entry['version'] = match.group(1) if match else (lines[0][:80] if lines else None)
+                capabilities = []
+                for args, patterns in spec.get('capabilities', ()):
+                    output = self._run(path, args)
+                    capabilities += [capability for capability, pattern in patterns.items()
+                                     if re.search(pattern, output)]
+                entry['capabilities'] = sorted(capabilities)
+            except (OSError, subprocess.SubprocessError) as e:
+                entry['error'] = str(e)
+        entry['probe_seconds'] = round(time.monotonic() - started, 3)
+        if entry['error']:
+            logging.warning(f"Tool {name}: {entry['error']}")
+        else:
+            logging.info(f"Tool {name} {entry['version']} at {entry['path']}, capabilities: {entry['capabilities']}")
+        return entry
+
+    def _stale(self, name, entry):
+        # Called with the tool's lock held
+        now = time.monotonic()
+        if now - self._checked.get(name, 0) < RECHECK_INTERVAL:
+            return False
+        self._checked[name] = now
+        if entry['path'] is None:
+            return self._resolve(name) is not None
+        try:
+            return os.stat(entry['path']).st_mtime != entry['mtime']
+        except OSError:
+            return True
+
+    def get(self, name):
+        """Probe result of a tool (probing it first if needed)"""
+        with self._locks[name]:
+            entry = self._entries.get(name)
+            if entry is None or self._stale(name, entry):
+                entry = self._entries[name] = self._probe(name)
+                self._checked[name] = time.monotonic()
+            return entry
+
+    def probe_all(self):
+        """Probe every tool in parallel; returns the results by name"""
+        with ThreadPoolExecutor(max_workers=len(self.probes)) as pool:
+            return dict(zip(self.probes, pool.map(self.get, self.probes)))
+
+    def path(self, name):
+        """Resolved path of a tool, or its bare name if it wasn't found"""
+        return self.get(name)['path'] or name
+
+    def has(self, name, capability=None):
+        """Tool is installed (and, if given, has the capability).
+
+        A capability whose probe could not run counts as present, so an
+        unusual build is tried rather than ruled out.
+        """
+        entry = self.get(name)
+        if entry['path'] is None:
+            return False
+        if capability is None or entry['capabilities'] is None:
+            return True
+        return capability in entry['capabilities']
+
+    def snapshot(self):
+        """Cached results without probing, for status reports"""
+        return {name: dict(self._entries[name]) if name in self._entries else {'probed': False}
+                for name in self.probes}
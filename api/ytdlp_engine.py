@@ -0,0 +1,216 @@
+import importlib.util
+import json
+import logging
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+WORKER_SCRIPT = Path(__file__).parent / "ytdlp_worker.py"
+
+# Seconds to wait for a new worker process to import yt_dlp
+WORKER_START_TIMEOUT = 60.0
+
+
+class EngineError(Exception):
+    """A worker process failed; the job should fall back to the yt-dlp executable"""
+
+
+class _Worker:
+    """One warm worker process running ytdlp_worker.py"""
+
+    def __init__(self, python, env):
+        self.process = subprocess.Popen(
+            [python, str(WORKER_SCRIPT)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1, env=env,
+        )
+        ready = self._read_event(WORKER_START_TIMEOUT)
+        if ready.get('event') != 'ready':
+            self.close()
+            raise EngineError(f"yt-dlp worker did not start: {ready}")
+        self.startup_seconds = ready['startup_seconds']
+        self.jobs = 0
+        self._stdin_lock = threading.Lock()
+
+    def _read_event(self, timeout=None):
+        if timeout is not None:
+            # Only used at startup; jobs may legitimately run for a long time
+            timer = threading.Timer(timeout, self.process.kill)
+            timer.start()
+        try:
+            line = self.process.stdout.readline()
+        finally:
+            if timeout is not None:
+                timer.cancel()
+        if not line:
+            raise EngineError(f"yt-dlp worker exited with code {self.process.poll()}")
+        return json.loads(line)
+
+    def send(self, message):
+        with self._stdin_lock:
+            self.process.stdin.write(json.dumps(message) + '\n')
+            self.process.stdin.flush()
+
+    def run(self, job, on_event):
+        self.send(job)
+        while True:
+            event = self._read_event()
+            if event.get('event') == 'done':
+                self.jobs += 1
+                return event
+            on_event(event)
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+class YtDlpEngine:
+    """Runs yt-dlp as a library in a bounded pool of warm worker processes.
+
+    Each worker imports yt_dlp once and then takes one job at a time, so jobs
+    skip interpreter startup and the yt_dlp import, and report progress
+    through structured progress hooks instead of console output. Workers are
+    separate processes, so a crashing extractor can't take the server down;
+    the caller falls back to the yt-dlp executable on EngineError.
+    """
+
+    def __init__(self, max_processes=2, python=None, env=None):
+        self.max_processes = max(1, int(max_processes))
+        self.python = python or sys.executable
+        self.env = env
+        self._idle = []
+        self._busy = 0
+        self._running = {}  # job id -> worker
+        self._pending_rates = {}  # job id -> rate set before the job reached a worker
+        self._cond = threading.Condition()
+        self._closed = False
+        self.workers_started = 0
+
+    @staticmethod
+    def available():
+        """yt_dlp is importable by a plain Python interpreter (not in a frozen build)"""
+        return not getattr(sys, 'frozen', False) and importlib.util.find_spec('yt_dlp') is not None
+
+    def configure(self, max_processes):
+        with self._cond:
+            self.max_processes = max(1, int(max_processes))
+            # Surplus idle workers are closed outside the lock
+            surplus = self._idle[self.max_processes:]
+            del self._idle[self.max_processes:]
+            self._cond.notify_all()
+        for worker in surplus:
+            worker.close()
+
+    def _acquire(self):
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise EngineError("Engine is shut down")
+                while self._idle:
+                    worker = self._idle.pop()
+                    if worker.alive():
+                        self._busy += 1
+                        return worker
+                if self._busy < self.max_processes:
+                    self._busy += 1
+                    break
+                self._cond.wait()
+        # Start a new worker without holding the lock
+        try:
+            worker = _Worker(self.python, self.env)
+        except Exception:
+            with self._cond:
+                self._busy -= 1
+                self._cond.notify()
+            raise
+        self.workers_started += 1
+        logging.info(f"Started yt-dlp worker process (ready in {worker.startup_seconds:.2f}s)")
+        return worker
+
+    def _release(self, worker, reusable):
+        with self._cond:
+            self._busy -= 1
+            if reusable and not self._closed and len(self._idle) + self._busy < self.max_processes:
+                self._idle.append(worker)
+                worker = None
+            self._cond.notify()
+        if worker:
+            worker.close()
+
+    def run(self, options, on_event, url=None, info_file=None, job_id=None):
+        """Download `url` (or an info JSON file) with YoutubeDL options.
+
+        on_event receives 'log', 'progress' and 'postprocess' events on the
+        calling thread. Returns the final 'done' event, which includes the
+        return code and the worker's peak resident memory during the job.
+        """
+        try:
+            worker = self._acquire()
+        except EngineError:
+            self.discard(job_id)
+            raise
+        except Exception as e:
+            self.discard(job_id)
+            raise EngineError(f"Could not start yt-dlp worker: {e}")
+        job_id = job_id or str(uuid.uuid4())
+        options = dict(options)
+        reusable = False
+        with self._cond:
+            self._running[job_id] = worker
+            if job_id in self._pending_rates:
+                options['ratelimit'] = self._pending_rates.pop(job_id)
+        job = {'id': job_id, 'url': url, 'info_file': info_file, 'options': options}
+        try:
+            result = worker.run(job, on_event)
+            reusable = True
+            return result
+        except (OSError, ValueError) as e:
+            raise EngineError(f"yt-dlp worker failed: {e}")
+        finally:
+            with self._cond:
+                self._running.pop(job_id, None)
+                self._pending_rates.pop(job_id, None)
+            self._release(worker, reusable)
+
+    def set_rate(self, job_id, rate):
+        """Change the download rate (bytes per second, None = unlimited) of a running job"""
+        with self._cond:
+            worker = self._running.get(job_id)
+            if worker is None:
+                self._pending_rates[job_id] = rate
+                return
+        worker.send({'control': 'ratelimit', 'id': job_id, 'ratelimit': rate})
+
+    def discard(self, job_id):
+        """Forget a rate set for a job that will not run (any more)"""
+        with self._cond:
+            self._pending_rates.pop(job_id, None)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            workers, self._idle = self._idle, []
+            self._cond.notify_all()
+        for worker in workers:
+            worker.close()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_processes': self.max_processes,
+                'idle': len(self._idle),
+                'busy': self._busy,
+                'workers_started': self.workers_started,
+            }
@@ -0,0 +1,195 @@
+"""Long-lived yt-dlp worker process, started and driven by ytdlp_engine.YtDlpEngine.
+
+yt_dlp is imported once at startup; every job then runs in this warm process.
+Jobs arrive as one JSON object per line on stdin, events are written as one
+JSON object per line to the original stdout. A {"control": "ratelimit"}
+line changes the download rate of a queued or running job.
+"""
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+_started = time.monotonic()
+
+# Keep the protocol channel for ourselves; anything else printing to stdout
+# (yt-dlp, ffmpeg children) ends up on stderr
+_protocol = os.fdopen(os.dup(sys.stdout.fileno()), 'w', encoding='utf-8', buffering=1)
+os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+import yt_dlp  # noqa: E402
+
+# Seconds between progress events of a running download
+PROGRESS_INTERVAL = 0.25
+
+
+# Download rate per job id, changed by control lines while the job runs
+_rates = {}
+_current = {'id': None, 'ydl': None}
+_rates_lock = threading.Lock()
+
+
+def emit(event):
+    _protocol.write(json.dumps(event) + '\n')
+    _protocol.flush()
+
+
+def current_rss_kb():
+    """Resident memory of this process in KB"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Bytes on macOS, KB elsewhere
+        return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def reset_peak_rss():
+    """Start measuring the peak resident memory afresh (Linux; elsewhere the peak covers the process lifetime)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss_kb():
+    """Peak resident memory in KB since reset_peak_rss, like ru_maxrss of a subprocess"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KB elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+class JobLogger:
+    """Forwards yt-dlp's log messages as events"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    def debug(self, msg):
+        # yt-dlp sends info messages through debug() too, prefixed with [...]
+        if not msg.startswith('[debug] '):
+            self.info(msg)
+
+    def info(self, msg):
+        emit({'event': 'log', 'id': self.job_id, 'level': 'info', 'message': msg})
+
+    def warning(self, msg):
+        emit({'event': 'log', 'id': self.job_id, 'level': 'warning', 'message': msg})
+
+    def error(self, msg):
+        emit({'event': 'log', 'id': self.job_id, 'level': 'error', 'message': msg})
+
+
+def run_job(job):
+    job_id = job['id']
+    last_progress = [0.0]
+
+    def progress_hook(d):
+        now = time.monotonic()
+        if d['status'] == 'downloading' and now - last_progress[0] < PROGRESS_INTERVAL:
+            return
+        last_progress[0] = now
+        total = d.get('total_bytes') or d.get('total_bytes_estimate')
+        downloaded = d.get('downloaded_bytes')
+        emit({
+            'event': 'progress',
+            'id': job_id,
+            'status': d['status'],
+            'percent': downloaded * 100.0 / total if total and downloaded is not None else None,
+            'downloaded_bytes': downloaded,
+            'total_bytes': total,
+            'speed': d.get('speed'),
+            'eta': d.get('eta'),
+            'filename': d.get('filename'),
+        })
+
+    def postprocessor_hook(d):
+        emit({'event': 'postprocess', 'id': job_id, 'status': d['status'], 'postprocessor': d.get('postprocessor')})
+
+    options = dict(job.get('options') or {})
+    options.update(
+        quiet=True,
+        noprogress=True,
+        logger=JobLogger(job_id),
+        progress_hooks=[progress_hook],
+        postprocessor_hooks=[postprocessor_hook],
+    )
+    started = time.monotonic()
+    reset_peak_rss()
+    try:
+        with yt_dlp.YoutubeDL(options) as ydl:
+            with _rates_lock:
+                _current.update(id=job_id, ydl=ydl)
+                if job_id in _rates:
+                    ydl.params['ratelimit'] = _rates[job_id]
+            if job.get('info_file'):
+                returncode = ydl.download_with_info_file(job['info_file'])
+            else:
+                returncode = ydl.download([job['url']])
+        error = None
+    except Exception as e:
+        returncode = 1
+        error = str(e)
+    finally:
+        with _rates_lock:
+            _current.update(id=None, ydl=None)
+            _rates.pop(job_id, None)
+    emit({
+        'event': 'done',
+        'id': job_id,
+        'returncode': returncode,
+        'error': error,
+        'seconds': time.monotonic() - started,
+        'rss_kb': peak_rss_kb(),
+    })
+
+
+def set_rate(job_id, rate):
+    with _rates_lock:
+        _rates[job_id] = rate
+        if _current['id'] == job_id:
+            # yt-dlp's downloaders read the limit from the shared params on every chunk
+            _current['ydl'].params['ratelimit'] = rate
+
+
+def read_stdin(jobs):
+    """Queue job lines and apply control lines right away, even while a job runs"""
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        message = json.loads(line)
+        if message.get('control') == 'ratelimit':
+            set_rate(message['id'], message['ratelimit'])
+        else:
+            jobs.put(message)
+    jobs.put(None)
+
+
+def main():
+    # Load the extractor classes up front so the first job starts warm
+    yt_dlp.YoutubeDL({'quiet': True}).get_info_extractor('Youtube')
+    emit({'event': 'ready', 'startup_seconds': time.monotonic() - _started, 'rss_kb': current_rss_kb()})
+    jobs = queue.Queue()
+    threading.Thread(target=read_stdin, args=(jobs,), daemon=True).start()
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        run_job(job)
+
+
+if __name__ == '__main__':
+    main()
@@ -249,6 +249,32 @@ ipcMain.handle('get-downloads', async () => {
     }
 });
 
+ipcMain.handle('get-download-changes', async (event, since, etag) => {
+    try {
+        if (!apiServerReady) {
+            console.log('API server not ready for get-download-changes');
+            return null;
+        }
+        
+        const headers = etag ? { 'If-None-Match': etag } : {};
+        const response = await fetch(`http://127.0.0.1:8000/api/downloads?since=${since}`, { headers });
+        
+        if (response.status === 304) {
+            return { unchanged: true };
+        }
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        
+        const changes = await response.json();
+        changes.etag = response.headers.get('ETag');
+        return changes;
+    } catch (error) {
+        console.error('Get download changes error:', error);
+        return null;
+    }
+});
+
 ipcMain.handle('get-download', async (event, downloadId) => {
     try {
         if (!apiServerReady) {
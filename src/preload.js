@@ -9,6 +9,7 @@ contextBridge.exposeInMainWorld('electronAPI', {
   startDownload: (url) => ipcRenderer.invoke('startDownload', url),
   getDownload: (downloadId) => ipcRenderer.invoke('get-download', downloadId),
   getDownloads: () => ipcRenderer.invoke('get-downloads'),
+  getDownloadChanges: (since, etag) => ipcRenderer.invoke('get-download-changes', since, etag),
   deleteDownload: (downloadId) => ipcRenderer.invoke('delete-download', downloadId),
     redownloadFile: (downloadId) => ipcRenderer.invoke('redownload-file', downloadId),
   getAudioSettings: () => ipcRenderer.invoke('get-audio-settings'),
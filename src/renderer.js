@@ -1,5 +1,8 @@
 // Global variables
 let downloads = [];
+let downloadsRevision = 0;
+let downloadsEtag = null;
+let eventStreamConnected = false;
 let currentDownload = null;
 let currentPage = 1;
 const itemsPerPage = 20;
@@ -213,27 +216,108 @@ async function updateStatus() {
 // Load downloads
 async function loadDownloads() {
     try {
-        downloads = await window.electronAPI.getDownloads();
+        const changes = await window.electronAPI.getDownloadChanges(0, null);
+        if (!changes) {
+            throw new Error('API server not available');
+        }
+        downloads = changes.downloads;
+        downloads.sort((a, b) => (b.created_at || '').localeCompare(a.created_at || ''));
+        downloadsRevision = changes.revision;
+        downloadsEtag = changes.etag;
         
         // Reset to first page when loading new data
         currentPage = 1;
         
-        // Show/hide clear button based on whether there are downloads
-        if (downloads.length === 0) {
-            clearDbBtn.style.display = 'none';
-            downloadsList.innerHTML = '<p style="color: #666; text-align: center;">No downloads yet</p>';
-            paginationControls.style.display = 'none';
+        showDownloads();
+
+    } catch (error) {
+        console.error('Load downloads error:', error);
+        downloadsList.innerHTML = '<p style="color: #f87171; text-align: center;">Error loading downloads</p>';
+    }
+}
+
+// Fetch only the downloads that changed since the last load
+async function refreshDownloads() {
+    try {
+        const changes = await window.electronAPI.getDownloadChanges(downloadsRevision, downloadsEtag);
+        if (!changes || changes.unchanged) {
             return;
-        } else {
-            clearDbBtn.style.display = 'block';
         }
+        
+        const changedIds = new Set(changes.downloads.map(download => download.id));
+        const deletedIds = new Set(changes.deleted);
+        downloads = downloads
+            .filter(download => !changedIds.has(download.id) && !deletedIds.has(download.id))
+            .concat(changes.downloads);
+        downloads.forEach(download => {
+            download.queue_position = changes.queue_positions[download.id];
+        });
+        downloads.sort((a, b) => (b.created_at || '').localeCompare(a.created_at || ''));
+        downloadsRevision = changes.revision;
+        downloadsEtag = changes.etag;
+        
+        showDownloads();
+
+    } catch (error) {
+        console.error('Refresh downloads error:', error);
+    }
+}
 
+// Subscribe to pushed status/progress updates from the API server
+function connectEventStream() {
+    const source = new EventSource('http://127.0.0.1:8000/api/events');
+    
+    source.onopen = () => {
+        eventStreamConnected = true;
+    };
+    
+    source.onerror = () => {
+        // EventSource reconnects by itself; poll until it does
+        eventStreamConnected = false;
+    };
+    
+    source.addEventListener('download', (event) => {
+        const update = JSON.parse(event.data);
+        
+        // Playlist tracks aren't listed; their playlist row gets its own updates
+        if (update.parent_id) {
+            return;
+        }
+        
+        const download = downloads.find(d => d.id === update.id);
+        
+        // New, removed or finished downloads need the full row from the API
+        if (!download || update.deleted || ['completed', 'failed', 'queued'].includes(update.status)) {
+            refreshDownloads();
+            return;
+        }
+        
+        Object.assign(download, update);
         renderDownloads();
+    });
+    
+    source.addEventListener('resync', () => {
+        refreshDownloads();
+    });
+}
 
-    } catch (error) {
-        console.error('Load downloads error:', error);
-        downloadsList.innerHTML = '<p style="color: #f87171; text-align: center;">Error loading downloads</p>';
+// Show the downloads list or the empty state
+function showDownloads() {
+    // Keep the current page valid after rows were removed
+    const totalPages = Math.max(1, Math.ceil(downloads.length / itemsPerPage));
+    currentPage = Math.min(currentPage, totalPages);
+    
+    // Show/hide clear button based on whether there are downloads
+    if (downloads.length === 0) {
+        clearDbBtn.style.display = 'none';
+        downloadsList.innerHTML = '<p style="color: #666; text-align: center;">No downloads yet</p>';
+        paginationControls.style.display = 'none';
+        return;
+    } else {
+        clearDbBtn.style.display = 'block';
     }
+
+    renderDownloads();
 }
 
 // Render downloads with pagination
@@ -333,6 +417,8 @@ function renderDownloads() {
                         </div>`;
                     } else if (download.status === 'downloading') {
                         fileLink = '<span class="downloading-text">Downloading...</span>';
+                    } else if (download.status === 'queued') {
+                        fileLink = `<span class="pending-text">Queued${download.queue_position ? ` (#${download.queue_position})` : ''}</span>`;
                     } else if (download.status === 'failed') {
                         fileLink = '<span class="failed-text">Failed</span>';
                     } else {
@@ -411,6 +497,7 @@ function getStatusText(status) {
         case 'completed': return 'Completed';
         case 'failed': return 'Failed';
         case 'downloading': return 'Downloading...';
+        case 'queued': return 'Queued';
         case 'file_missing': return 'File Missing';
         default: return 'Unknown';
     }
@@ -624,6 +711,11 @@ document.addEventListener('DOMContentLoaded', () => {
     // Update status every 5 seconds
     setInterval(updateStatus, 5000);
     
-    // Update downloads every 2 seconds
-    setInterval(loadDownloads, 2000);
+    // Push updates arrive over the event stream; poll only while it's down
+    connectEventStream();
+    setInterval(() => {
+        if (!eventStreamConnected) {
+            refreshDownloads();
+        }
+    }, 2000);
 }); 
\ No newline at end of file
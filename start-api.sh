@@ -51,7 +51,7 @@ source "../$VENV_DIR/bin/activate"
 
 # Start the API server
 echo "📡 API server will be available at: http://127.0.0.1:8000"
-echo "📋 Log file: ~/Downloads/all-dlp/all-dlp.log"
+echo "📋 Log file: ~/.all-dlp/logs/all-dlp.log"
 echo "🛑 Press Ctrl+C to stop the server"
 echo ""
 